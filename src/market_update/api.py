@@ -0,0 +1,391 @@
+"""
+Local HTTP job API for on-demand reports.
+
+    POST /reports                 {"stock_symbol": "NVDA", "incremental": false, "publish": true}
+    GET  /reports                 recent jobs
+    GET  /reports/<id>            job status
+    GET  /reports/<id>/result     report markdown once the job has finished
+    GET  /reports/<id>/events     task progress as server-sent events
+    GET  /health
+
+Jobs run on a bounded worker pool inside one warm process. A request for a
+symbol that already has a queued or running job with the same options joins
+that job instead of starting a second crew run.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from .batch import run_ticker
+from .rate_limit import RequestBudget
+
+
+DEFAULT_API_HOST = os.getenv("API_HOST", "127.0.0.1")
+DEFAULT_API_PORT = int(os.getenv("API_PORT", "8765"))
+DEFAULT_API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+DEFAULT_API_MAX_QUEUED = int(os.getenv("API_MAX_QUEUED", "20"))
+DEFAULT_API_MAX_JOBS = int(os.getenv("API_MAX_JOBS", "500"))
+DEFAULT_API_RPM = int(os.getenv("API_GLOBAL_RPM", "60"))
+SSE_KEEPALIVE_SECONDS = 15
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+logger = logging.getLogger(__name__)
+
+_current_job = contextvars.ContextVar("market_update_api_job", default=None)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Job:
+    """One report request and everything clients can ask about it."""
+
+    def __init__(self, stock_symbol, incremental=False, publish=True):
+        self.id = uuid.uuid4().hex[:12]
+        self.stock_symbol = stock_symbol
+        self.incremental = incremental
+        self.publish = publish
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.output = None
+        self.error = None
+        self.skipped = False
+        self.requests = 1
+        self.events = []
+        self._condition = threading.Condition(threading.RLock())
+
+    @property
+    def key(self):
+        return self.stock_symbol, self.incremental, self.publish
+
+    def add_event(self, event_type, **data):
+        with self._condition:
+            data.update(type=event_type, seq=len(self.events), time=time.time())
+            self.events.append(data)
+            self._condition.notify_all()
+
+    def finish(self, status, **data):
+        # Status and the final event change together so event streams never miss the end
+        with self._condition:
+            self.status = status
+            self.finished_at = time.time()
+            self.add_event("finished", status=status, **data)
+
+    def wait_for_events(self, after, timeout):
+        """Events with sequence number >= `after`, waiting up to `timeout` for new ones."""
+        with self._condition:
+            if len(self.events) <= after and self.status not in FINISHED:
+                self._condition.wait(timeout)
+            return self.events[after:]
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "stock_symbol": self.stock_symbol,
+            "incremental": self.incremental,
+            "publish": self.publish,
+            "status": self.status,
+            "requests": self.requests,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "skipped": self.skipped,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Queue of report jobs on a bounded worker pool, with per-symbol coalescing."""
+
+    def __init__(self, max_workers=DEFAULT_API_WORKERS, max_queued=DEFAULT_API_MAX_QUEUED,
+                 max_jobs=DEFAULT_API_MAX_JOBS, global_rpm=DEFAULT_API_RPM, run_fn=None):
+        """
+        Parameters:
+        - max_workers: Crews running at once
+        - max_queued: Jobs queued or running before new symbols are refused
+        - max_jobs: Finished jobs kept for status/result queries
+        - global_rpm: Combined LLM requests per minute across all jobs (0 disables)
+        - run_fn: Callable(job, request_budget) -> TickerResult (default: batch.run_ticker)
+        """
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self.request_budget = RequestBudget(global_rpm) if global_rpm else None
+        self.run_fn = run_fn or (lambda job, budget: run_ticker(
+            job.stock_symbol, budget, job.incremental, verbose=False, publish=job.publish))
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-job")
+        _install_progress_listeners()
+
+    def submit(self, stock_symbol, incremental=False, publish=True):
+        """
+        Queue a report job, or join the queued/running job for the same symbol and options.
+
+        Returns:
+        - (job, coalesced)
+
+        Raises:
+        - QueueFullError when `max_queued` jobs are already queued or running
+        """
+        job = Job(stock_symbol.strip().upper(), incremental, publish)
+        with self._lock:
+            active = self._active.get(job.key)
+            if active is not None:
+                active.requests += 1
+                return active, True
+            if len(self._active) >= self.max_queued:
+                raise QueueFullError(f"{len(self._active)} jobs already queued or running")
+            self._active[job.key] = job
+            self._jobs[job.id] = job
+            self._evict()
+        job.add_event("queued", stock_symbol=job.stock_symbol)
+        self._executor.submit(self._run, job)
+        return job, False
+
+    def _evict(self):
+        # Called with the lock held; forget the oldest finished jobs
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.add_event("started", stock_symbol=job.stock_symbol)
+        token = _current_job.set(job)
+        try:
+            result = self.run_fn(job, self.request_budget)
+        except Exception as e:
+            result = None
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            _current_job.reset(token)
+
+        if result is not None and result.success:
+            job.output = result.output
+            job.skipped = result.skipped
+            status = SUCCEEDED
+        else:
+            job.error = job.error or (result.error if result is not None else "Unknown error")
+            status = FAILED
+        with self._lock:
+            self._active.pop(job.key, None)
+        job.finish(status, error=job.error, skipped=job.skipped, duration_seconds=time.time() - job.started_at)
+        logger.info("Job %s for %s %s in %.1fs", job.id, job.stock_symbol, job.status,
+                    job.finished_at - job.started_at)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit=50):
+        with self._lock:
+            return [job.as_dict() for job in reversed(list(self._jobs.values())[-limit:])]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def _install_progress_listeners():
+    # crewai calls event handlers in the thread that runs the crew, where the
+    # worker has set the current job
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        from crewai.events import crewai_event_bus
+        from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+        from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageStartedEvent
+
+        def task_name(source, event):
+            task = getattr(event, "task", None) or source
+            return getattr(task, "name", None) or "task"
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def on_task_started(source, event):
+            job = _current_job.get()
+            if job is not None:
+                job.add_event("task_started", task=task_name(source, event))
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def on_task_completed(source, event):
+            job = _current_job.get()
+            if job is not None:
+                summary = getattr(event.output, "summary", None)
+                job.add_event("task_completed", task=task_name(source, event), summary=summary)
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def on_task_failed(source, event):
+            job = _current_job.get()
+            if job is not None:
+                job.add_event("task_failed", task=task_name(source, event), error=str(event.error)[:500])
+
+        @crewai_event_bus.on(ToolUsageStartedEvent)
+        def on_tool_started(source, event):
+            job = _current_job.get()
+            if job is not None:
+                job.add_event("tool_started", tool=event.tool_name)
+
+        @crewai_event_bus.on(ToolUsageErrorEvent)
+        def on_tool_error(source, event):
+            job = _current_job.get()
+            if job is not None:
+                job.add_event("tool_error", tool=event.tool_name, error=str(event.error)[:500])
+
+        _listeners_installed = True
+
+
+class ReportAPIServer:
+    """ThreadingHTTPServer exposing a JobManager; see the module docstring for the routes."""
+
+    def __init__(self, manager, host=DEFAULT_API_HOST, port=DEFAULT_API_PORT):
+        self.manager = manager
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                api.handle_post(self)
+
+            def do_GET(self):
+                api.handle_get(self)
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def _send_json(handler, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def handle_post(self, handler):
+        path = urlsplit(handler.path).path.rstrip("/")
+        if path != "/reports":
+            return self._send_json(handler, 404, {"error": "not_found"})
+        try:
+            length = int(handler.headers.get("Content-Length", 0))
+            payload = json.loads(handler.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(handler, 400, {"error": "invalid_json"})
+        symbol = payload.get("stock_symbol") if isinstance(payload, dict) else None
+        if not isinstance(symbol, str) or not symbol.strip():
+            return self._send_json(handler, 400, {"error": "stock_symbol is required"})
+        try:
+            job, coalesced = self.manager.submit(
+                symbol, incremental=bool(payload.get("incremental", False)),
+                publish=bool(payload.get("publish", True))
+            )
+        except QueueFullError as e:
+            return self._send_json(handler, 503, {"error": "queue_full", "detail": str(e)})
+        body = job.as_dict()
+        body["coalesced"] = coalesced
+        body["links"] = {
+            "status": f"/reports/{job.id}",
+            "result": f"/reports/{job.id}/result",
+            "events": f"/reports/{job.id}/events",
+        }
+        self._send_json(handler, 202, body)
+
+    def handle_get(self, handler):
+        parts = [p for p in urlsplit(handler.path).path.split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(handler, 200, {"ok": True})
+        if parts == ["reports"]:
+            return self._send_json(handler, 200, {"jobs": self.manager.list()})
+        if len(parts) < 2 or parts[0] != "reports" or len(parts) > 3:
+            return self._send_json(handler, 404, {"error": "not_found"})
+        job = self.manager.get(parts[1])
+        if job is None:
+            return self._send_json(handler, 404, {"error": "unknown_job"})
+        if len(parts) == 2:
+            return self._send_json(handler, 200, job.as_dict())
+        if parts[2] == "result":
+            if job.status not in FINISHED:
+                return self._send_json(handler, 202, job.as_dict())
+            if job.status == FAILED:
+                return self._send_json(handler, 500, job.as_dict())
+            body = job.as_dict()
+            body["output"] = job.output
+            return self._send_json(handler, 200, body)
+        if parts[2] == "events":
+            return self._stream_events(handler, job)
+        return self._send_json(handler, 404, {"error": "not_found"})
+
+    @staticmethod
+    def _stream_events(handler, job):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        try:
+            # A reconnecting client resumes after the last event it received
+            sent = max(0, int(handler.headers.get("Last-Event-ID", -1)) + 1)
+        except ValueError:
+            sent = 0
+        try:
+            while True:
+                events = job.wait_for_events(sent, SSE_KEEPALIVE_SECONDS)
+                if events:
+                    chunk = "".join(
+                        f"id: {e['seq']}\nevent: {e['type']}\ndata: {json.dumps(e, default=str)}\n\n" for e in events
+                    )
+                    sent += len(events)
+                else:
+                    chunk = ": keepalive\n\n"
+                handler.wfile.write(chunk.encode("utf-8"))
+                handler.wfile.flush()
+                if job.status in FINISHED and sent >= len(job.events):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="report-api", daemon=True)
+        self._thread.start()
+        logger.info("Report API listening on %s", self.url)
+        return self
+
+    def serve_forever(self):
+        logger.info("Report API listening on %s", self.url)
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,197 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from .crew import LatestMarketNewsTrendCrew
+from .incremental import format_news_items, prepare_incremental
+from .rate_limit import RequestBudget
+from .other_tools.slack_delivery import flush_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+DEFAULT_GLOBAL_RPM = int(os.getenv("BATCH_GLOBAL_RPM", "60"))
+
+
+@dataclass
+class TickerResult:
+    """Outcome of a single ticker run inside a batch."""
+    stock_symbol: str
+    success: bool
+    started_at: str
+    duration_seconds: float
+    output: Optional[str] = None
+    error: Optional[str] = None
+    # True when an incremental run found no new news and skipped the LLM
+    skipped: bool = False
+    # Run ID of the crew run; a failed run can be resumed with `market_update --resume <run_id>`
+    run_id: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """Aggregated outcome of a batch run."""
+    results: List[TickerResult] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.success]
+
+    def summary(self):
+        lines = [
+            f"Batch finished in {self.duration_seconds:.1f}s: "
+            f"{len(self.succeeded)} succeeded, {len(self.failed)} failed"
+        ]
+        for r in sorted(self.results, key=lambda r: r.stock_symbol):
+            status = "FAIL" if not r.success else ("SKIP" if r.skipped else "OK  ")
+            line = f"  {status} {r.stock_symbol:<8} {r.duration_seconds:8.1f}s"
+            if r.error:
+                line += f"  {r.error}"
+                if r.run_id:
+                    line += f" (resume: {r.run_id[:12]})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def load_symbols(symbols=None, file_path=None):
+    """
+    Build a de-duplicated, upper-cased ticker list from CLI arguments and/or a file.
+
+    The file may contain one ticker per line or comma separated tickers;
+    blank lines and lines starting with '#' are ignored.
+
+    Parameters:
+    - symbols: Iterable of ticker strings (optional)
+    - file_path: Path to a ticker list file (optional)
+
+    Returns:
+    - List of ticker symbols in first-seen order
+    """
+    raw = list(symbols or [])
+    if file_path:
+        with open(file_path, 'r') as file:
+            for line in file:
+                line = line.split('#', 1)[0]
+                raw.extend(line.replace(',', ' ').split())
+
+    seen = set()
+    ordered = []
+    for symbol in raw:
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            ordered.append(symbol)
+    return ordered
+
+
+def run_ticker(stock_symbol, request_budget=None, incremental=False, verbose=None, publish=True, news_items=None):
+    """
+    Run the full crew (or an incremental run) for one ticker and capture its outcome.
+    `verbose` overrides the crew's console output setting (CREW_VERBOSE); with
+    `publish` False the report is written but not posted to Slack. `news_items`
+    is the ticker's slice of a batch prefetch; the researcher then does not search.
+
+    Never raises: any exception is recorded on the returned TickerResult so a
+    single failing ticker cannot abort the batch.
+    """
+    started_at = datetime.now()
+    start = time.perf_counter()
+    inputs = {
+        'stock_symbol': stock_symbol,
+        'current_datetime': str(started_at)
+    }
+    crew = None
+    try:
+        if incremental:
+            crew, incremental_inputs = prepare_incremental(stock_symbol, request_budget=request_budget,
+                                                           verbose=verbose, publish=publish, items=news_items)
+            crew_output = crew.crew().kickoff(inputs=incremental_inputs) if crew is not None else None
+        else:
+            prefetched = news_items is not None
+            if prefetched:
+                inputs['news_items'] = format_news_items(news_items)
+            crew = LatestMarketNewsTrendCrew(request_budget=request_budget, verbose=verbose, publish=publish,
+                                             prefetched=prefetched, news_items=news_items)
+            crew_output = crew.crew().kickoff(inputs=inputs)
+        return TickerResult(
+            stock_symbol=stock_symbol,
+            success=True,
+            started_at=str(started_at),
+            duration_seconds=time.perf_counter() - start,
+            output=getattr(crew_output, 'raw', None),
+            skipped=crew_output is None,
+            run_id=crew.run_id if crew is not None else None,
+        )
+    except Exception as e:
+        logger.exception("Run of %s failed", stock_symbol)
+        if crew is not None:
+            crew.abort(e)
+        return TickerResult(
+            stock_symbol=stock_symbol,
+            success=False,
+            started_at=str(started_at),
+            duration_seconds=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+            run_id=crew.run_id if crew is not None else None,
+        )
+
+
+def run_batch(symbols, max_workers=DEFAULT_MAX_WORKERS, global_rpm=DEFAULT_GLOBAL_RPM, incremental=False,
+              verbose=None, prefetch=False):
+    """
+    Run the crew for many tickers concurrently on a bounded worker pool.
+
+    Parameters:
+    - symbols: List of ticker symbols
+    - max_workers: Maximum number of crews running at the same time
+    - global_rpm: Combined LLM requests per minute allowed across all workers;
+      each agent's own `max_rpm` still applies on top of this
+    - incremental: Only analyse news that earlier runs have not covered
+    - verbose: crewai console output for every crew (None keeps CREW_VERBOSE)
+    - prefetch: Fetch market, sector and ticker news for the whole batch once up front
+      and give every researcher its slice instead of letting each one search
+
+    Returns:
+    - BatchResult with one TickerResult per symbol
+    """
+    request_budget = RequestBudget(global_rpm) if global_rpm else None
+    batch = BatchResult()
+    start = time.perf_counter()
+
+    market = None
+    if prefetch:
+        from .prefetch import MarketPrefetch
+        market = MarketPrefetch(symbols).run()
+        print(f"[batch] prefetched {market.stats['items']} items with {market.stats['queries']} queries "
+              f"({market.stats['queries_without_prefetch']} without prefetch) in {market.stats['seconds']:.1f}s")
+        if market.stats['uncovered']:
+            print(f"[batch] ticker searches timed out or failed for {', '.join(market.stats['uncovered'])}; "
+                  f"their researchers search for themselves")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ticker") as pool:
+        futures = {
+            pool.submit(run_ticker, symbol, request_budget, incremental, verbose,
+                        news_items=market.items_for(symbol) if market and market.covers(symbol) else None): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            batch.results.append(result)
+            status = "completed" if result.success else "failed"
+            print(f"[batch] {result.stock_symbol} {status} in {result.duration_seconds:.1f}s "
+                  f"({len(batch.results)}/{len(futures)})")
+
+    # Crews hand their reports to the background Slack queue; don't report done until it drains
+    flush_deliveries()
+    batch.duration_seconds = time.perf_counter() - start
+    return batch
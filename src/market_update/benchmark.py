@@ -0,0 +1,360 @@
+"""
+Offline end-to-end benchmark for LatestMarketNewsTrendCrew.
+
+Drives the real crew, tools and Slack delivery code against a fake LLM, a fake
+search backend and the local Slack stub, each with configurable latency and
+payload size, and reports per-stage wall time, call counts, token counts and
+peak memory as JSON.
+
+Usage: benchmark [--tickers 1 10 100] [--workers 8] [--output bench.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from crewai import Agent, Task
+from crewai.llms.base_llm import BaseLLM
+
+from .batch import run_batch
+from .import_budget import measure_import_time
+from .crew import LatestMarketNewsTrendCrew
+from .other_tools.slack_messenger import SlackMessenger
+from .other_tools.slack_stub_server import SlackStubServer
+from .recording import activate
+
+
+def estimate_tokens(text):
+    """Cheap, deterministic token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class StageRecorder:
+    """Thread-safe collector of (stage, duration) samples."""
+
+    def __init__(self):
+        self.samples = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def summary(self):
+        with self._lock:
+            return {
+                stage: {
+                    "count": len(values),
+                    "p50": percentile(values, 0.50),
+                    "p95": percentile(values, 0.95),
+                    "mean": sum(values) / len(values),
+                    "total": sum(values),
+                }
+                for stage, values in sorted(self.samples.items())
+            }
+
+
+class FakeLLM(BaseLLM):
+    """
+    Scripted ReAct LLM. The researchers first call the multi-query search tool
+    with the input their task suggests and then answer; the analyst answers
+    straight away with a report of `report_chars` characters.
+    """
+
+    _SEARCH_INPUT_RE = re.compile(r"Multi-Query News Search tool once with (\{[^{}]*\})")
+
+    def __init__(self, recorder, latency=0.05, report_chars=6000, research_chars=2000):
+        super().__init__(model="fake-llm", temperature=0)
+        self.recorder = recorder
+        self.latency = latency
+        self.report_chars = report_chars
+        self.research_chars = research_chars
+        self._turns = {}
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        with self.recorder.time("llm_turn"):
+            prompt = messages if isinstance(messages, str) else "\n".join(str(m.get("content")) for m in messages)
+            with self._lock:
+                turn = self._turns.get(id(from_task), 0)
+                self._turns[id(from_task)] = turn + 1
+
+            agent = from_agent or getattr(from_task, "agent", None)
+            role = getattr(agent, "role", "") or ""
+            symbol = role.split(" ", 1)[0].strip() or "TICKER"
+            # Prefetched and incremental research tasks have no tools to call
+            if "Intelligence" in role and turn == 0 and "Multi-Query News Search" in prompt:
+                suggested = self._SEARCH_INPUT_RE.search(prompt)
+                action_input = suggested.group(1) if suggested else json.dumps({"stock_symbol": symbol})
+                response = (
+                    "Thought: I should gather the news in one call.\n"
+                    "Action: Multi-Query News Search\n"
+                    f"Action Input: {action_input}"
+                )
+            elif "Intelligence" in role:
+                findings = {"items": [
+                    {
+                        "title": f"{symbol} news item {i}",
+                        "summary": ("detail " * (self.research_chars // 84))[:self.research_chars // 12],
+                        "source": f"Source {i % 5}",
+                        "published": datetime.now().isoformat(),
+                        "url": f"https://news.example.com/{symbol.lower()}/{i}",
+                    }
+                    for i in range(12)
+                ]}
+                response = f"Thought: I now know the final answer\nFinal Answer: {json.dumps(findings)}"
+            else:
+                body = f"# {symbol} Options Report\n\n" + "\n\n".join(
+                    f"## Section {i}\n\n" + "Analysis sentence. " * 40 for i in range(8)
+                )
+                response = f"Thought: I now know the final answer\nFinal Answer: {self._pad(body, self.report_chars)}"
+
+            if self.latency:
+                time.sleep(self.latency)
+            self.recorder.count("llm_calls")
+            self.recorder.count("prompt_tokens", estimate_tokens(prompt))
+            self.recorder.count("completion_tokens", estimate_tokens(response))
+            return response
+
+    @staticmethod
+    def _pad(text, size):
+        while len(text) < size:
+            text += "\n\nAdditional context. " * 20
+        return text[:size]
+
+    def supports_function_calling(self):
+        return False
+
+    def get_context_window_size(self):
+        return 128000
+
+
+class FakeBackendSession:
+    """
+    Stands in for a RecordReplaySession: gives the crew the FakeLLM and answers
+    DuckDuckGoSearchTool calls with synthetic results.
+    """
+
+    replaying = True
+
+    def __init__(self, recorder, llm_latency, search_latency, results_per_search, report_chars):
+        self.recorder = recorder
+        self.search_latency = search_latency
+        self.results_per_search = results_per_search
+        self._llm = FakeLLM(recorder, latency=llm_latency, report_chars=report_chars)
+
+    def llm(self):
+        return self._llm
+
+    def search(self, arguments, live_call):
+        with self.recorder.time("search_call"):
+            if self.search_latency:
+                time.sleep(self.search_latency)
+            query = arguments["query"]
+            slug = query.lower().replace(" ", "-")
+            self.recorder.count("tool_calls")
+            return [
+                {
+                    "title": f"{query} headline {i} about a distinct development number {i * 7919}",
+                    "snippet": f"Snippet {i} for {query}. " + f"token{i} " * 20,
+                    "link": f"https://news.example.com/{slug}/{i}",
+                    "source": f"Source {i % 5}",
+                    "date": datetime.now().isoformat(),
+                }
+                for i in range(self.results_per_search)
+            ]
+
+    def call(self, kind, arguments, live_call):
+        # Local state such as the seen-news flags is read live
+        return live_call()
+
+    def clock(self):
+        # Synthetic results are dated now
+        return time.time()
+
+    def save(self):
+        pass
+
+
+@contextlib.contextmanager
+def _timed_method(owner, name, recorder, stage):
+    # Wrap a method for the duration of the benchmark to time one stage
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        with recorder.time(stage):
+            return original(*args, **kwargs)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+
+def run_scenario(stub, n_tickers, workers, llm_latency, search_latency,
+                 results_per_search, report_chars, quiet=True, prefetch=False):
+    """
+    Run one benchmark scenario of `n_tickers` crews.
+
+    Parameters:
+    - stub: Running SlackStubServer that SLACK_API_BASE_URL points at
+    - n_tickers: Number of symbols in the batch
+    - workers: Concurrent crews
+    - prefetch: Run the batch with the shared market-wide prefetch stage
+
+    Returns:
+    - Dictionary with wall time, per-stage latency percentiles, counters and memory
+    """
+    recorder = StageRecorder()
+    session = FakeBackendSession(recorder, llm_latency, search_latency, results_per_search, report_chars)
+    symbols = [f"T{i:03d}" for i in range(n_tickers)]
+
+    with (contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()), activate(session):
+        # Crew construction is measured separately from the batch runs
+        with _timed_method(Agent, "__init__", recorder, "agent_create"):
+            for _ in range(min(n_tickers, 10)):
+                with recorder.time("crew_construct"):
+                    crew_instance = LatestMarketNewsTrendCrew(publish=False)
+                    crew_instance.crew()
+                # Never kicked off, so nothing else stops its agents' rpm timers
+                crew_instance.release_agents()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        messages_before = len(stub.messages)
+        with _timed_method(Task, "_save_file", recorder, "report_write"), \
+                _timed_method(SlackMessenger, "_post", recorder, "slack_post"):
+            batch = run_batch(symbols, max_workers=workers, global_rpm=0, verbose=not quiet, prefetch=prefetch)
+        slack_messages = len(stub.messages) - messages_before
+        wall_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    for result in batch.results:
+        recorder.add("ticker_total", result.duration_seconds)
+
+    return {
+        "tickers": n_tickers,
+        "workers": workers,
+        "prefetch": prefetch,
+        "wall_time": wall_time,
+        "succeeded": len(batch.succeeded),
+        "failed": len(batch.failed),
+        "errors": sorted({r.error for r in batch.failed})[:5],
+        "stages": recorder.summary(),
+        "counters": dict(recorder.counters, slack_messages=slack_messages),
+        "peak_traced_memory_mb": peak / (1024 * 1024),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmark", description="Offline end-to-end crew benchmark.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1, 10, 100],
+                        help="Scenario sizes to run (default: 1 10 100)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM turn")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Seconds per fake search")
+    parser.add_argument("--slack-latency", type=float, default=0.01, help="Seconds per stub Slack call")
+    parser.add_argument("--results-per-search", type=int, default=20)
+    parser.add_argument("--report-chars", type=int, default=6000)
+    parser.add_argument("--prefetch", action="store_true", help="Run the batches with the market-wide prefetch stage")
+    parser.add_argument("--sequential-research", action="store_true",
+                        help="Research each ticker in one agent loop instead of the parallel sub-tasks")
+    parser.add_argument("--output", "-o", default=None, help="Write the JSON results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep crew console output")
+    args = parser.parse_args(sys.argv[1:])
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="market_update_bench_")
+    previous_cwd = os.getcwd()
+    # Reports, caches and the news store go to a scratch directory
+    os.chdir(workdir)
+    os.environ["SEARCH_CACHE_DISABLED"] = "1"
+    # Keep crewai from exporting telemetry or prompting to view traces after each kickoff
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    os.environ.setdefault("CREWAI_TESTING", "true")
+    # One stub for all scenarios: delivery workers keep their messenger between reports
+    stub = SlackStubServer(latency=args.slack_latency).start()
+    os.environ["SLACK_API_BASE_URL"] = stub.base_url
+    os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-benchmark")
+    if args.sequential_research:
+        LatestMarketNewsTrendCrew.parallel_research = False
+    try:
+        scenarios = []
+        for n in args.tickers:
+            print(f"Running benchmark scenario: {n} tickers, {args.workers} workers", file=sys.stderr)
+            scenarios.append(run_scenario(
+                stub, n, args.workers, args.llm_latency, args.search_latency,
+                args.results_per_search, args.report_chars, quiet=not args.verbose, prefetch=args.prefetch
+            ))
+    finally:
+        stub.stop()
+        os.chdir(previous_cwd)
+
+    # Cold-start cost of the CLI entry point and of the crew module, each in a fresh interpreter
+    import_time_ms = {module: round(measure_import_time(module, runs=3)[0], 1)
+                      for module in ("market_update.main", "market_update.crew")}
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "verbose")},
+        "import_time_ms": import_time_ms,
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as file:
+            file.write(text)
+        print(f"Benchmark results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
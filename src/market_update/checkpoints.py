@@ -0,0 +1,267 @@
+"""
+Task-output checkpoints for resuming failed crew runs.
+
+Every task of a run saves its output under the run ID as soon as it
+completes, together with the run's symbol, inputs and mode; the run is marked
+completed once Slack has accepted every post of the report. A run that failed
+in the reporting task or while publishing can be resumed with `--resume <run_id>`:
+the tasks that already completed return their saved output instead of
+searching and calling the LLM again, so the retry starts at the first
+incomplete stage.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from crewai import Task
+from crewai.tasks.output_format import OutputFormat
+from crewai.tasks.task_output import TaskOutput
+from pydantic import PrivateAttr
+
+
+DEFAULT_CHECKPOINT_STORE_PATH = os.getenv("CHECKPOINT_STORE_PATH", ".cache/checkpoints.sqlite")
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+# Checkpoints of older runs are removed when the store is opened (0 keeps them)
+DEFAULT_RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "7"))
+# `--resume last` only picks up runs this recent; older inputs describe stale news
+DEFAULT_RESUME_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_RESUME_MAX_AGE_HOURS", "24"))
+
+# Stage after the tasks: the report was indexed and handed to Slack
+PUBLISH_STAGE = "publish"
+
+logger = logging.getLogger(__name__)
+
+
+def input_window(inputs):
+    """The news window of a run: its current_datetime to the hour."""
+    return str(inputs.get('current_datetime', ''))[:13]
+
+
+@dataclass
+class RunCheckpoint:
+    run_id: str
+    symbol: str
+    window: str
+    inputs: Dict[str, Any]
+    mode: Dict[str, Any]
+    status: str
+    created_at: float
+    updated_at: float
+    error: Optional[str] = None
+    report_path: Optional[str] = None
+    # Task name -> raw output of every task that completed
+    outputs: Dict[str, str] = field(default_factory=dict)
+    # News items the run's agents were shown; recorded as seen once a resumed run publishes
+    news_items: List[dict] = field(default_factory=list)
+
+    def first_incomplete(self, task_names):
+        """Name of the first stage of `task_names` (then 'publish') without a checkpoint, or None."""
+        for name in task_names:
+            if name not in self.outputs:
+                return name
+        return None if self.status == "completed" else PUBLISH_STAGE
+
+
+class CheckpointStore:
+    """SQLite store of crew runs and the outputs of their completed tasks."""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_STORE_PATH, retention_days=DEFAULT_RETENTION_DAYS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                input_window TEXT NOT NULL,
+                inputs TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                report_path TEXT,
+                news_items TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_symbol ON runs (symbol, input_window, created_at);
+            CREATE TABLE IF NOT EXISTS task_outputs (
+                run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+                task_name TEXT NOT NULL,
+                raw TEXT NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (run_id, task_name)
+            );
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "news_items" not in columns:
+            # Stores created before news items were checkpointed
+            self._conn.execute("ALTER TABLE runs ADD COLUMN news_items TEXT")
+        self._conn.commit()
+        if retention_days:
+            self.prune(retention_days)
+
+    def start_run(self, run_id, symbol, inputs, mode, news_items=None):
+        """Register a run, or mark a resumed one as running again."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, symbol, input_window, inputs, mode, status, news_items, created_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, 'running', ?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET status = 'running', error = NULL, updated_at = excluded.updated_at",
+                (run_id, symbol.upper(), input_window(inputs), json.dumps(inputs, default=str), json.dumps(mode),
+                 json.dumps(news_items or [], default=str), now, now),
+            )
+            self._conn.commit()
+
+    def save_output(self, run_id, task_name, raw, output_file=None):
+        """Checkpoint the output of a completed task (and the report file it wrote)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_outputs (run_id, task_name, raw, completed_at) VALUES (?, ?, ?, ?)",
+                (run_id, task_name, raw, now),
+            )
+            if output_file:
+                self._conn.execute("UPDATE runs SET report_path = ?, updated_at = ? WHERE run_id = ?",
+                                   (output_file, now, run_id))
+            self._conn.commit()
+
+    def _set_status(self, run_id, status, error=None):
+        with self._lock:
+            self._conn.execute("UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                               (status, error, time.time(), run_id))
+            self._conn.commit()
+
+    def fail_run(self, run_id, error, news_items=None):
+        """Mark a run failed; `news_items` replaces the run's items (e.g. with the search results it collected)."""
+        if news_items:
+            with self._lock:
+                self._conn.execute("UPDATE runs SET news_items = ? WHERE run_id = ?",
+                                   (json.dumps(news_items, default=str), run_id))
+        self._set_status(run_id, "failed", str(error)[:2000])
+
+    def finish_run(self, run_id):
+        self._set_status(run_id, "completed")
+
+    def _load(self, row):
+        checkpoint = RunCheckpoint(
+            run_id=row[0], symbol=row[1], window=row[2], inputs=json.loads(row[3]), mode=json.loads(row[4]),
+            status=row[5], error=row[6], report_path=row[7], created_at=row[8], updated_at=row[9],
+            news_items=json.loads(row[10] or "[]"),
+        )
+        checkpoint.outputs = dict(self._conn.execute(
+            "SELECT task_name, raw FROM task_outputs WHERE run_id = ?", (checkpoint.run_id,)
+        ).fetchall())
+        return checkpoint
+
+    _COLUMNS = ("run_id, symbol, input_window, inputs, mode, status, error, report_path, created_at, updated_at, "
+                "news_items")
+
+    def load(self, run_id):
+        """The checkpoint of a run (a unique prefix of the run ID is enough), or None."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM runs WHERE substr(run_id, 1, length(?)) = ? LIMIT 2", (run_id, run_id)
+            ).fetchall()
+            return self._load(rows[0]) if len(rows) == 1 else None
+
+    def latest_incomplete(self, symbol, max_age_hours=DEFAULT_RESUME_MAX_AGE_HOURS):
+        """The most recent run of a symbol that did not complete, or None."""
+        since = time.time() - max_age_hours * 3600 if max_age_hours else 0
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM runs WHERE symbol = ? AND status != 'completed' AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (symbol.upper(), since),
+            ).fetchone()
+            return self._load(row) if row else None
+
+    def prune(self, older_than_days=DEFAULT_RETENTION_DAYS):
+        """Remove runs last updated more than `older_than_days` ago. Returns the number removed."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """Return the process-wide CheckpointStore, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+        return _store
+
+
+class ResumableTask(Task):
+    """
+    Task that checkpoints its output when it completes and, in a resumed run,
+    returns the checkpointed output instead of running again.
+    """
+
+    _checkpoint_store: Any = PrivateAttr(default=None)
+    _checkpoint_run_id: Optional[str] = PrivateAttr(default=None)
+    _restored_raw: Optional[str] = PrivateAttr(default=None)
+
+    def checkpoint_to(self, store, run_id, restored_raw=None):
+        """
+        Parameters:
+        - store: CheckpointStore the output is saved to
+        - run_id: Run the output belongs to
+        - restored_raw: Output of this task in the run being resumed; the task then does not run
+
+        Returns:
+        - self
+        """
+        self._checkpoint_store = store
+        self._checkpoint_run_id = run_id
+        self._restored_raw = restored_raw
+        return self
+
+    def _execute_core(self, agent, context, tools):
+        if self._restored_raw is not None:
+            return self._restore(agent or self.agent)
+        output = super()._execute_core(agent, context, tools)
+        if self._checkpoint_store is not None:
+            try:
+                self._checkpoint_store.save_output(self._checkpoint_run_id, self.name, output.raw, self.output_file)
+            except sqlite3.Error as e:
+                logger.error("Could not checkpoint the output of %s: %s", self.name, e)
+        return output
+
+    def _restore(self, agent):
+        logger.info("Task %s restored from the checkpoint of run %s", self.name, self._checkpoint_run_id)
+        output = TaskOutput(
+            name=self.name or self.description,
+            description=self.description,
+            expected_output=self.expected_output,
+            raw=self._restored_raw,
+            agent=agent.role if agent else "",
+            output_format=OutputFormat.RAW,
+        )
+        self.output = output
+        if self.output_file:
+            # Rewrite the report so a resumed run publishes the same file
+            self._save_file(output.raw)
+        return output
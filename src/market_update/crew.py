@@ -1,27 +1,78 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task, before_kickoff, after_kickoff
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain.tools import Tool
 from datetime import datetime
-from dotenv import load_dotenv
 
+import copy
+import logging
 import os
+import threading
+
+import yaml
 
 from .tools.search_tool import DuckDuckGoSearchTool
+from .tools.multi_search_tool import MultiQuerySearchTool
+from .tools.market_data import format_volatility_summary
+from .tools.volatility_tool import VolatilitySnapshotTool
+from .rate_limit import attach_request_budget
+from .news_store import get_news_store, summarize_report
+from .report_store import get_report_store
+from .tickers import get_ticker_profile
+from .tools.news_ranking import (
+    DEFAULT_MAX_ITEMS, DEFAULT_TOKEN_BUDGET, ResearchFindings, parse_research_items, rank_news, render_research_items,
+)
+from .recording import get_active_session
+from .instrumentation import bind_run, new_run_id, span, unbind_run
+from .checkpoints import CHECKPOINTS_ENABLED, PUBLISH_STAGE, ResumableTask, get_checkpoint_store
+from .log_sink import get_log_sink
+from .report_stream import REPORT_STREAMING, ReportStream, enable_streaming, unwatch_task, watch_task
+from .parallel_research import (
+    PARALLEL_RESEARCH, RESEARCH_MAX_PARALLEL, RESEARCH_SUBTASKS, LimitedAsyncTask, research_slots, sector_inputs,
+)
 
 from .other_tools.slack_messenger import SlackMessenger
+from .other_tools.slack_delivery import SectionDelivery, get_delivery_queue, parse_channels, when_delivered
 
 # from crewai_tools import ScraperDevTool
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def load_yaml_cached(config_path):
+    """
+    Parse a YAML config file once per file version and hand out copies.
+
+    crewai re-reads agents.yaml and tasks.yaml for every crew instance; batch
+    runs and the scheduler build a crew per ticker run, so the parsed result
+    is kept in memory and only re-parsed when the file's mtime changes.
+    """
+    path = str(config_path)
+    mtime = os.path.getmtime(path)
+    with _config_cache_lock:
+        cached = _config_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, "r", encoding="utf-8") as file:
+                cached = (mtime, yaml.safe_load(file))
+            _config_cache[path] = cached
+    # crewai fills agent and task configs in place, so every crew gets its own copy
+    return copy.deepcopy(cached[1])
+
+
+def stop_rpm_timers(agents):
+    """
+    Stop the request-per-minute timers of agents.
+
+    An agent with `max_rpm` starts a non-daemon timer when it is built and
+    crewai only stops it at the end of Agent.execute_task, so an agent that
+    never runs (or fails) would keep the interpreter alive.
+    """
+    for member in agents:
+        controller = getattr(member, '_rpm_controller', None)
+        if controller is not None:
+            controller.stop_rpm_counter()
 
-# Create a tool with explicit name, func, and description
-search_tool = Tool(
-    name="duckduckgo_search",
-    func=DuckDuckGoSearchRun().run,
-    description="Useful for searching the internet and finding relevant information about various topics"
-)
 
 @CrewBase
 class LatestMarketNewsTrendCrew():
@@ -30,94 +81,437 @@ class LatestMarketNewsTrendCrew():
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
+    # One channel or a comma separated list; the report is fanned out to every channel
     slack_channel = os.getenv("SLACK_CHANNEL", "#general")
+    # Post to Slack on a background queue so kickoff returns as soon as the report is written
+    slack_async_delivery = os.getenv("SLACK_ASYNC_DELIVERY", "true").lower() in ("1", "true", "yes")
+    # crewai's step-by-step console output for agents and the crew
+    verbose = os.getenv("CREW_VERBOSE", "true").lower() in ("1", "true", "yes")
+    # Write the report and post its sections to Slack while the analyst is still generating it
+    stream_report = REPORT_STREAMING
+    # Research company news, catalysts and sector news as concurrent sub-tasks instead of one agent loop
+    parallel_research = PARALLEL_RESEARCH
+    research_max_parallel = RESEARCH_MAX_PARALLEL
+    # Save every task's output so a failed run can be resumed from its first incomplete stage
+    checkpoints = CHECKPOINTS_ENABLED
     inputs = {}
     output_filename = None
+    run_id = None
+
+    def __init__(self, request_budget=None, incremental=False, publish=True, verbose=None, stream_report=None,
+                 prefetched=False, parallel_research=None, research_max_parallel=None, resume=None, news_items=None):
+        # Optional RequestBudget shared with other crews running in the same process
+        self.request_budget = request_budget
+        # Incremental runs get the unseen news delta as input instead of searching again
+        self.incremental = incremental
+        # Batch runs with a prefetch stage get their slice of the shared news as input
+        self.prefetched = prefetched
+        # News items the agents are shown: the incremental delta or prefetch slice given up front, plus
+        # every search result of this run. They count as analysed once the report is published.
+        self.news_items = list(news_items or [])
+        # Replays and benchmarks run offline: no Slack post, no report history update
+        self.publish = publish
+        if verbose is not None:
+            self.verbose = verbose
+        if stream_report is not None:
+            self.stream_report = stream_report
+        if parallel_research is not None:
+            self.parallel_research = parallel_research
+        if research_max_parallel is not None:
+            self.research_max_parallel = research_max_parallel
+        self._research_slots = research_slots(self.research_max_parallel)
+        # RunCheckpoint of a failed run to continue: same run ID, mode and report file
+        self.resume = resume
+        if resume is not None:
+            self.incremental = resume.mode.get('incremental', False)
+            self.prefetched = resume.mode.get('prefetched', False)
+            self.parallel_research = resume.mode.get('parallel_research', self.parallel_research)
+            if news_items is None:
+                # Restored research tasks do not search again; their items are still recorded on publish
+                self.news_items = list(resume.news_items)
+        self._publish_error = None
+        self._published = False
+        self._run_token = None
+        self._log_token = None
+        self._report_stream = None
+        self._section_delivery = None
+
+    def _llm(self, stream=False):
+        """
+        LLM for the agents: the record/replay session's when one is active, else crewai's default.
+
+        Parameters:
+        - stream: Stream the completions so the report can be published while it is generated
+        """
+        session = get_active_session()
+        llm = session.llm() if session is not None else None
+        if stream:
+            if llm is None:
+                from crewai.utilities.llm_utils import create_llm
+                llm = create_llm(None)
+            if not enable_streaming(llm):
+                logger.debug("LLM %s does not stream; the report is published when it is complete", llm)
+        return llm
+
+    def _reporting_task(self):
+        """The task that writes the report file, if any."""
+        for task in self.tasks:
+            if hasattr(task, 'output_file') and task.output_file:
+                return task
+        return None
+
+    def _built_agents(self):
+        # CrewBase builds every @agent on construction; the methods are memoized per crew
+        return [build(self) for build in self._original_agents.values()]
+
+    def release_agents(self):
+        """Stop the rate-limit timers of every agent this crew built, once it will not run (again)."""
+        stop_rpm_timers(self._built_agents())
+
+    def _split_research(self):
+        """Whether this run researches with the parallel sub-tasks (incremental and prefetched runs do not search)."""
+        return self.parallel_research and not self.incremental and not self.prefetched
+
+    def report_path(self):
+        """Path of the report written by this crew's reporting task, if any."""
+        task = self._reporting_task()
+        return task.output_file if task is not None else None
 
     @before_kickoff
     def before_kickoff_function(self, inputs):
-        print(f"************************** Before kickoff function with inputs: {inputs}")
-        self.inputs = inputs
+        # Correlation ID for every span and log line of this run, including Slack delivery
+        self.run_id = self.resume.run_id if self.resume is not None else new_run_id()
+        self._run_token = bind_run(self.run_id)
+        # This run's task, tool and LLM events go to its own log file, written in the background
+        log_sink = get_log_sink()
+        if log_sink is not None:
+            self._log_token = log_sink.open_run(inputs.get('stock_symbol'), self.run_id)
+        with span("crew.before_kickoff", stock_symbol=inputs.get('stock_symbol', '')):
+            logger.info("Starting run %s with inputs: %s", self.run_id, inputs)
+            if self._split_research() and inputs.get('stock_symbol'):
+                for key, value in sector_inputs(inputs['stock_symbol']).items():
+                    inputs.setdefault(key, value)
+            if inputs.get('stock_symbol'):
+                inputs.setdefault('volatility_context', self._volatility_context(inputs['stock_symbol']))
+            self.inputs = inputs
+            self._start_checkpoint(inputs)
+            if self.stream_report and self._reporting_task() is not None:
+                self._report_stream = ReportStream(self._reporting_task(), on_section=self._publish_section,
+                                                   on_abort=self._close_sections)
+                watch_task(self._report_stream.task, self._report_stream)
         return inputs
 
+    def _start_checkpoint(self, inputs):
+        # Tasks completed in the run being resumed return their saved output instead of running
+        if not self.checkpoints and self.resume is None:
+            return
+        store = get_checkpoint_store()
+        mode = {'incremental': self.incremental, 'prefetched': self.prefetched,
+                'parallel_research': self.parallel_research}
+        store.start_run(self.run_id, inputs.get('stock_symbol', ''), inputs, mode, self.news_items)
+        restored = self.resume.outputs if self.resume is not None else {}
+        for task in self.tasks:
+            if isinstance(task, ResumableTask):
+                task.checkpoint_to(store, self.run_id, restored.get(task.name))
+        if self.resume is not None:
+            stage = self.resume.first_incomplete([task.name for task in self.tasks]) or PUBLISH_STAGE
+            logger.info("Resuming run %s of %s at %s", self.run_id, self.resume.symbol, stage)
+
+    def _finish_publish(self, deliveries):
+        """
+        Called once every Slack delivery of the report has finished: remember the
+        news the report covered, and mark the run completed, or failed at the
+        publish stage so `--resume` posts the report again.
+        """
+        errors = [str(self._publish_error)] if self._publish_error is not None else []
+        for future in deliveries:
+            if future.exception() is not None:
+                errors.append(str(future.exception()))
+            elif not future.result():
+                errors.append("Slack delivery failed")
+        if errors:
+            logger.error("Publishing the report of run %s failed: %s", self.run_id, "; ".join(errors))
+            self.fail_checkpoint(f"{PUBLISH_STAGE}: {'; '.join(errors)}")
+            return
+        if self._published:
+            self._record_news_items()
+        if self.checkpoints or self.resume is not None:
+            get_checkpoint_store().finish_run(self.run_id)
+
+    def fail_checkpoint(self, error):
+        """Record that the run failed, so `--resume` can pick it up."""
+        if self.run_id is not None and (self.checkpoints or self.resume is not None):
+            get_checkpoint_store().fail_run(self.run_id, error, self.news_items)
+
+    def abort(self, error):
+        """
+        Clean up after a kickoff that raised, which skips after_kickoff: post the
+        report sections already streamed, release the agents and the run's log
+        file and record the failure so `--resume` can pick the run up.
+        """
+        self._close_sections()
+        try:
+            self.fail_checkpoint(error)
+        finally:
+            self._end_run()
+
+    def _end_run(self):
+        # Agents of restored tasks never executed, so crewai did not stop their timers
+        self.release_agents()
+        if self._report_stream is not None:
+            unwatch_task(self._report_stream.task)
+        if self._log_token is not None:
+            get_log_sink().close_run(self._log_token)
+            self._log_token = None
+        if self._run_token is not None:
+            unbind_run(self._run_token)
+            self._run_token = None
+
+    def _volatility_context(self, symbol):
+        """
+        Volatility figures for the analyst's prompt, computed from the local
+        market data before the run so the analyst neither searches nor guesses them.
+        """
+        try:
+            summary = VolatilitySnapshotTool()._run(stock_symbol=symbol)
+        except Exception as e:
+            # The figures are optional; a malformed data file must not abort the run
+            logger.warning("Could not compute the volatility context for %s: %s", symbol, e)
+            summary = {"error": f"The local market data for {symbol.upper()} could not be read."}
+        if "error" in summary:
+            logger.info("No volatility context for %s: %s", symbol, summary["error"])
+            return f"Not available ({summary['error']}) Do not quote implied volatility figures you cannot source."
+        return format_volatility_summary(summary)
+
     @after_kickoff
     def after_kickoff_function(self, result):
-        #print(f"************************************* After kickoff function with result: {result}")
-        
-        # Get the output_filename from the reporting task
-        output_filename = None
-        print("Before kickoff function: Checking for output file in tasks")
+        try:
+            with span("crew.after_kickoff", stock_symbol=self.inputs.get('stock_symbol', '')):
+                deliveries = self._publish_report()
+            # Async deliveries settle in the background; flush_deliveries() waits for them
+            when_delivered(deliveries, self._finish_publish)
+        finally:
+            self._end_run()
+        return result
+
+    def _publish_section(self, index, section):
+        """Post one finished section of the report being streamed."""
+        if not self.publish:
+            return
+        if self._section_delivery is None:
+            self._section_delivery = SectionDelivery(self.slack_channel, os.path.basename(self.report_path()))
+        self._section_delivery.submit(section)
+
+    def _close_sections(self):
+        # The streamed report ended or failed; sections already queued are still posted
+        if self._section_delivery is not None:
+            self._section_delivery.close()
+
+    def _publish_report(self):
+        """
+        Index the report and hand it to Slack.
+
+        Returns:
+        - Futures of the Slack deliveries still going out, each resolving to True/False
+        """
+        output_filename = self.report_path()
+        logger.debug("Report output file: %s", output_filename)
+
+        if not self.publish:
+            logger.info("Publishing disabled for this run. Nothing sent to Slack.")
+            return []
 
-        for task in self.tasks:
-            if hasattr(task, 'output_file') and task.output_file:
-                output_filename = task.output_file
-                break
-        print("After kickoff function: output_filename = ", output_filename)
-        
         # If we found an output file, send it to Slack
         if output_filename and os.path.exists(output_filename):
-            print(f"After kickoff - found output file: {output_filename}")
             try:
-                # Initialize our Slack messenger and send the report
-                slack = SlackMessenger()
-                slack.send_report(self.slack_channel, output_filename)
+                # Keep a short summary so the next incremental run can build on this report
+                with open(output_filename, 'r') as file:
+                    get_news_store().record_report(
+                        self.inputs.get('stock_symbol', ''), summarize_report(file.read()), output_filename
+                    )
             except Exception as e:
-                print(f"Error in Slack integration: {str(e)}")
+                logger.error("Error recording report summary: %s", e)
+            try:
+                # Searchable history: symbol, time, sections and cited URLs
+                get_report_store().add_file(output_filename, symbol=self.inputs.get('stock_symbol'), run_id=self.run_id)
+            except Exception as e:
+                logger.error("Error indexing report: %s", e)
+            self._published = True
+            try:
+                if self._section_delivery is not None:
+                    # Already posted section by section while the report was written
+                    self._section_delivery.close()
+                    if not self.slack_async_delivery:
+                        self._section_delivery.wait()
+                    return [self._section_delivery.result]
+                elif self.slack_async_delivery:
+                    return list(get_delivery_queue().submit_report(self.slack_channel, output_filename).values())
+                else:
+                    # Initialize our Slack messenger and send the report
+                    slack = SlackMessenger()
+                    failed = [channel for channel in parse_channels(self.slack_channel)
+                              if not slack.send_report(channel, output_filename)]
+                    if failed:
+                        self._publish_error = f"Slack delivery to {', '.join(failed)} failed"
+            except Exception as e:
+                logger.error("Error in Slack integration: %s", e)
+                self._publish_error = e
         else:
-            print("No output file found or file does not exist. Nothing sent to Slack.")
-            
-        return result
+            logger.warning("No output file found or file does not exist. Nothing sent to Slack.")
+        return []
+
+    def _collect_news_items(self, items):
+        # Search tools report what they handed to the agents; the research sub-tasks call this concurrently
+        self.news_items.extend(items)
+
+    def _record_news_items(self):
+        """Remember the news this run's report covered, so the next incremental run skips it."""
+        try:
+            get_news_store().record(self.inputs.get('stock_symbol', ''), self.news_items)
+        except Exception as e:
+            logger.error("Error recording analysed news items: %s", e)
+
+    def _search_tools(self):
+        return [MultiQuerySearchTool(on_results=self._collect_news_items),
+                DuckDuckGoSearchTool(on_results=self._collect_news_items)]
 
     @agent
     def researcher(self) -> Agent:
-        print("************************** Creating researcher agent")
-        return Agent(
+        return attach_request_budget(Agent(
             config=self.agents_config['researcher'],
-            verbose=True,
-            tools=[DuckDuckGoSearchTool()],
+            llm=self._llm(),
+            verbose=self.verbose,
+            tools=[] if self.incremental or self.prefetched else self._search_tools(),
             max_rpm=10
-        )
+        ), self.request_budget)
+
+    @agent
+    def catalyst_researcher(self) -> Agent:
+        return attach_request_budget(Agent(
+            config=self.agents_config['catalyst_researcher'],
+            llm=self._llm(),
+            verbose=self.verbose,
+            tools=self._search_tools(),
+            max_rpm=10
+        ), self.request_budget)
+
+    @agent
+    def sector_researcher(self) -> Agent:
+        return attach_request_budget(Agent(
+            config=self.agents_config['sector_researcher'],
+            llm=self._llm(),
+            verbose=self.verbose,
+            tools=self._search_tools(),
+            max_rpm=10
+        ), self.request_budget)
 
     @agent
     def reporting_analyst(self) -> Agent:
-        print("************************** Creating reporting analyst agent")
-        return Agent(
+        return attach_request_budget(Agent(
             config=self.agents_config['reporting_analyst'],
-            verbose=True,
+            llm=self._llm(stream=self.stream_report),
+            verbose=self.verbose,
             max_rpm=10
-        )
+        ), self.request_budget)
+
+    def _rank_findings(self, output, share=1.0):
+        """
+        Guardrail of the research tasks: keep the researcher's most relevant and
+        recent items within the analyst's token budget (NEWS_TOKEN_BUDGET, NEWS_MAX_ITEMS).
+
+        Parameters:
+        - output: TaskOutput of the research task
+        - share: Fraction of the budget this task's findings may use
+        """
+        items = parse_research_items(output.raw)
+        if not items:
+            # Nothing structured to rank; hand the answer on unchanged
+            return True, output.raw
+        symbol = self.inputs.get('stock_symbol', '')
+        ranked = rank_news(items, symbol, get_ticker_profile(symbol).aliases,
+                           token_budget=int(DEFAULT_TOKEN_BUDGET * share),
+                           max_items=max(1, round(DEFAULT_MAX_ITEMS * share)))
+        logger.info("Research findings for %s (%s): kept %d of %d items for the analyst",
+                    symbol, output.name or "research", len(ranked), len(items))
+        return True, render_research_items(ranked)
+
+    def _research_subtask(self, config_name):
+        # Async sub-task sharing this crew's semaphore and its slice of the news budget
+        share = RESEARCH_SUBTASKS[config_name][1]
+        return LimitedAsyncTask(
+            config=self.tasks_config[config_name],
+            output_pydantic=ResearchFindings,
+            guardrail=lambda output: self._rank_findings(output, share),
+            async_execution=True,
+        ).limit(self._research_slots)
 
     @task
     def research_task(self) -> Task:
-        print("************************** Creating research task")
-        return Task(
-            config=self.tasks_config['research_task'],
+        if self.incremental:
+            config_name = 'incremental_research_task'
+        elif self.prefetched:
+            config_name = 'prefetched_research_task'
+        else:
+            config_name = 'research_task'
+        return ResumableTask(
+            config=self.tasks_config[config_name],
+            output_pydantic=ResearchFindings,
+            guardrail=self._rank_findings,
         )
 
+    @task
+    def company_news_task(self) -> Task:
+        return self._research_subtask('company_news_task')
+
+    @task
+    def catalyst_task(self) -> Task:
+        return self._research_subtask('catalyst_task')
+
+    @task
+    def sector_news_task(self) -> Task:
+        return self._research_subtask('sector_news_task')
+
     @task
     def reporting_task(self) -> Task:
-        print("************************** Creating reporting task")
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        print(f"########### reporting_task -  INPUT: {self.inputs.get('stock_symbol')} ##############")
-
-        output_filename = f'output/{self.inputs.get('stock_symbol')}_report_{timestamp}.md'
+        # Tasks are built before kickoff, so leave {stock_symbol} for crewai to interpolate
+        # from the kickoff inputs. This keeps concurrent crews from sharing one file name.
+        output_filename = f'output/{{stock_symbol}}_report_{timestamp}.md'
+        if self.resume is not None and self.resume.report_path:
+            # A resumed run rewrites and republishes the report file of the failed run
+            output_filename = self.resume.report_path
 
         self.output_filename = output_filename
 
-        return Task(
-            config=self.tasks_config['reporting_task'],
+        config_name = 'incremental_reporting_task' if self.incremental else 'reporting_task'
+        return ResumableTask(
+            config=self.tasks_config[config_name],
             output_file=output_filename
         )
 
     @crew
     def crew(self) -> Crew:
-        print("************************** Creating the LatestMarketNewsTrendCrew crew")
         """Creates the LatestMarketNewsTrendCrew crew"""
+        # Every @task is built; keep the research tasks of this run's mode
+        if self._split_research():
+            research = [self.company_news_task(), self.catalyst_task(), self.sector_news_task()]
+        else:
+            research = [self.research_task()]
+        reporting = self.reporting_task()
+        reporting.context = research
+        self.tasks = research + [reporting]
+        self.agents = list({id(t.agent): t.agent for t in self.tasks}.values())
+        # The other mode's agents were built too but never run; their rpm timers would outlive the crew
+        kept = {id(a) for a in self.agents}
+        stop_rpm_timers(a for a in self._built_agents() if id(a) not in kept)
         return Crew(
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential,
-            verbose=True,
-            output_log_file = "crew_run.log"
-        )
\ No newline at end of file
+            verbose=self.verbose,
+        )
+
+
+# Installed on the CrewBase wrapper, which defines its own load_yaml
+LatestMarketNewsTrendCrew.load_yaml = staticmethod(load_yaml_cached)
@@ -0,0 +1,88 @@
+"""
+Import-time budget for the CLI entry points.
+
+Every command starts a fresh interpreter, so whatever `market_update.main`
+imports at module level is paid by every invocation (and by every process of
+a scheduled job that starts one process per ticker). This measures the
+cumulative import time reported by `python -X importtime` and fails when it
+exceeds the budget.
+
+Usage: check_import_time [--budget-ms 150] [--runs 5] [MODULE ...]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+DEFAULT_IMPORT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "150"))
+DEFAULT_MODULES = ["market_update.main"]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(output):
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+    - List of (module, self_us, cumulative_us, depth) tuples
+    """
+    entries = []
+    for line in output.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2)), depth))
+    return entries
+
+
+def measure_import_time(module, runs=5):
+    """
+    Import `module` in `runs` fresh interpreters.
+
+    Returns:
+    - (median cumulative milliseconds, entries of the median run)
+    """
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+        entries = parse_importtime(completed.stderr)
+        total = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), None)
+        if total is None:
+            raise RuntimeError(f"No importtime entry for {module}")
+        samples.append((total / 1000, entries))
+    samples.sort(key=lambda sample: sample[0])
+    return samples[len(samples) // 2]
+
+
+def check_import_time():
+    parser = argparse.ArgumentParser(prog="check_import_time", description="Fail when CLI imports exceed a time budget.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(sys.argv[1:])
+
+    failed = False
+    for module in args.modules:
+        total_ms, entries = measure_import_time(module, args.runs)
+        within = total_ms <= args.budget_ms
+        print(f"{module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {'OK' if within else 'OVER BUDGET'}")
+        if not within:
+            failed = True
+            print("Slowest top-level imports:")
+            top = sorted((e for e in entries if e[3] == 1), key=lambda e: e[2], reverse=True)[:10]
+            for name, _, cumulative, _ in top:
+                print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    check_import_time()
@@ -0,0 +1,116 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from .crew import LatestMarketNewsTrendCrew
+from .news_store import get_news_store
+from .tools.multi_search_tool import MultiQuerySearchTool
+
+
+logger = logging.getLogger(__name__)
+
+NO_PREVIOUS_REPORT = "No previous report is available; treat every item as new."
+
+
+@dataclass
+class IncrementalPlan:
+    """What an incremental run for one symbol has to analyse."""
+    stock_symbol: str
+    new_items: List[dict] = field(default_factory=list)
+    seen_count: int = 0
+    previous_summary: Optional[str] = None
+
+    @property
+    def has_new_news(self):
+        return bool(self.new_items)
+
+    def inputs(self, current_datetime=None):
+        """Kickoff inputs for the incremental crew."""
+        return {
+            'stock_symbol': self.stock_symbol,
+            'current_datetime': current_datetime or str(datetime.now()),
+            'news_delta': format_news_items(self.new_items),
+            'previous_report_summary': self.previous_summary or NO_PREVIOUS_REPORT,
+        }
+
+
+def format_news_items(items):
+    """Render news items as a compact numbered list for the task prompt."""
+    lines = []
+    for i, item in enumerate(items, 1):
+        parts = [item.get("title") or item.get("snippet", "")[:120]]
+        if item.get("source"):
+            parts.append(item["source"])
+        if item.get("date"):
+            parts.append(item["date"])
+        line = f"{i}. " + " | ".join(p for p in parts if p)
+        if item.get("snippet"):
+            line += f"\n   {item['snippet']}"
+        if item.get("link"):
+            line += f"\n   {item['link']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def plan_incremental_run(stock_symbol, store=None, search_tool=None, items=None):
+    """
+    Fetch the current news window for a symbol without the LLM and keep only
+    the items that no earlier run has analysed.
+
+    Parameters:
+    - items: News items already fetched for the symbol (e.g. by the batch prefetch); searched when None
+    """
+    store = store or get_news_store()
+    if items is None:
+        search_tool = search_tool or MultiQuerySearchTool()
+        items = search_tool._run(stock_symbol=stock_symbol).get("results", [])
+    new_items, seen_items = store.partition(stock_symbol, items)
+    return IncrementalPlan(
+        stock_symbol=stock_symbol,
+        new_items=new_items,
+        seen_count=len(seen_items),
+        previous_summary=store.last_report_summary(stock_symbol),
+    )
+
+
+def prepare_incremental(stock_symbol, request_budget=None, store=None, verbose=None, publish=True, items=None,
+                        stream_report=None):
+    """
+    Plan an incremental run and build its crew.
+    `items` are news items already fetched for the symbol; they are searched when None.
+
+    Returns:
+    - (crew, kickoff inputs), or (None, None) when there was no new news and the LLM can be skipped
+    """
+    store = store or get_news_store()
+    plan = plan_incremental_run(stock_symbol, store=store, items=items)
+    logger.info("Incremental run for %s: %d new items, %d already analysed",
+                stock_symbol, len(plan.new_items), plan.seen_count)
+    if not plan.has_new_news:
+        logger.info("No new news for %s; skipping LLM analysis.", stock_symbol)
+        return None, None
+
+    # The crew remembers the new items (and the report summary) once the report covering them is published
+    crew_instance = LatestMarketNewsTrendCrew(request_budget=request_budget, incremental=True, verbose=verbose,
+                                              publish=publish, stream_report=stream_report, news_items=plan.new_items)
+    return crew_instance, plan.inputs()
+
+
+def run_incremental(stock_symbol, request_budget=None, store=None, verbose=None, publish=True, items=None):
+    """
+    Run the crew on only the news that is new since the previous run.
+    `items` are news items already fetched for the symbol; they are searched when None.
+
+    Returns:
+    - The CrewOutput, or None when there was no new news and the LLM was skipped
+    """
+    crew_instance, inputs = prepare_incremental(stock_symbol, request_budget=request_budget, store=store,
+                                                verbose=verbose, publish=publish, items=items)
+    if crew_instance is None:
+        return None
+    try:
+        return crew_instance.crew().kickoff(inputs=inputs)
+    except Exception as e:
+        crew_instance.abort(e)
+        raise
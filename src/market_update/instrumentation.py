@@ -0,0 +1,418 @@
+"""
+Tracing and metrics for crew runs.
+
+Spans time the kickoff hooks, every task, every tool invocation and every
+Slack call. Each span carries the correlation ID of the crew run it belongs
+to, and its duration feeds a latency histogram. Counters and histograms are
+exported on exit to a Prometheus text file (`*.prom`, suitable for the
+node_exporter textfile collector) or an OTLP-compatible JSON file (`*.json`);
+finished spans can be appended as OTLP-style JSON lines.
+
+Instrumentation is off unless METRICS_EXPORT_PATH or TRACE_EXPORT_PATH is set
+(or `enable()` is called). When it is off, `span()` returns a shared no-op
+object and the metric helpers return after a single flag check.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(run_id)s] %(name)s: %(message)s"
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+
+SERVICE_NAME = "market_update"
+METRIC_PREFIX = "market_update_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger(__name__)
+
+_run_id = contextvars.ContextVar("market_update_run_id", default=None)
+_current_span = contextvars.ContextVar("market_update_span", default=None)
+
+_enabled = False
+_registry = None
+_trace_path = None
+_metrics_path = None
+_trace_lock = threading.Lock()
+_setup_lock = threading.Lock()
+
+
+class MetricsRegistry:
+    """In-process counters and fixed-bucket latency histograms keyed by name and labels."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.start_time = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                          for k, v in self._histograms.items()}
+        return counters, histograms
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        counters, histograms = self.snapshot()
+        lines = []
+        for name in sorted({k[0] for k in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{METRIC_PREFIX}{name}{_prom_labels(labels)} {value}")
+        for name in sorted({k[0] for k in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_prom_labels(labels + (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_prom_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_prom_labels(labels)} {histogram['sum']}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_prom_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_otlp_json(self):
+        """Render all metrics as an OTLP/JSON ExportMetricsServiceRequest."""
+        counters, histograms = self.snapshot()
+        start, now = str(int(self.start_time * 1e9)), str(time.time_ns())
+        metrics = {}
+        for (name, labels), value in sorted(counters.items()):
+            metric = metrics.setdefault(name, {
+                "name": METRIC_PREFIX + name,
+                "sum": {"dataPoints": [], "aggregationTemporality": 2, "isMonotonic": True},
+            })
+            metric["sum"]["dataPoints"].append({
+                "attributes": _otlp_attributes(labels),
+                "startTimeUnixNano": start,
+                "timeUnixNano": now,
+                "asDouble": float(value),
+            })
+        for (name, labels), histogram in sorted(histograms.items()):
+            metric = metrics.setdefault(name, {
+                "name": METRIC_PREFIX + name,
+                "unit": "s",
+                "histogram": {"dataPoints": [], "aggregationTemporality": 2},
+            })
+            metric["histogram"]["dataPoints"].append({
+                "attributes": _otlp_attributes(labels),
+                "startTimeUnixNano": start,
+                "timeUnixNano": now,
+                "count": str(histogram["count"]),
+                "sum": histogram["sum"],
+                "bucketCounts": [str(c) for c in histogram["buckets"]]
+                                + [str(histogram["count"] - sum(histogram["buckets"]))],
+                "explicitBounds": [float(b) for b in self.buckets],
+            })
+        return {
+            "resourceMetrics": [{
+                "resource": {"attributes": _otlp_attributes((("service.name", SERVICE_NAME),))},
+                "scopeMetrics": [{"scope": {"name": SERVICE_NAME}, "metrics": list(metrics.values())}],
+            }]
+        }
+
+    def export(self, path):
+        """Write all metrics to `path`: OTLP JSON for *.json, Prometheus text otherwise."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith(".json"):
+            content = json.dumps(self.to_otlp_json())
+        else:
+            content = self.to_prometheus()
+        # Write then rename so scrapers never read a half-written file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+
+def _prom_escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in labels) + "}"
+
+
+def _otlp_attributes(items):
+    return [{"key": k, "value": {"stringValue": str(v)}} for k, v in items]
+
+
+class Span:
+    """A timed operation; use as a context manager."""
+
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "run_id", "start", "start_ns", "status", "_token")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.run_id = _run_id.get()
+        self.span_id = uuid.uuid4().hex[:16]
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes.setdefault("error", exc_type.__name__)
+        _finish_span(self.name, duration, self.status, self.attributes,
+                     self.run_id, self.span_id, self.parent_id, self.start_ns)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+    status = "ok"
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _finish_span(name, duration, status, attributes, run_id, span_id, parent_id, start_ns):
+    _registry.observe("span_duration_seconds", duration, span=name)
+    _registry.increment("spans_total", span=name, status=status)
+    logger.debug("span %s %s %.3fs %s", name, status, duration, attributes)
+    if _trace_path is None:
+        return
+    record = {
+        "traceId": run_id or "0" * 32,
+        "spanId": span_id,
+        "parentSpanId": parent_id or "",
+        "name": name,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(start_ns + int(duration * 1e9)),
+        "attributes": _otlp_attributes(sorted(attributes.items())),
+        "status": {"code": 1 if status == "ok" else 2},
+    }
+    line = json.dumps(record, default=str)
+    with _trace_lock:
+        with open(_trace_path, "a") as file:
+            file.write(line + "\n")
+
+
+def enabled():
+    return _enabled
+
+
+def enable(metrics_path=None, trace_path=None):
+    """
+    Turn instrumentation on for this process.
+
+    Parameters:
+    - metrics_path: File the metrics are exported to on exit (*.prom or *.json)
+    - trace_path: File finished spans are appended to as JSON lines
+    """
+    global _enabled, _registry, _metrics_path, _trace_path
+    with _setup_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+            atexit.register(export_metrics)
+        _metrics_path = metrics_path or _metrics_path
+        _trace_path = trace_path or _trace_path
+        if _trace_path and os.path.dirname(_trace_path):
+            os.makedirs(os.path.dirname(_trace_path), exist_ok=True)
+        _install_crewai_listeners()
+        _enabled = True
+
+
+def get_registry():
+    return _registry
+
+
+def export_metrics(path=None):
+    """Write the current metrics to `path` or the configured export path."""
+    path = path or _metrics_path
+    if _registry is None or not path:
+        return None
+    try:
+        _registry.export(path)
+    except OSError as e:
+        logger.error("Could not export metrics to %s: %s", path, e)
+        return None
+    return path
+
+
+def span(name, **attributes):
+    """Time a block as a span of the current run: `with span("slack.post", channel=c): ...`"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def increment(name, value=1, **labels):
+    if _enabled:
+        _registry.increment(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if _enabled:
+        _registry.observe(name, value, **labels)
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+def current_run_id():
+    return _run_id.get()
+
+
+def bind_run(run_id=None):
+    """
+    Set the correlation ID for the current context.
+
+    Returns:
+    - Token for `unbind_run`
+    """
+    return _run_id.set(run_id or new_run_id())
+
+
+def unbind_run(token):
+    try:
+        _run_id.reset(token)
+    except ValueError:
+        # Reset from a different context than the one that bound it
+        _run_id.set(None)
+
+
+class RunIdFilter(logging.Filter):
+    """Stamp every log record with the current run's correlation ID as `run_id`."""
+
+    def filter(self, record):
+        record.run_id = _run_id.get() or "-"
+        return True
+
+
+def configure_logging(level=None):
+    """Send the package's log records to stderr, tagged with the run's correlation ID."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RunIdFilter())
+    package_logger = logging.getLogger("market_update")
+    package_logger.setLevel((level or LOG_LEVEL).upper())
+    package_logger.handlers[:] = [handler]
+    package_logger.propagate = False
+
+
+_task_spans = {}
+_listeners_installed = False
+
+
+def _install_crewai_listeners():
+    # Task and tool spans come from crewai's event bus, which calls handlers
+    # synchronously in the thread that runs the task, so the run ID is in scope
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+    from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageFinishedEvent
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        if not _enabled:
+            return
+        task = event.task or source
+        name = getattr(task, "name", None) or "task"
+        role = getattr(getattr(task, "agent", None), "role", "") or ""
+        task_span = Span("task", {"task": name, "agent": role.strip()})
+        _task_spans[id(task)] = task_span.__enter__()
+
+    def finish_task(source, event, failed):
+        task_span = _task_spans.pop(id(event.task or source), None)
+        if task_span is None:
+            return
+        if failed:
+            task_span.status = "error"
+            task_span.set("error", str(getattr(event, "error", ""))[:200])
+        task_span.__exit__(None, None, None)
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        finish_task(source, event, failed=False)
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        finish_task(source, event, failed=True)
+
+    @crewai_event_bus.on(ToolUsageFinishedEvent)
+    def on_tool_finished(source, event):
+        if not _enabled:
+            return
+        duration = (event.finished_at - event.started_at).total_seconds()
+        parent = _current_span.get()
+        _finish_span(
+            "tool", duration, "ok",
+            {"tool": event.tool_name, "agent": (getattr(event.agent, "role", None) or event.agent_role or "").strip(),
+             "from_cache": event.from_cache},
+            _run_id.get(), uuid.uuid4().hex[:16], parent.span_id if parent else None,
+            int(event.started_at.timestamp() * 1e9),
+        )
+
+    @crewai_event_bus.on(ToolUsageErrorEvent)
+    def on_tool_error(source, event):
+        increment("tool_errors_total", tool=event.tool_name)
+
+    _listeners_installed = True
+
+
+if METRICS_EXPORT_PATH or TRACE_EXPORT_PATH:
+    enable(METRICS_EXPORT_PATH, TRACE_EXPORT_PATH)
@@ -0,0 +1,390 @@
+"""
+Non-blocking log files for crew runs.
+
+Replaces crewai's `output_log_file`, which appends every task event to one
+ever-growing crew_run.log from the thread running the task. Here log records
+are put on a bounded in-memory queue and written by a single background
+thread, so agents never wait for the disk and concurrent runs do not
+interleave their lines:
+
+- CREW_LOG_FILES=ticker (default): one file per ticker, logs/<SYMBOL>.log
+- CREW_LOG_FILES=run: one file per run, logs/<SYMBOL>/<SYMBOL>_<time>_<run>.log,
+  gzipped when the run finishes
+- CREW_LOG_FILES=off: no log files
+
+Files rotate when they reach LOG_MAX_BYTES or are LOG_ROTATE_HOURS old and
+rotated files are gzipped; LOG_BACKUP_COUNT rotations are kept per file and
+files older than LOG_RETENTION_DAYS are removed. Records logged outside a
+crew run (and the package's own log lines) go to logs/market_update.log.
+
+CREW_LOG_LEVEL sets how much of each run is written: ERROR (failures only),
+INFO (crew, task and tool progress) or DEBUG (also every LLM call and the
+full task outputs).
+"""
+import atexit
+import contextvars
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from .instrumentation import LOG_FORMAT, RunIdFilter, current_run_id, increment
+
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+CREW_LOG_FILES = os.getenv("CREW_LOG_FILES", "ticker").lower()
+CREW_LOG_LEVEL = os.getenv("CREW_LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "14"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+FILE_MODES = ("ticker", "run", "off")
+# Name of the file for records logged outside a crew run
+MAIN_LOG = "market_update"
+# Files kept open at once by the writer thread; the least recently used is closed first
+MAX_OPEN_FILES = 32
+# Longest task output or LLM response excerpt written at INFO
+EXCERPT_CHARS = 300
+
+# Logger for the crew's task, tool and LLM events (the former crew_run.log content)
+crew_logger = logging.getLogger("market_update.crew_log")
+
+_log_key = contextvars.ContextVar("market_update_log_key", default=None)
+
+
+def _gzip_rotate(source, dest):
+    # Rotator of the file handlers: compress the rotated file instead of renaming it
+    if not os.path.exists(source):
+        return
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _excerpt(value, limit=EXCERPT_CHARS):
+    text = " ".join(str(value or "").split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that also rotates by age and gzips rotated files
+    (<file>.1.gz is the newest).
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, max_age_hours=LOG_ROTATE_HOURS,
+                 backup_count=LOG_BACKUP_COUNT):
+        """
+        Parameters:
+        - filename: Path of the log file
+        - max_bytes: Rotate before the file would exceed this size (0: no size limit)
+        - max_age_hours: Rotate once the file has been written to for this long (0: no age limit)
+        - backup_count: Rotated files to keep
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=max(1, backup_count), encoding="utf-8",
+                         delay=True)
+        self.max_age_seconds = max_age_hours * 3600
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotate
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self):
+        if not self.max_age_seconds:
+            return None
+        # An existing file keeps the age it already has
+        started = os.path.getmtime(self.baseFilename) if os.path.exists(self.baseFilename) else time.time()
+        return started + self.max_age_seconds
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.max_age_seconds if self.max_age_seconds else None
+
+
+class RunLogRouter(logging.Handler):
+    """
+    Writes each record to the file of the run or ticker it belongs to.
+
+    Only the sink's writer thread calls it, so it needs no locking of its own.
+    A run's file is closed (and in per-run mode gzipped) when the run's close
+    marker comes through the queue, after every record the run logged.
+    """
+
+    def __init__(self, directory, max_bytes=LOG_MAX_BYTES, max_age_hours=LOG_ROTATE_HOURS,
+                 backup_count=LOG_BACKUP_COUNT):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_hours = max_age_hours
+        self.backup_count = backup_count
+        self._files = OrderedDict()
+        self._formatter = logging.Formatter(LOG_FORMAT)
+
+    def _file(self, key):
+        handler = self._files.get(key)
+        if handler is not None:
+            self._files.move_to_end(key)
+            return handler
+        path = os.path.join(self.directory, key + ".log")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = CompressingRotatingFileHandler(path, self.max_bytes, self.max_age_hours, self.backup_count)
+        handler.setFormatter(self._formatter)
+        self._files[key] = handler
+        while len(self._files) > MAX_OPEN_FILES:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return handler
+
+    def handle(self, record):
+        close_key = getattr(record, "close_log", None)
+        if close_key is not None:
+            self._close(close_key, compress=getattr(record, "compress_log", False))
+            return True
+        return super().handle(record)
+
+    def emit(self, record):
+        self._file(getattr(record, "log_key", None) or MAIN_LOG).handle(record)
+
+    def _close(self, key, compress=False):
+        handler = self._files.pop(key, None)
+        if handler is not None:
+            handler.close()
+        path = os.path.join(self.directory, key + ".log")
+        if compress and os.path.exists(path):
+            _gzip_rotate(path, path + ".gz")
+
+    def close(self):
+        while self._files:
+            self._files.popitem()[1].close()
+        super().close()
+
+
+class _LogKeyFilter(logging.Filter):
+    # Runs in the logging thread: stamps the run ID and the file the record belongs to
+
+    def __init__(self):
+        super().__init__()
+        self._run_ids = RunIdFilter()
+
+    def filter(self, record):
+        self._run_ids.filter(record)
+        record.log_key = _log_key.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Never blocks the logging thread: records that do not fit in the queue are dropped and counted
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            increment("log_records_dropped_total")
+
+
+class LogSink:
+    """
+    Queue-based log backend: loggers hand records to a bounded queue and a
+    background QueueListener writes them to per-run or per-ticker files.
+    """
+
+    def __init__(self, directory=LOG_DIR, mode=CREW_LOG_FILES, level=CREW_LOG_LEVEL, max_bytes=LOG_MAX_BYTES,
+                 max_age_hours=LOG_ROTATE_HOURS, backup_count=LOG_BACKUP_COUNT,
+                 retention_days=LOG_RETENTION_DAYS, queue_size=LOG_QUEUE_SIZE):
+        """
+        Parameters:
+        - directory: Directory of the log files
+        - mode: 'ticker' (one file per ticker) or 'run' (one file per run)
+        - level: Level of the crew's event log (ERROR, WARNING, INFO or DEBUG)
+        - max_bytes, max_age_hours, backup_count: Rotation of each file
+        - retention_days: Remove log files older than this (0 keeps them)
+        - queue_size: Records buffered for the writer thread before new ones are dropped
+        """
+        if mode not in FILE_MODES:
+            raise ValueError(f"Unknown log file mode {mode!r}; use one of {', '.join(FILE_MODES)}.")
+        self.directory = directory
+        self.mode = mode
+        self.level = level
+        self.retention_days = retention_days
+        self.queue = queue.Queue(queue_size)
+        self.router = RunLogRouter(directory, max_bytes, max_age_hours, backup_count)
+        self.handler = _DroppingQueueHandler(self.queue)
+        self.handler.addFilter(_LogKeyFilter())
+        self._listener = logging.handlers.QueueListener(self.queue, self.router)
+        self._started = False
+
+    @property
+    def dropped(self):
+        """Records dropped because the writer thread fell behind."""
+        return self.handler.dropped
+
+    def start(self):
+        """Start the writer thread and attach the sink to the package's loggers. Returns self."""
+        if self._started or self.mode == "off":
+            return self
+        os.makedirs(self.directory, exist_ok=True)
+        self.prune()
+        self._listener.start()
+        logging.getLogger("market_update").addHandler(self.handler)
+        # The event log has its own verbosity and is only written to the run files
+        crew_logger.setLevel(self.level)
+        crew_logger.propagate = False
+        crew_logger.addHandler(self.handler)
+        _install_crewai_listeners()
+        self._started = True
+        return self
+
+    def open_run(self, symbol, run_id=None):
+        """
+        Send the current context's records to the file of this run (call at the start of a crew run).
+
+        Returns:
+        - Token for `close_run`
+        """
+        symbol = (symbol or "unknown").upper().replace(os.sep, "_")
+        if self.mode == "run":
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            key = f"{symbol}/{symbol}_{stamp}_{(run_id or current_run_id() or 'run')[:8]}"
+        else:
+            key = symbol
+        return _log_key.set(key)
+
+    def close_run(self, token):
+        """Stop routing the context's records to the run's file; per-run files are closed and gzipped."""
+        key = _log_key.get()
+        try:
+            _log_key.reset(token)
+        except ValueError:
+            _log_key.set(None)
+        if self._started and self.mode == "run" and key:
+            # Queued behind the run's own records; blocks only if the queue is full
+            self.queue.put(logging.makeLogRecord({"close_log": key, "compress_log": True}))
+
+    def prune(self):
+        """Remove log files older than the retention period. Returns the number removed."""
+        if not self.retention_days or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if ".log" in name and os.path.getmtime(path) < cutoff:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError:
+                        continue
+        return removed
+
+    def stop(self):
+        """Write out the queued records, detach from the loggers and close the files."""
+        if not self._started:
+            return
+        logging.getLogger("market_update").removeHandler(self.handler)
+        crew_logger.removeHandler(self.handler)
+        self._listener.stop()
+        self.router.close()
+        self._started = False
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_log_sink():
+    """Return the process-wide LogSink, started on first use (None when CREW_LOG_FILES=off)."""
+    global _sink
+    if CREW_LOG_FILES == "off":
+        return None
+    with _sink_lock:
+        if _sink is None:
+            _sink = LogSink().start()
+            atexit.register(_sink.stop)
+        return _sink
+
+
+_listeners_installed = False
+
+
+def _install_crewai_listeners():
+    # crewai calls these in the thread running the task, where the run's log file is in scope
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.crew_events import (
+        CrewKickoffCompletedEvent, CrewKickoffFailedEvent, CrewKickoffStartedEvent,
+    )
+    from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent
+    from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+    from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageFinishedEvent
+
+    def task_name(event, source):
+        task = getattr(event, "task", None) or source
+        return getattr(task, "name", None) or "task"
+
+    @crewai_event_bus.on(CrewKickoffStartedEvent)
+    def on_crew_started(source, event):
+        crew_logger.info("Crew %s started with inputs %s", event.crew_name, event.inputs)
+
+    @crewai_event_bus.on(CrewKickoffCompletedEvent)
+    def on_crew_completed(source, event):
+        crew_logger.info("Crew %s completed (%s tokens)", event.crew_name, event.total_tokens)
+
+    @crewai_event_bus.on(CrewKickoffFailedEvent)
+    def on_crew_failed(source, event):
+        crew_logger.error("Crew %s failed: %s", event.crew_name, event.error)
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source, event):
+        agent = getattr(getattr(event.task or source, "agent", None), "role", "") or ""
+        crew_logger.info("Task %s started by %s", task_name(event, source), agent.strip())
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source, event):
+        raw = getattr(event.output, "raw", "")
+        crew_logger.info("Task %s completed: %s", task_name(event, source), _excerpt(raw))
+        crew_logger.debug("Task %s output:\n%s", task_name(event, source), raw)
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source, event):
+        crew_logger.error("Task %s failed: %s", task_name(event, source), event.error)
+
+    @crewai_event_bus.on(ToolUsageFinishedEvent)
+    def on_tool_finished(source, event):
+        if crew_logger.isEnabledFor(logging.INFO):
+            seconds = (event.finished_at - event.started_at).total_seconds()
+            crew_logger.info("Tool %s finished in %.2fs%s: %s", event.tool_name, seconds,
+                             " (cached)" if event.from_cache else "", _excerpt(event.tool_args))
+
+    @crewai_event_bus.on(ToolUsageErrorEvent)
+    def on_tool_error(source, event):
+        crew_logger.warning("Tool %s failed: %s", event.tool_name, event.error)
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_completed(source, event):
+        if crew_logger.isEnabledFor(logging.DEBUG):
+            crew_logger.debug("LLM call to %s for %s completed: %s", event.model, event.task_name or "-",
+                              _excerpt(event.response))
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_failed(source, event):
+        crew_logger.warning("LLM call for %s failed: %s", event.task_name or "-", event.error)
+
+    _listeners_installed = True
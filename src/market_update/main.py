@@ -1,10 +1,11 @@
 #!/usr/bin/env python
+import argparse
 import sys
+import time
 import warnings
 
 from datetime import datetime
 
-from market_update.crew import LatestMarketNewsTrendCrew
 #from crew import LatestMarketNewsTrendCrew
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
@@ -14,19 +15,379 @@ warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 # Replace with inputs you want to test with, it will automatically
 # interpolate any tasks and agents information
 
+# crewai, langchain and the tools are imported inside each command, after its
+# arguments are parsed and .env is loaded: `--help` and argument errors return
+# at once, and module-level settings read from the environment see .env values.
+
+def _setup():
+    from dotenv import load_dotenv
+    load_dotenv()
+    from market_update.instrumentation import configure_logging
+    configure_logging()
+
 def run():
     """
     Run the crew.
+
+    Usage: market_update [SYMBOL] [--incremental] [--stream] [--record FIXTURE] [--resume RUN_ID]
     """
+    parser = argparse.ArgumentParser(prog="market_update", description="Run the market update crew for one ticker.")
+    parser.add_argument("stock_symbol", nargs="?", default="NVS", help="Ticker symbol (default: NVS)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only analyse news not covered by earlier runs; skip the LLM when there is none")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write the report and post its sections to Slack while it is being generated "
+                             "(default: REPORT_STREAMING)")
+    parser.add_argument("--record", metavar="FIXTURE",
+                        help="Record every LLM completion and search call into a fixture for replay/test")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Resume a failed run from its first incomplete stage; 'last' resumes the latest "
+                             "incomplete run of SYMBOL")
+    args = parser.parse_args(sys.argv[1:])
+    if args.record and (args.incremental or args.resume):
+        # Replays run the full crew from the recorded inputs; the other modes depend on local stores
+        parser.error("--record cannot be combined with --incremental or --resume")
+    _setup()
+    from market_update.crew import LatestMarketNewsTrendCrew
+    from market_update.other_tools.slack_delivery import flush_deliveries
+    from market_update.recording import RECORD, RecordReplaySession, activate
+
     inputs = {
-        'stock_symbol': 'NVS',
+        'stock_symbol': args.stock_symbol.upper(),
         'current_datetime': str(datetime.now())
     }
+    stream_report = True if args.stream else None
     print("********* MAIN - *********")
+    crew_instance = None
     try:
-        LatestMarketNewsTrendCrew().crew().kickoff(inputs=inputs)
+        if args.resume:
+            from market_update.checkpoints import get_checkpoint_store
+            store = get_checkpoint_store()
+            if args.resume == "last":
+                checkpoint = store.latest_incomplete(inputs['stock_symbol'])
+            else:
+                checkpoint = store.load(args.resume)
+            if checkpoint is None:
+                raise Exception(f"No checkpointed run found for {args.resume!r}")
+            if checkpoint.status == "completed":
+                raise Exception(f"Run {checkpoint.run_id} already completed")
+            print(f"Resuming run {checkpoint.run_id} of {checkpoint.symbol} (news window {checkpoint.window}:00), "
+                  f"completed: {', '.join(checkpoint.outputs) or 'nothing'}")
+            crew_instance = LatestMarketNewsTrendCrew(stream_report=stream_report, resume=checkpoint)
+            crew_instance.crew().kickoff(inputs=checkpoint.inputs)
+        elif args.record:
+            session = RecordReplaySession.open(args.record, RECORD)
+            session.store.meta["inputs"] = inputs
+            with activate(session):
+                crew_instance = LatestMarketNewsTrendCrew(stream_report=stream_report)
+                crew_instance.crew().kickoff(inputs=inputs)
+                # The inputs as completed by before_kickoff (sector queries, volatility figures from the
+                # local market data), so a replay does not recompute them from data that may have changed
+                session.store.meta["inputs"] = dict(crew_instance.inputs)
+            print(f"Recorded {session.store.stats()} into {session.store.path}")
+        elif args.incremental:
+            from market_update.incremental import prepare_incremental
+            crew_instance, incremental_inputs = prepare_incremental(inputs['stock_symbol'], stream_report=stream_report)
+            if crew_instance is not None:
+                crew_instance.crew().kickoff(inputs=incremental_inputs)
+        else:
+            crew_instance = LatestMarketNewsTrendCrew(stream_report=stream_report)
+            crew_instance.crew().kickoff(inputs=inputs)
     except Exception as e:
+        if crew_instance is not None:
+            crew_instance.abort(e)
+        if crew_instance is not None and crew_instance.run_id:
+            raise Exception(f"An error occurred while running the crew: {e} "
+                            f"(resume with: market_update --resume {crew_instance.run_id})")
         raise Exception(f"An error occurred while running the crew: {e}")
+    finally:
+        # Reports are posted to Slack in the background; wait for them before exiting
+        flush_deliveries()
+
+def _replay_once(session):
+    from market_update.crew import LatestMarketNewsTrendCrew
+    from market_update.recording import activate
+    # Offline: every LLM completion and search comes from the fixture; nothing is published
+    session.store.rewind()
+    with activate(session):
+        crew_instance = LatestMarketNewsTrendCrew(publish=False)
+        try:
+            return crew_instance.crew().kickoff(inputs=dict(session.store.meta["inputs"]))
+        except Exception as e:
+            crew_instance.abort(e)
+            raise
+
+def replay():
+    """
+    Replay a recorded run fully offline and deterministically.
+
+    Usage: replay FIXTURE
+    """
+    if len(sys.argv) < 2:
+        raise Exception("Usage: replay FIXTURE (record one with: market_update SYMBOL --record FIXTURE)")
+    _setup()
+    from market_update.recording import REPLAY, RecordReplaySession
+    try:
+        session = RecordReplaySession.open(sys.argv[1], REPLAY)
+        result = _replay_once(session)
+        print(result.raw)
+    except Exception as e:
+        raise Exception(f"An error occurred while replaying the crew: {e}")
+
+def test():
+    """
+    Rerun the crew N times against recorded fixtures and report the timings.
+
+    Usage: test N_ITERATIONS FIXTURE
+    """
+    if len(sys.argv) < 3:
+        raise Exception("Usage: test N_ITERATIONS FIXTURE")
+    n_iterations = int(sys.argv[1])
+    _setup()
+    from market_update.recording import REPLAY, FixtureMissError, RecordReplaySession
+    session = RecordReplaySession.open(sys.argv[2], REPLAY)
+
+    timings = []
+    for i in range(n_iterations):
+        start = time.perf_counter()
+        try:
+            _replay_once(session)
+        except FixtureMissError as e:
+            raise Exception(f"Iteration {i+1} diverged from the recording: {e}")
+        timings.append(time.perf_counter() - start)
+        print(f"Iteration {i+1}/{n_iterations}: {timings[-1]:.3f}s")
+
+    timings.sort()
+    print(f"{n_iterations} iterations: min {timings[0]:.3f}s, "
+          f"median {timings[len(timings) // 2]:.3f}s, max {timings[-1]:.3f}s")
+
+def train():
+    """
+    Train the crew for a given number of iterations.
+
+    Usage: train N_ITERATIONS FILENAME [SYMBOL]
+    """
+    inputs = {
+        'stock_symbol': sys.argv[3].upper() if len(sys.argv) > 3 else 'NVS',
+        'current_datetime': str(datetime.now())
+    }
+    _setup()
+    from market_update.crew import LatestMarketNewsTrendCrew
+    try:
+        LatestMarketNewsTrendCrew(publish=False).crew().train(
+            n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs
+        )
+    except Exception as e:
+        raise Exception(f"An error occurred while training the crew: {e}")
+
+def run_batch():
+    """
+    Run the crew for many tickers concurrently.
+
+    Usage: run_batch NVDA AAPL MSFT [--file tickers.txt] [--workers 8] [--rpm 60] [--incremental] [--prefetch] [--verbose]
+    """
+    parser = argparse.ArgumentParser(prog="run_batch", description="Run the market update crew for many tickers.")
+    parser.add_argument("symbols", nargs="*", help="Ticker symbols to run")
+    parser.add_argument("--file", "-f", help="File with ticker symbols (one per line or comma separated)")
+    parser.add_argument("--workers", "-w", type=int,
+                        help="Maximum number of crews running at once (default: BATCH_MAX_WORKERS or 4)")
+    parser.add_argument("--rpm", type=int,
+                        help="Combined LLM requests per minute across all workers (0 disables the shared budget; "
+                             "default: BATCH_GLOBAL_RPM or 60)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only analyse news not covered by earlier runs; skip tickers without new news")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Search market, sector and ticker news once for the whole batch instead of per researcher")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Show crewai's step-by-step output for every crew (interleaved across workers)")
+    args = parser.parse_args(sys.argv[1:])
+    _setup()
+    from market_update.batch import DEFAULT_GLOBAL_RPM, DEFAULT_MAX_WORKERS, load_symbols, run_batch as _run_batch
+
+    symbols = load_symbols(args.symbols, args.file)
+    if not symbols:
+        parser.error("No ticker symbols given. Pass them as arguments or with --file.")
+
+    workers = args.workers or DEFAULT_MAX_WORKERS
+    rpm = DEFAULT_GLOBAL_RPM if args.rpm is None else args.rpm
+    print(f"********* BATCH - {len(symbols)} tickers, {workers} workers, {rpm} rpm *********")
+    result = _run_batch(symbols, max_workers=workers, global_rpm=rpm,
+                        incremental=args.incremental, verbose=args.verbose, prefetch=args.prefetch)
+    print(result.summary())
+    if result.failed:
+        sys.exit(1)
+
+def schedule():
+    """
+    Run as a long-lived daemon that produces recurring reports for many tickers.
+
+    Usage: schedule NVDA AAPL [--file tickers.txt] [--interval 30] [--jitter 60] [--workers 2] [--backlog 4]
+                    [--rpm 60] [--all-hours] [--incremental]
+    """
+    parser = argparse.ArgumentParser(prog="schedule", description="Produce recurring ticker reports from one warm process.")
+    parser.add_argument("symbols", nargs="*", help="Ticker symbols to schedule")
+    parser.add_argument("--file", "-f", help="File with ticker symbols (one per line or comma separated)")
+    parser.add_argument("--interval", type=float, help="Minutes between runs of each ticker (default: SCHEDULER_INTERVAL_MINUTES or 60)")
+    parser.add_argument("--jitter", type=float, help="Random +/- seconds added to every run (default: SCHEDULER_JITTER_SECONDS or 60)")
+    parser.add_argument("--workers", "-w", type=int, help="Maximum number of crews running at once (default: SCHEDULER_MAX_WORKERS or 2)")
+    parser.add_argument("--backlog", type=int, help="Maximum runs running or waiting; later ones are skipped (default: SCHEDULER_MAX_BACKLOG or 4)")
+    parser.add_argument("--rpm", type=int, help="Combined LLM requests per minute across all runs (default: SCHEDULER_GLOBAL_RPM or 60)")
+    parser.add_argument("--all-hours", action="store_true", help="Run around the clock instead of only during market hours")
+    parser.add_argument("--incremental", action="store_true", help="Only analyse news not covered by earlier runs")
+    args = parser.parse_args(sys.argv[1:])
+    _setup()
+    import signal
+    from market_update import scheduler
+    from market_update.batch import load_symbols
+    from market_update.other_tools.slack_delivery import flush_deliveries
+
+    symbols = load_symbols(args.symbols, args.file)
+    if not symbols:
+        parser.error("No ticker symbols given. Pass them as arguments or with --file.")
+
+    scheduler.warm_up()
+    daemon = scheduler.ReportScheduler(
+        scheduler.build_schedules(symbols, args.interval or scheduler.DEFAULT_INTERVAL_MINUTES),
+        max_workers=args.workers or scheduler.DEFAULT_MAX_WORKERS,
+        max_backlog=args.backlog or scheduler.DEFAULT_MAX_BACKLOG,
+        jitter_seconds=scheduler.DEFAULT_JITTER_SECONDS if args.jitter is None else args.jitter,
+        market_hours=None if args.all_hours else scheduler.MarketHours(),
+        global_rpm=scheduler.DEFAULT_GLOBAL_RPM if args.rpm is None else args.rpm,
+        incremental=args.incremental,
+    )
+
+    def handle_signal(signum, frame):
+        daemon.request_stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    daemon.start()
+    for symbol, when in daemon.upcoming():
+        print(f"{symbol}: first run at {datetime.fromtimestamp(when):%Y-%m-%d %H:%M:%S}")
+    # Wake up periodically so signals are handled promptly
+    while daemon.running:
+        daemon.wait(1.0)
+    # Let running crews finish and their reports reach Slack
+    daemon.stop()
+    flush_deliveries()
+
+def serve():
+    """
+    Serve the local HTTP job API for on-demand reports.
+
+    Usage: serve [--host 127.0.0.1] [--port 8765] [--workers 2] [--max-queued 20] [--rpm 60]
+    """
+    parser = argparse.ArgumentParser(prog="serve", description="Local HTTP API that queues report jobs.")
+    parser.add_argument("--host", help="Interface to bind (default: API_HOST or 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="Port to listen on (default: API_PORT or 8765)")
+    parser.add_argument("--workers", "-w", type=int, help="Crews running at once (default: API_WORKERS or 2)")
+    parser.add_argument("--max-queued", type=int, help="Jobs queued or running before requests are refused with 503 "
+                                                       "(default: API_MAX_QUEUED or 20)")
+    parser.add_argument("--rpm", type=int, help="Combined LLM requests per minute across all jobs (default: API_GLOBAL_RPM or 60)")
+    args = parser.parse_args(sys.argv[1:])
+    _setup()
+    from market_update import api
+    from market_update.scheduler import warm_up
+    from market_update.other_tools.slack_delivery import flush_deliveries
+
+    warm_up()
+    manager = api.JobManager(
+        max_workers=args.workers or api.DEFAULT_API_WORKERS,
+        max_queued=args.max_queued or api.DEFAULT_API_MAX_QUEUED,
+        global_rpm=api.DEFAULT_API_RPM if args.rpm is None else args.rpm,
+    )
+    server = api.ReportAPIServer(manager, host=args.host or api.DEFAULT_API_HOST,
+                                 port=api.DEFAULT_API_PORT if args.port is None else args.port)
+    print(f"Report API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        manager.shutdown()
+        flush_deliveries()
+
+def _parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+def reports():
+    """
+    Query, export and maintain the indexed report history.
+
+    Usage: reports search [KEYWORD ...] [--symbol NVDA] [--days 7 | --since 2025-01-01 --until 2025-02-01] [--url URL]
+           reports show ID
+           reports export FILE.jsonl [--symbol NVDA] [--since ...] [--until ...]
+           reports import [DIRECTORY]
+           reports prune [--older-than-days 90] [--keep 500] [--compact]
+    """
+    parser = argparse.ArgumentParser(prog="reports", description="Query and maintain the indexed report history.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_filters(subparser):
+        subparser.add_argument("--symbol", "-s", help="Only reports about this ticker")
+        subparser.add_argument("--since", type=_parse_day, help="Reports created on or after this day (YYYY-MM-DD)")
+        subparser.add_argument("--until", type=_parse_day, help="Reports created before this day (YYYY-MM-DD)")
+        subparser.add_argument("--days", type=float, help="Reports created in the last N days")
+        subparser.add_argument("--url", help="Only reports citing this URL")
+
+    search = commands.add_parser("search", help="Find reports by symbol, date range, keyword or cited URL")
+    search.add_argument("keywords", nargs="*", help="Words that must all appear in one section")
+    add_filters(search)
+    search.add_argument("--limit", "-n", type=int, default=20)
+    search.add_argument("--json", action="store_true", help="Print the hits as JSON lines")
+    show = commands.add_parser("show", help="Print one report")
+    show.add_argument("id", type=int)
+    export = commands.add_parser("export", help="Write matching reports to a JSON lines file ('-' for stdout)")
+    export.add_argument("file")
+    export.add_argument("keywords", nargs="*")
+    add_filters(export)
+    backfill = commands.add_parser("import", help="Index report files written before the store existed")
+    backfill.add_argument("directory", nargs="?", default="output")
+    prune = commands.add_parser("prune", help="Delete reports past retention")
+    prune.add_argument("--older-than-days", type=float, help="Default: REPORT_RETENTION_DAYS (0 keeps everything)")
+    prune.add_argument("--keep", type=int, help="Keep only the newest N reports of each symbol")
+    prune.add_argument("--compact", action="store_true", help="Optimize the full-text index and vacuum afterwards")
+    args = parser.parse_args(sys.argv[1:])
+    _setup()
+    import json
+    from market_update.report_store import DEFAULT_RETENTION_DAYS, get_report_store
+
+    store = get_report_store()
+
+    def filters():
+        since = time.time() - args.days * 86400 if args.days else args.since
+        return dict(symbol=args.symbol, since=since, until=args.until, url=args.url,
+                    keywords=" ".join(args.keywords) or None)
+
+    if args.command == "search":
+        for hit in store.query(limit=args.limit, **filters()):
+            if args.json:
+                print(json.dumps(hit.as_dict()))
+                continue
+            print(f"{hit.id:>6}  {hit.created}  {hit.symbol:<6} {hit.title or ''}  {hit.path or ''}")
+            if hit.snippet:
+                print("        " + " ".join(hit.snippet.split()))
+    elif args.command == "show":
+        record = store.get(args.id)
+        if record is None:
+            parser.error(f"No report with id {args.id}")
+        print(record["content"])
+    elif args.command == "export":
+        if args.file == "-":
+            count = store.export(sys.stdout, **filters())
+        else:
+            with open(args.file, "w", encoding="utf-8") as file:
+                count = store.export(file, **filters())
+        print(f"Exported {count} reports", file=sys.stderr)
+    elif args.command == "import":
+        print(f"Indexed {store.import_directory(args.directory)} report files from {args.directory}")
+    elif args.command == "prune":
+        older_than = DEFAULT_RETENTION_DAYS if args.older_than_days is None else args.older_than_days
+        print(f"Deleted {store.prune(older_than_days=older_than, keep_per_symbol=args.keep)} reports")
+        if args.compact:
+            store.compact()
+        print(store.stats())
 
 if __name__ == "__main__":
     print("********* MAIN - OUTSIDE *********")
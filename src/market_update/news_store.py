@@ -0,0 +1,181 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .tools.news_dedup import canonicalize_url, strip_publisher_suffix
+
+
+DEFAULT_NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", ".cache/seen_news.sqlite")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def content_hash(item):
+    """Hash of the normalized headline and snippet, stable across URL variants."""
+    title = strip_publisher_suffix(item.get("title", ""))
+    text = " ".join(_WORD_RE.findall(f"{title} {item.get('snippet', '')}".lower()))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _canonical_url(item):
+    return item.get("canonical_url") or canonicalize_url(item.get("link"))
+
+
+def summarize_report(markdown, max_chars=1500):
+    """
+    Build a short summary of a report: every heading followed by the first
+    sentence of its section, capped at `max_chars`.
+    """
+    lines = []
+    want_sentence = False
+    for line in markdown.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = _HEADING_RE.match(stripped)
+        if match:
+            lines.append(f"- {match.group(1).strip()}")
+            want_sentence = True
+        elif want_sentence:
+            lines[-1] += f": {_SENTENCE_END_RE.split(stripped, 1)[0]}"
+            want_sentence = False
+
+    summary = "\n".join(lines) if lines else markdown.strip()
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rsplit("\n", 1)[0]
+    return summary
+
+
+class SeenNewsStore:
+    """
+    Persistent per-symbol record of news items that have already been analysed,
+    plus a summary of the last report for each symbol.
+
+    An item counts as seen when either its canonical URL or its content hash
+    has been recorded for the symbol before, so syndicated copies of a story
+    we already covered are not treated as new.
+    """
+
+    def __init__(self, path=DEFAULT_NEWS_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen_news (
+                symbol TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                title TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (symbol, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_seen_news_hash ON seen_news (symbol, content_hash);
+            CREATE TABLE IF NOT EXISTS report_summaries (
+                symbol TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                report_path TEXT,
+                created_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def annotate(self, symbol, items):
+        """
+        Mark every item with 'seen': True/False for the symbol without recording it.
+
+        Returns:
+        - New list of item dictionaries with the 'seen' flag set
+        """
+        symbol = symbol.upper()
+        annotated = []
+        with self._lock:
+            for item in items:
+                item = dict(item)
+                url = _canonical_url(item) or ""
+                digest = content_hash(item)
+                row = self._conn.execute(
+                    "SELECT first_seen FROM seen_news WHERE symbol = ? AND (url = ? OR content_hash = ?) LIMIT 1",
+                    (symbol, url or None, digest),
+                ).fetchone()
+                item["seen"] = row is not None
+                if row is not None:
+                    item["first_seen"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(row[0]))
+                annotated.append(item)
+        return annotated
+
+    def partition(self, symbol, items):
+        """
+        Split items into (new_items, seen_items) for the symbol.
+        """
+        annotated = self.annotate(symbol, items)
+        return [i for i in annotated if not i["seen"]], [i for i in annotated if i["seen"]]
+
+    def record(self, symbol, items):
+        """Remember items as analysed for the symbol."""
+        symbol = symbol.upper()
+        now = time.time()
+        with self._lock:
+            for item in items:
+                digest = content_hash(item)
+                url = _canonical_url(item) or f"hash:{digest}"
+                self._conn.execute(
+                    "INSERT INTO seen_news (symbol, url, content_hash, title, first_seen, last_seen)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (symbol, url) DO UPDATE SET last_seen = excluded.last_seen",
+                    (symbol, url, digest, item.get("title"), now, now),
+                )
+            self._conn.commit()
+
+    def record_report(self, symbol, summary, report_path=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO report_summaries (symbol, summary, report_path, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                (symbol.upper(), summary, report_path, time.time()),
+            )
+            self._conn.commit()
+
+    def last_report_summary(self, symbol):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM report_summaries WHERE symbol = ?", (symbol.upper(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def prune(self, older_than_days=14):
+        """Forget items last seen more than `older_than_days` ago."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM seen_news WHERE last_seen < ?", (time.time() - older_than_days * 86400,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_news_store():
+    """Return the process-wide SeenNewsStore, opening it on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SeenNewsStore()
+        return _default_store
@@ -0,0 +1,237 @@
+import re
+
+
+# Slack Block Kit limits for chat.postMessage
+MAX_BLOCKS_PER_MESSAGE = 50
+MAX_SECTION_TEXT = 3000
+MAX_HEADER_TEXT = 150
+MAX_MESSAGE_TEXT = 40000
+# Slack rejects very large block payloads well before 50 x 3000 characters
+DEFAULT_MAX_MESSAGE_CHARS = 12000
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\((\S+?)\)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class PayloadLimitError(ValueError):
+    """Raised when a Slack payload would exceed Block Kit limits."""
+
+
+def markdown_to_mrkdwn(text):
+    """Convert the markdown constructs our reports use into Slack mrkdwn."""
+    def heading(match):
+        return f"*{match.group(2)}*"
+
+    lines = []
+    for line in text.split("\n"):
+        match = _HEADING_RE.match(line)
+        lines.append(heading(match) if match else line)
+    text = "\n".join(lines)
+    text = _BOLD_RE.sub(lambda m: f"*{m.group(1) or m.group(2)}*", text)
+    text = _LINK_RE.sub(lambda m: f"<{m.group(2)}|{m.group(1)}>", text)
+    return text
+
+
+def split_markdown(markdown):
+    """
+    Split a markdown document into structural units: headings, paragraphs,
+    individual list items and fenced code blocks. Units never cut through a
+    line, a link or a code fence.
+
+    Returns:
+    - List of (kind, text) tuples where kind is 'heading', 'list_item', 'code' or 'paragraph'
+    """
+    units = []
+    paragraph = []
+    code = None
+
+    def flush_paragraph():
+        if paragraph:
+            units.append(("paragraph", "\n".join(paragraph)))
+            paragraph.clear()
+
+    for line in markdown.split("\n"):
+        if code is not None:
+            code.append(line)
+            if line.strip().startswith("```"):
+                units.append(("code", "\n".join(code)))
+                code = None
+            continue
+        if line.strip().startswith("```"):
+            flush_paragraph()
+            code = [line]
+        elif _HEADING_RE.match(line):
+            flush_paragraph()
+            units.append(("heading", line.strip()))
+        elif _LIST_ITEM_RE.match(line):
+            flush_paragraph()
+            units.append(("list_item", line.rstrip()))
+        elif not line.strip():
+            flush_paragraph()
+        elif units and units[-1][0] == "list_item" and not paragraph and line.startswith((" ", "\t")):
+            # Continuation line of the previous list item
+            units[-1] = ("list_item", units[-1][1] + "\n" + line.rstrip())
+        else:
+            paragraph.append(line.rstrip())
+
+    flush_paragraph()
+    if code is not None:
+        units.append(("code", "\n".join(code)))
+    return units
+
+
+def is_heading(line):
+    """True if `line` is a markdown heading."""
+    return bool(_HEADING_RE.match(line.rstrip("\n")))
+
+
+def split_sections(markdown):
+    """
+    Split a markdown document at its headings, the way a reader scans it.
+
+    Heading lines inside fenced code blocks do not start a section, and a
+    heading with no body (e.g. the report title) stays with the section that
+    follows it.
+
+    Returns:
+    - List of section strings; joined together they give back `markdown`
+    """
+    sections = []
+    start = 0
+    offset = 0
+    in_code = False
+    has_body = False
+    for line in markdown.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            has_body = True
+        elif not in_code and is_heading(line):
+            if has_body:
+                sections.append(markdown[start:offset])
+                start = offset
+                has_body = False
+        elif stripped:
+            has_body = True
+        offset += len(line)
+    if start < len(markdown):
+        sections.append(markdown[start:])
+    return sections
+
+
+def _split_oversized(text, limit):
+    # Prefer sentence boundaries, then whitespace, and only cut words as a last resort
+    if len(text) <= limit:
+        return [text]
+    pieces, current = [], ""
+    for sentence in _SENTENCE_RE.split(text):
+        candidate = f"{current} {sentence}" if current else sentence
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        while len(sentence) > limit:
+            cut = sentence.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        current = sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _section(text):
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def pack_report(markdown, max_section_chars=MAX_SECTION_TEXT, max_blocks=MAX_BLOCKS_PER_MESSAGE,
+                max_message_chars=DEFAULT_MAX_MESSAGE_CHARS, lead_blocks=None):
+    """
+    Pack a markdown report into as few Slack messages as possible.
+
+    Structural units are converted to mrkdwn and greedily merged into section
+    blocks of up to `max_section_chars` characters (a heading always starts a
+    new block), and blocks are greedily merged into messages of up to
+    `max_blocks` blocks and `max_message_chars` characters.
+
+    Parameters:
+    - markdown: Report content
+    - max_section_chars: Character limit per section block
+    - max_blocks: Block limit per message
+    - max_message_chars: Total text budget per message
+    - lead_blocks: Optional blocks to put at the start of the first message
+
+    Returns:
+    - List of messages, each a list of Block Kit blocks
+    """
+    max_section_chars = min(max_section_chars, MAX_SECTION_TEXT)
+    texts = []
+    current = ""
+    previous_kind = None
+    for kind, unit in split_markdown(markdown):
+        unit = markdown_to_mrkdwn(unit) if kind != "code" else unit
+        for piece in _split_oversized(unit, max_section_chars):
+            tight = previous_kind == "heading" or (kind == previous_kind == "list_item")
+            separator = "\n" if tight else "\n\n"
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if kind == "heading" and current:
+                texts.append(current)
+                current = piece
+            elif len(candidate) <= max_section_chars:
+                current = candidate
+            else:
+                texts.append(current)
+                current = piece
+            previous_kind = kind
+    if current:
+        texts.append(current)
+
+    messages = []
+    blocks = list(lead_blocks or [])
+    size = sum(_block_text_length(b) for b in blocks)
+    for text in texts:
+        if blocks and (len(blocks) >= max_blocks or size + len(text) > max_message_chars):
+            messages.append(blocks)
+            blocks, size = [], 0
+        blocks.append(_section(text))
+        size += len(text)
+    if blocks:
+        messages.append(blocks)
+    return messages
+
+
+def _block_text_length(block):
+    text = block.get("text")
+    return len(text.get("text", "")) if isinstance(text, dict) else 0
+
+
+def validate_payload(payload, max_message_chars=None):
+    """
+    Check a chat.postMessage payload against Slack's limits before sending it.
+
+    Raises:
+    - PayloadLimitError describing the first limit that is exceeded
+    """
+    text = payload.get("text") or ""
+    if len(text) > MAX_MESSAGE_TEXT:
+        raise PayloadLimitError(f"text is {len(text)} chars (limit {MAX_MESSAGE_TEXT})")
+
+    blocks = payload.get("blocks") or []
+    if len(blocks) > MAX_BLOCKS_PER_MESSAGE:
+        raise PayloadLimitError(f"{len(blocks)} blocks (limit {MAX_BLOCKS_PER_MESSAGE})")
+
+    total = 0
+    for i, block in enumerate(blocks):
+        length = _block_text_length(block)
+        total += length
+        if block.get("type") == "header" and length > MAX_HEADER_TEXT:
+            raise PayloadLimitError(f"header block {i} is {length} chars (limit {MAX_HEADER_TEXT})")
+        if block.get("type") == "section" and length > MAX_SECTION_TEXT:
+            raise PayloadLimitError(f"section block {i} is {length} chars (limit {MAX_SECTION_TEXT})")
+    if max_message_chars and total > max_message_chars:
+        raise PayloadLimitError(f"blocks hold {total} chars (limit {max_message_chars})")
@@ -0,0 +1,271 @@
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ..instrumentation import span
+from .slack_messenger import SlackMessenger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_WORKERS = int(os.getenv("SLACK_DELIVERY_WORKERS", "4"))
+# Longest the interpreter waits at exit for queued reports; a hung Slack endpoint must not block it forever
+DEFAULT_EXIT_FLUSH_TIMEOUT = float(os.getenv("SLACK_EXIT_FLUSH_TIMEOUT", "60"))
+
+
+def parse_channels(channels):
+    """Accept a channel name, a comma separated list of channels or an iterable of channels."""
+    if isinstance(channels, str):
+        channels = channels.split(",")
+    return [c.strip() for c in channels if c and c.strip()]
+
+
+class SlackDeliveryQueue:
+    """
+    Background queue that posts reports to Slack off the kickoff thread.
+
+    Each (report, channel) pair is one job, so a report fanned out to several
+    channels is delivered to all of them in parallel while the messages inside
+    one channel stay in order. Per-channel rate limits and Retry-After are
+    handled by SlackMessenger itself.
+    """
+
+    def __init__(self, workers=DEFAULT_DELIVERY_WORKERS, messenger_factory=SlackMessenger):
+        """
+        Parameters:
+        - workers: Number of background delivery threads
+        - messenger_factory: Callable returning a SlackMessenger (used for testing against a stub server)
+        """
+        self.messenger_factory = messenger_factory
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self._threads = []
+        self._closed = False
+        self.stats = {"submitted": 0, "delivered": 0, "failed": 0}
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"slack-delivery-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit_report(self, channels, report_file_path):
+        """
+        Queue a report for delivery to one or more channels and return immediately.
+
+        Returns:
+        - Dictionary of channel -> Future resolving to True/False
+        """
+        if self._closed:
+            raise RuntimeError("Slack delivery queue is shut down.")
+        futures = {}
+        for channel in parse_channels(channels):
+            future = Future()
+            with self._pending_lock:
+                self._pending += 1
+                self.stats["submitted"] += 1
+            # Carry the submitting run's context so delivery spans and logs keep its run ID
+            self._queue.put((channel, report_file_path, future, contextvars.copy_context()))
+            futures[channel] = future
+        return futures
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued delivery has finished.
+
+        Returns:
+        - True if the queue drained, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_lock:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending_lock.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=None):
+        """Deliver what is queued, then stop the worker threads."""
+        self.flush(timeout)
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _worker(self):
+        messenger = None
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            channel, report_file_path, future, context = job
+            success = False
+            try:
+                if messenger is None:
+                    messenger = self.messenger_factory()
+                success = context.run(self._deliver, messenger, channel, report_file_path)
+                future.set_result(success)
+            except Exception as e:
+                logger.error("Error delivering %s to %s: %s", report_file_path, channel, e)
+                future.set_exception(e)
+            finally:
+                with self._pending_lock:
+                    self.stats["delivered" if success else "failed"] += 1
+                    self._pending -= 1
+                    self._pending_lock.notify_all()
+
+    @staticmethod
+    def _deliver(messenger, channel, report_file_path):
+        with span("slack.deliver_report", channel=channel):
+            return messenger.send_report(channel, report_file_path)
+
+
+class SectionDelivery:
+    """
+    Post the sections of a report that is still being written, in order, as they finish.
+
+    One background thread per report keeps the sections in order in every
+    channel while the crew goes on generating the rest of the report. When
+    Slack is slower than the LLM, the sections that queued up meanwhile are
+    sent together, so a slow channel costs fewer messages, not more.
+    """
+
+    def __init__(self, channels, filename, messenger_factory=SlackMessenger):
+        """
+        Parameters:
+        - channels: Channel name, comma separated channels or an iterable of channels
+        - filename: Report file name shown in the first message
+        - messenger_factory: Callable returning a SlackMessenger (used for testing against a stub server)
+        """
+        self.channels = parse_channels(channels)
+        self.filename = filename
+        self.messenger_factory = messenger_factory
+        self.stats = {"submitted": 0, "delivered": 0, "failed": 0}
+        # Resolves to True once every section was posted, False if any failed
+        self.result = Future()
+        self._queue = queue.Queue()
+        self._done = threading.Event()
+        self._closed = False
+        self._context = contextvars.copy_context()
+        self._thread = threading.Thread(target=self._worker, name="slack-sections", daemon=True)
+        self._thread.start()
+        with _open_sections_lock:
+            _open_sections.add(self)
+
+    def submit(self, section_markdown):
+        """Queue the next finished section and return immediately."""
+        if self._closed:
+            raise RuntimeError("Section delivery is closed.")
+        self.stats["submitted"] += 1
+        self._queue.put(section_markdown)
+
+    def close(self):
+        """No more sections will follow; the queued ones are still delivered."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def wait(self, timeout=None):
+        """
+        Block until every section is delivered (or given up on) after `close()`.
+
+        Returns:
+        - True if delivery finished, False if the timeout expired first
+        """
+        return self._done.wait(timeout)
+
+    def _worker(self):
+        try:
+            self._context.run(self._deliver_all)
+        finally:
+            self.result.set_result(self.stats["failed"] == 0)
+            self._done.set()
+            with _open_sections_lock:
+                _open_sections.discard(self)
+
+    def _deliver_all(self):
+        messenger = None
+        index = 0
+        closed = False
+        while not closed:
+            sections = [self._queue.get()]
+            # Sections that finished while the previous post was going out share one post
+            while True:
+                try:
+                    sections.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in sections:
+                closed = True
+                sections = sections[:sections.index(None)]
+            if not sections:
+                continue
+            markdown = "".join(sections)
+            try:
+                if messenger is None:
+                    messenger = self.messenger_factory()
+                with span("slack.deliver_section", index=index, sections=len(sections)):
+                    success = all([messenger.send_report_section(channel, markdown, self.filename, index)
+                                   for channel in self.channels])
+            except Exception as e:
+                logger.error("Error delivering part %d of %s: %s", index + 1, self.filename, e)
+                success = False
+            self.stats["delivered" if success else "failed"] += len(sections)
+            index += 1
+
+
+_open_sections = set()
+_open_sections_lock = threading.Lock()
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_delivery_queue():
+    """Return the process-wide SlackDeliveryQueue, starting it on first use."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = SlackDeliveryQueue()
+            # Workers are daemon threads; make sure queued reports go out before exit
+            atexit.register(_default_queue.flush, DEFAULT_EXIT_FLUSH_TIMEOUT)
+        return _default_queue
+
+
+def when_delivered(futures, callback):
+    """
+    Call `callback(futures)` once every delivery future has finished (right
+    away when there are none), in the caller's context so its logs keep the run ID.
+    """
+    futures = list(futures)
+    context = contextvars.copy_context()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        context.run(callback, futures)
+
+    if not futures:
+        context.run(callback, futures)
+    for future in futures:
+        future.add_done_callback(on_done)
+
+
+def flush_deliveries(timeout=None):
+    """Wait for queued Slack deliveries and streamed report sections that are still going out."""
+    with _open_sections_lock:
+        sections = list(_open_sections)
+    flushed = all([delivery.wait(timeout) for delivery in sections if delivery._closed])
+    if _default_queue is not None:
+        flushed = _default_queue.flush(timeout) and flushed
+    return flushed
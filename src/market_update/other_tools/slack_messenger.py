@@ -1,10 +1,47 @@
+import logging
 import os
+import threading
+import time
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 
-# Load environment variables from .env file
-load_dotenv()
+from ..instrumentation import increment, span
+from ..rate_limit import TokenBucket
+from .report_packer import DEFAULT_MAX_MESSAGE_CHARS, pack_report, validate_payload
+
+logger = logging.getLogger(__name__)
+
+# Slack allows roughly one chat.postMessage per second per channel
+CHANNEL_MESSAGES_PER_SECOND = float(os.getenv("SLACK_CHANNEL_RATE", "1"))
+MAX_RATE_LIMIT_RETRIES = int(os.getenv("SLACK_MAX_RATE_LIMIT_RETRIES", "5"))
+
+_session = None
+_channel_limiters = {}
+_shared_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return the process-wide pooled HTTP session used for Slack API calls."""
+    global _session
+    with _shared_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_channel_limiter(channel):
+    """Return the shared per-channel rate limiter so every messenger instance respects it."""
+    with _shared_lock:
+        limiter = _channel_limiters.get(channel)
+        if limiter is None:
+            limiter = TokenBucket(CHANNEL_MESSAGES_PER_SECOND, capacity=1)
+            _channel_limiters[channel] = limiter
+        return limiter
+
 
 class SlackMessenger:
     def __init__(self, token=None, max_char_length=3000):
@@ -20,13 +57,47 @@ class SlackMessenger:
         if not self.token:
             raise ValueError("No Slack token provided. Set SLACK_BOT_TOKEN environment variable or pass token to constructor.")
         
-        self.base_url = "https://slack.com/api/"
+        self.base_url = os.getenv("SLACK_API_BASE_URL", "https://slack.com/api/")
+        self.session = get_http_session()
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
         # Set the maximum character length for message blocks
         self.max_char_length = max_char_length
+
+    def _post(self, method, payload):
+        """
+        Call a Slack Web API method on the pooled session.
+
+        Waits for the channel's rate limiter before each call and honours
+        HTTP 429 / 'ratelimited' responses by sleeping for Retry-After seconds.
+
+        Returns:
+        - Parsed JSON response from Slack
+        """
+        endpoint = f"{self.base_url}{method}"
+        channel = payload.get("channel")
+        with span("slack.call", method=method, channel=channel or "") as call_span:
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                if channel:
+                    get_channel_limiter(channel).acquire()
+                response = self.session.post(endpoint, headers=self.headers, json=payload, timeout=30)
+                if response.status_code == 429:
+                    response_data = {"ok": False, "error": "ratelimited"}
+                else:
+                    response_data = response.json()
+                if response_data.get("error") != "ratelimited" or attempt == MAX_RATE_LIMIT_RETRIES:
+                    break
+                retry_after = float(response.headers.get("Retry-After", 1))
+                increment("slack_rate_limited_total", method=method)
+                logger.warning("Slack rate limited %s on %s; retrying in %.0fs", method, channel, retry_after)
+                time.sleep(retry_after)
+            if not response_data.get("ok"):
+                call_span.status = "error"
+                call_span.set("error", response_data.get("error", "unknown"))
+            increment("slack_calls_total", method=method, ok=bool(response_data.get("ok")))
+        return response_data
     
     def send_message(self, channel, message, blocks=None):
         """
@@ -40,7 +111,6 @@ class SlackMessenger:
         Returns:
         - Response from Slack API
         """
-        endpoint = f"{self.base_url}chat.postMessage"
         payload = {
             "channel": channel,
             "text": message
@@ -49,12 +119,11 @@ class SlackMessenger:
         if blocks:
             payload["blocks"] = blocks
             
-        response = requests.post(endpoint, headers=self.headers, json=payload)
-        response_data = response.json()
+        response_data = self._post("chat.postMessage", payload)
         
         if not response_data.get("ok"):
             error = response_data.get("error", "Unknown error")
-            print(f"Error sending message: {error}")
+            logger.error("Error sending message: %s", error)
         
         return response_data
     
@@ -128,19 +197,13 @@ class SlackMessenger:
             payload["text"] = formatted_content
             
         # Send the message
-        print(f"Sending markdown snippet to channel {channel}...")
-        print("*********************")
-        print(f"endpoint: {endpoint}")
-        print("*********************")
-        print(f"payload: {payload}")
-        print("*********************")
-        response = requests.post(endpoint, headers=self.headers, json=payload)
-        response_data = response.json()
+        logger.debug("Sending markdown snippet to channel %s via %s", channel, endpoint)
+        response_data = self._post("chat.postMessage", payload)
         
         if not response_data.get("ok"):
             error = response_data.get("error", "Unknown error")
-            print(f"Error sending markdown snippet: {error}")
-            print(f"Response details: {response_data}")
+            logger.error("Error sending markdown snippet: %s", error)
+            logger.debug("Response details: %s", response_data)
             
             # Fallback to sending as plain text if blocks fail
             if "blocks" in payload:
@@ -148,30 +211,101 @@ class SlackMessenger:
                 payload["text"] = f"{initial_comment or 'Report content:'}\n\n{formatted_content}"
                 
                 # Try again without blocks
-                print("Trying to send message without blocks...")
-                response = requests.post(endpoint, headers=self.headers, json=payload)
-                response_data = response.json()
+                logger.info("Trying to send message without blocks...")
+                response_data = self._post("chat.postMessage", payload)
                 
                 if not response_data.get("ok"):
-                    print(f"Fallback also failed: {response_data.get('error', 'Unknown error')}")
+                    logger.error("Fallback also failed: %s", response_data.get('error', 'Unknown error'))
         
         return response_data
 
+    def _report_payloads(self, channel, markdown_content, filename, lead=True, label=None, max_part_length=None):
+        """
+        Pack report markdown into validated chat.postMessage payloads.
+
+        Parameters:
+        - lead: Put the "new report" announcement and the report header in the first message
+        - label: Optional label appended to the fallback text, e.g. "section 2"
+        """
+        lead_blocks = None
+        if lead:
+            # The announcement rides along in the first message instead of costing its own call
+            lead_blocks = [
+                {
+                    "type": "section",
+                    "text": {"type": "mrkdwn", "text": "🔔 *New Market Trends Report Available*"}
+                },
+                {
+                    "type": "header",
+                    "text": {"type": "plain_text", "text": f"Report: {filename}"[:150], "emoji": True}
+                },
+            ]
+        messages = pack_report(
+            markdown_content,
+            max_section_chars=max_part_length or self.max_char_length,
+            lead_blocks=lead_blocks
+        )
+        title = f"Report: {filename}" + (f", {label}" if label else "")
+        payloads = []
+        for i, blocks in enumerate(messages):
+            text = title if len(messages) == 1 else f"{title} ({i+1}/{len(messages)})"
+            payload = {"channel": channel, "text": text, "blocks": blocks}
+            validate_payload(payload, DEFAULT_MAX_MESSAGE_CHARS)
+            payloads.append(payload)
+        return payloads
+
+    def _post_payloads(self, payloads):
+        """Post payloads in order, stopping at the first failure. Returns True if all were sent."""
+        for i, payload in enumerate(payloads):
+            response = self._post("chat.postMessage", payload)
+            if not response.get("ok", False):
+                logger.error("Failed to send part %d/%d: %s", i + 1, len(payloads), response.get('error', 'Unknown error'))
+                return False
+        return True
+
+    def send_report_section(self, channel, section_markdown, filename, index):
+        """
+        Send finished sections of a report that is still being written.
+
+        The first part carries the report announcement, so a streamed report
+        reads the same in the channel as one sent with `send_report`.
+
+        Parameters:
+        - channel: The channel ID or name (with #) to send to
+        - section_markdown: Markdown of one or more finished sections
+        - filename: Report file name shown in the header
+        - index: Zero-based number of the part of the report being sent
+
+        Returns:
+        - True if successful, False otherwise
+        """
+        try:
+            payloads = self._report_payloads(channel, section_markdown, filename, lead=index == 0,
+                                             label=f"part {index + 1}")
+            return self._post_payloads(payloads)
+        except Exception as e:
+            logger.error("Error sending report section to Slack: %s", e)
+            return False
+
     def send_report(self, channel, report_file_path, max_part_length=None):
         """
-        Sends a report markdown file to Slack as a formatted message.
+        Sends a report markdown file to Slack as formatted messages.
+
+        The report is split on markdown structure (headings, paragraphs, list
+        items) and packed into as few messages as Slack's block limits allow.
+        Every payload is validated before it is sent.
         
         Parameters:
         - channel: The channel ID or name (with #) to send to
         - report_file_path: Path to the markdown report file
-        - max_part_length: Optional override for max character length per part
+        - max_part_length: Optional override for max character length per section block
         
         Returns:
         - True if successful, False otherwise
         """
-        print(f"Attempting to send report: {report_file_path}")
+        logger.debug("Attempting to send report: %s", report_file_path)
         if not os.path.exists(report_file_path):
-            print(f"Report file not found: {report_file_path}")
+            logger.error("Report file not found: %s", report_file_path)
             return False
             
         try:
@@ -179,64 +313,26 @@ class SlackMessenger:
             with open(report_file_path, 'r') as file:
                 markdown_content = file.read()
             
-            # Get timestamp and filename for the message
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             filename = os.path.basename(report_file_path)
-            
-            # Send an introduction message
-            self.send_message(
-                channel, 
-                f"🔔 *New Market Trends Report Available*\n"
-            )
-            
-            # Use provided max_part_length or fall back to instance value
-            part_length = max_part_length or self.max_char_length
-            
-            # Send the markdown content
-            # Slack has message size limits
-            if len(markdown_content) <= part_length:
-                # Send as a single message
-                response = self.send_markdown_snippet(
-                    channel,
-                    markdown_content,
-                    title=f"Report: {filename}",
-                    initial_comment="Here's the detailed report:"
-                )
-                
-                success = response.get("ok", False)
-            else:
-                # Split into multiple messages if too long
-                parts = [markdown_content[i:i+part_length] for i in range(0, len(markdown_content), part_length)]
-                
-                self.send_message(channel, f"The report is split into {len(parts)} parts due to length:")
-                
-                success = True
-                for i, part in enumerate(parts):
-                    response = self.send_markdown_snippet(
-                        channel,
-                        part,
-                        title=f"Report Part {i+1}/{len(parts)}",
-                        initial_comment=f"Report: {filename} (continued)"
-                    )
-                    if not response.get("ok", False):
-                        success = False
-                        print(f"Failed to send part {i+1}: {response.get('error', 'Unknown error')}")
-                    else:
-                        print(f"Successfully sent part {i+1}/{len(parts)}")
+            payloads = self._report_payloads(channel, markdown_content, filename, lead=True,
+                                             max_part_length=max_part_length)
+            success = self._post_payloads(payloads)
             
             if success:
-                print(f"Successfully sent report to Slack channel {channel}")
+                logger.info("Sent report to Slack channel %s in %d message(s)", channel, len(payloads))
                 return True
             else:
-                print(f"Failed to send report to Slack")
+                logger.error("Failed to send report %s to Slack channel %s", report_file_path, channel)
                 return False
                 
         except Exception as e:
-            print(f"Error sending report to Slack: {str(e)}")
+            logger.error("Error sending report to Slack: %s", e)
             return False
         
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     # Example usage
     slack = SlackMessenger(max_char_length=3000)  # Configure with 5000 character limit
     # slack.send_message("#general", "Hello from Python!")
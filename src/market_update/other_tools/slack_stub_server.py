@@ -0,0 +1,131 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SlackStubServer:
+    """
+    Minimal local stand-in for the Slack Web API.
+
+    Accepts chat.postMessage and chat.update, records every call and can
+    simulate per-channel rate limiting (HTTP 429 with Retry-After) and latency.
+    Point SlackMessenger at it with SLACK_API_BASE_URL=http://127.0.0.1:<port>/api/.
+
+    Example:
+        with SlackStubServer() as stub:
+            os.environ["SLACK_API_BASE_URL"] = stub.base_url
+            ...
+            print(stub.messages)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, channel_rate=None, retry_after=1):
+        """
+        Parameters:
+        - host: Interface to bind
+        - port: Port to bind (0 picks a free port)
+        - latency: Seconds to sleep before answering each call
+        - channel_rate: If set, maximum calls per second per channel before answering 429
+        - retry_after: Retry-After value sent with simulated 429 responses
+        """
+        self.latency = latency
+        self.channel_rate = channel_rate
+        self.retry_after = retry_after
+        self.calls = []
+        self.rate_limited = 0
+        self._last_call = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    payload = {}
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                status, headers, body = stub.handle(method, payload, self.headers.get("Authorization"))
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    @property
+    def messages(self):
+        """Successful chat.postMessage payloads, in arrival order."""
+        with self._lock:
+            return [c["payload"] for c in self.calls if c["method"] == "chat.postMessage" and c["ok"]]
+
+    def handle(self, method, payload, authorization):
+        if self.latency:
+            time.sleep(self.latency)
+        channel = payload.get("channel")
+        now = time.monotonic()
+        with self._lock:
+            if not authorization or not authorization.startswith("Bearer "):
+                return 200, {}, {"ok": False, "error": "not_authed"}
+            if self.channel_rate and channel:
+                last = self._last_call.get(channel)
+                if last is not None and now - last < 1.0 / self.channel_rate:
+                    self.rate_limited += 1
+                    return 429, {"Retry-After": str(self.retry_after)}, {"ok": False, "error": "ratelimited"}
+                self._last_call[channel] = now
+
+            if method not in ("chat.postMessage", "chat.update"):
+                return 200, {}, {"ok": False, "error": "unknown_method"}
+            if not channel:
+                return 200, {}, {"ok": False, "error": "channel_not_found"}
+
+            ts = payload.get("ts") or f"{time.time():.6f}"
+            self.calls.append({"method": method, "payload": payload, "ok": True, "ts": ts})
+            return 200, {}, {"ok": True, "channel": channel, "ts": ts, "message": payload}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="slack-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the Slack Web API.")
+    # Not 8765, which `serve` listens on by default
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--channel-rate", type=float, default=None)
+    args = parser.parse_args()
+
+    stub = SlackStubServer(port=args.port, latency=args.latency, channel_rate=args.channel_rate)
+    print(f"Slack stub listening on {stub.base_url} (set SLACK_API_BASE_URL to this)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
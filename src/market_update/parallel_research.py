@@ -0,0 +1,106 @@
+"""
+Research split into independent sub-tasks that run at the same time.
+
+A single research agent used to look up company news, upcoming catalysts and
+sector context one after another in one long loop. The lookups do not depend
+on each other, so each is now its own task with its own agent, run with
+crewai's async task execution, and the reporting task gets all three outputs
+as context. A semaphore shared by the sub-tasks of a crew caps how many of
+them run at once (RESEARCH_MAX_PARALLEL).
+"""
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+from pydantic import PrivateAttr
+
+from .checkpoints import ResumableTask
+from .tickers import get_ticker_config
+
+
+PARALLEL_RESEARCH = os.getenv("PARALLEL_RESEARCH", "true").lower() in ("1", "true", "yes")
+RESEARCH_MAX_PARALLEL = int(os.getenv("RESEARCH_MAX_PARALLEL", "3"))
+
+# Research sub-tasks (tasks.yaml name -> agents.yaml name) and each one's share
+# of the analyst's news budget (NEWS_TOKEN_BUDGET, NEWS_MAX_ITEMS)
+RESEARCH_SUBTASKS = {
+    'company_news_task': ('researcher', 0.5),
+    'catalyst_task': ('catalyst_researcher', 0.25),
+    'sector_news_task': ('sector_researcher', 0.25),
+}
+
+
+class LimitedAsyncTask(ResumableTask):
+    """
+    Task whose async execution waits for a slot of a semaphore shared with
+    the other research sub-tasks.
+
+    The worker thread also runs in a copy of the caller's context, so spans
+    and log lines of the sub-task keep the run ID, and a failing sub-task
+    fails the crew instead of leaving it waiting on the future.
+    """
+
+    _slots: Any = PrivateAttr(default=None)
+
+    def limit(self, slots):
+        """Run at most as many of the tasks sharing `slots` (a threading.Semaphore) at once. Returns self."""
+        self._slots = slots
+        return self
+
+    def execute_async(self, agent=None, context=None, tools=None) -> Future:
+        future = Future()
+        run_in_context = contextvars.copy_context().run
+        threading.Thread(
+            daemon=True,
+            name=f"research-{self.name or 'task'}",
+            target=run_in_context,
+            args=(self._execute_limited, agent, context, tools, future),
+        ).start()
+        return future
+
+    def _execute_limited(self, agent, context, tools, future):
+        slots = self._slots
+        if slots is not None:
+            slots.acquire()
+        try:
+            future.set_result(self._execute_core(agent, context, tools))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            if slots is not None:
+                slots.release()
+
+
+def research_slots(max_parallel=RESEARCH_MAX_PARALLEL):
+    """Semaphore for one crew's research sub-tasks (at least one runs at a time)."""
+    return threading.Semaphore(max(1, int(max_parallel)))
+
+
+def sector_inputs(symbol, config=None, max_queries=4):
+    """
+    Kickoff inputs of the sector/peer research sub-task for a symbol.
+
+    Returns:
+    - Dictionary with 'sector_context' (one sentence on the sector and peers)
+      and 'sector_queries' (JSON list of queries for the multi-query search)
+    """
+    config = config or get_ticker_config()
+    profile = config.profile(symbol)
+    peers = config.peers(profile.symbol)
+    name = profile.aliases[0] if profile.aliases else profile.symbol
+
+    queries = list(config.sector_queries.get(profile.sector, [])) if profile.sector else []
+    if peers:
+        queries.append(f"{' '.join(peers[:3])} stock news")
+    queries.append(f"{name} competitors news")
+    queries = list(dict.fromkeys(queries))[:max_queries]
+
+    if profile.sector:
+        context = f"{profile.symbol} is in the {profile.sector} sector"
+        context += f" and its closest listed peers are {', '.join(peers)}." if peers else "."
+    else:
+        context = f"The sector and peers of {profile.symbol} are not configured; identify them from the news."
+    return {'sector_context': context, 'sector_queries': json.dumps(queries)}
@@ -0,0 +1,198 @@
+"""
+Market-wide prefetch stage for batch runs.
+
+Without it every ticker's researcher runs its own broad searches, so market
+and sector news (the Fed, chip export rules, drug pricing) is fetched and
+summarised again for every symbol in the sector. The prefetch runs the
+market-wide queries, the queries of every sector in the batch and two short
+queries per ticker once, in one concurrent multi-query search, and indexes
+the results by word. Each ticker's research task then gets its ranked slice
+of the index as input and does not search at all.
+"""
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+
+from .instrumentation import increment, span
+from .tickers import get_ticker_config
+from .tools.multi_search_tool import STANDARD_QUERY_TEMPLATES, MultiQuerySearchTool
+from .tools.news_ranking import DEFAULT_MAX_ITEMS, DEFAULT_TOKEN_BUDGET, rank_news
+from .tools.search_client import DEFAULT_RATE_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+MARKET = "market"
+# Seconds to wait for the searches beyond the time the search rate limit needs to start them all
+DEFAULT_TIMEOUT_SLACK = float(os.getenv("PREFETCH_TIMEOUT_SLACK", "60"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+class NewsIndex:
+    """
+    In-memory inverted index from words to news items.
+
+    Looking up a ticker or company alias intersects the posting sets of its
+    words and then checks the phrase itself, so only items that really
+    mention the name are returned.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.scopes = []
+        self._texts = []
+        self._postings = defaultdict(set)
+        self._by_scope = defaultdict(set)
+
+    def add(self, item, scope):
+        """Index an item found by a query of `scope` ('market', 'sector:<name>' or 'symbol:<SYMBOL>')."""
+        item_id = len(self.items)
+        text = f"{item.get('title', '')} {item.get('snippet', '')}"
+        self.items.append(item)
+        self.scopes.append(scope)
+        self._texts.append(text)
+        for word in set(_words(text)):
+            self._postings[word].add(item_id)
+        self._by_scope[scope].add(item_id)
+        return item_id
+
+    def lookup(self, phrase, case_sensitive=False):
+        """IDs of the items whose title or snippet contains `phrase` as whole words."""
+        words = _words(phrase)
+        if not words:
+            return set()
+        candidates = set.intersection(*(self._postings.get(word, set()) for word in words))
+        pattern = re.compile(r"\b" + re.escape(phrase) + r"\b", 0 if case_sensitive else re.IGNORECASE)
+        return {i for i in candidates if pattern.search(self._texts[i])}
+
+    def mentions(self, profile):
+        """IDs of the items mentioning a ticker (case-sensitive, so 'NOW' is not 'now') or one of its aliases."""
+        ids = self.lookup(profile.symbol, case_sensitive=True)
+        for alias in profile.aliases:
+            ids |= self.lookup(alias)
+        return ids
+
+    def in_scope(self, scope):
+        return set(self._by_scope.get(scope, set()))
+
+    def __len__(self):
+        return len(self.items)
+
+
+class MarketPrefetch:
+    """
+    Fetch market, sector and ticker news for a whole batch once, then hand
+    each ticker its relevant, ranked slice.
+
+    A ticker's slice is every item that mentions it or one of its aliases,
+    the items its own queries found, its sector's news and the market-wide
+    news, ranked for the ticker and cut to the token budget. A ticker whose
+    own queries timed out or failed is not covered (see covers()) and should
+    search for itself.
+    """
+
+    def __init__(self, symbols, config=None, search_tool=None, max_results=20, time_period="d", timeout=None,
+                 token_budget=DEFAULT_TOKEN_BUDGET, max_items=DEFAULT_MAX_ITEMS):
+        """
+        Parameters:
+        - symbols: Ticker symbols of the batch
+        - config: TickerConfig with aliases, sectors and shared queries (default: config/tickers.yaml)
+        - search_tool: MultiQuerySearchTool used for the searches
+        - max_results: Results per query
+        - time_period: 'd', 'w' or 'm'
+        - timeout: Seconds to wait for all searches (default: what the search rate limit needs
+          for the planned queries plus DEFAULT_TIMEOUT_SLACK)
+        - token_budget, max_items: Limits of each ticker's slice
+        """
+        self.symbols = [s.upper() for s in symbols]
+        self.config = config or get_ticker_config()
+        self.search_tool = search_tool or MultiQuerySearchTool()
+        self.max_results = max_results
+        self.time_period = time_period
+        self.timeout = timeout
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.index = NewsIndex()
+        self.stats = {}
+        self._failed_scopes = set()
+
+    def plan_queries(self):
+        """
+        Queries of the prefetch and the scope of each.
+
+        Returns:
+        - Dictionary of query -> scope, market queries first
+        """
+        queries = {query: MARKET for query in self.config.market_queries}
+        sectors = []
+        for symbol in self.symbols:
+            sector = self.config.profile(symbol).sector
+            if sector and sector not in sectors:
+                sectors.append(sector)
+        for sector in sectors:
+            for query in self.config.sector_queries.get(sector, []):
+                queries.setdefault(query, f"sector:{sector}")
+        for symbol in self.symbols:
+            profile = self.config.profile(symbol)
+            queries.setdefault(f"{symbol} stock news", f"symbol:{symbol}")
+            name = profile.aliases[0] if profile.aliases else symbol
+            queries.setdefault(f"{name} latest news", f"symbol:{symbol}")
+        return queries
+
+    def run(self):
+        """Run every query once and index the results. Returns self."""
+        queries = self.plan_queries()
+        timeout = self.timeout
+        if timeout is None:
+            # Searches are paced by the shared rate limit, so most of them wait their turn
+            timeout = len(queries) / DEFAULT_RATE_PER_SECOND + DEFAULT_TIMEOUT_SLACK
+        start = time.perf_counter()
+        with span("prefetch.search", queries=len(queries), symbols=len(self.symbols)):
+            result = self.search_tool._run(queries=list(queries), max_results=self.max_results,
+                                           time_period=self.time_period, timeout=timeout)
+        for item in result.get("results", []):
+            self.index.add(item, queries.get(item.get("query"), MARKET))
+        failed = list(result.get("timed_out", [])) + list(result.get("errors", {}))
+        self._failed_scopes = {queries[query] for query in failed if query in queries}
+
+        # What the researchers would have run: the standard variations per ticker
+        per_ticker = len(self.symbols) * len(STANDARD_QUERY_TEMPLATES)
+        self.stats = {
+            "queries": len(queries),
+            "queries_without_prefetch": per_ticker,
+            "items": len(self.index),
+            "timed_out": len(result.get("timed_out", [])),
+            "errors": len(result.get("errors", {})),
+            "seconds": round(time.perf_counter() - start, 2),
+            "uncovered": [symbol for symbol in self.symbols if not self.covers(symbol)],
+        }
+        increment("prefetch_queries_total", len(queries))
+        logger.info("Prefetched %d items with %d queries for %d tickers (%d queries without prefetch) in %.1fs",
+                    len(self.index), len(queries), len(self.symbols), per_ticker, self.stats["seconds"])
+        return self
+
+    def covers(self, symbol):
+        """False if the ticker's own queries timed out or failed, leaving its slice incomplete."""
+        return f"symbol:{symbol.upper()}" not in self._failed_scopes
+
+    def items_for(self, symbol):
+        """
+        The ranked slice of the prefetched news for one ticker.
+
+        Returns:
+        - List of search result dictionaries, best first, each with its 'score'
+        """
+        profile = self.config.profile(symbol)
+        ids = self.index.mentions(profile) | self.index.in_scope(f"symbol:{profile.symbol}") \
+            | self.index.in_scope(MARKET)
+        if profile.sector:
+            ids |= self.index.in_scope(f"sector:{profile.sector}")
+        candidates = [self.index.items[i] for i in sorted(ids)]
+        return rank_news(candidates, profile.symbol, profile.aliases,
+                         token_budget=self.token_budget, max_items=self.max_items)
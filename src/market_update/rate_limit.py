@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from crewai.utilities.rpm_controller import RPMController
+
+
+class RequestBudget:
+    """
+    Thread-safe sliding-window request budget shared by many agents.
+
+    Every LLM request made by an agent that is attached to the budget takes a
+    slot; once `max_rpm` slots have been taken inside the current window the
+    caller blocks until the oldest one expires.
+    """
+
+    def __init__(self, max_rpm, window_seconds=60.0):
+        """
+        Parameters:
+        - max_rpm: Maximum number of requests allowed per window across all workers
+        - window_seconds: Length of the sliding window in seconds (default: 60)
+        """
+        if max_rpm <= 0:
+            raise ValueError("max_rpm must be a positive integer.")
+        self.max_rpm = max_rpm
+        self.window_seconds = window_seconds
+        self._timestamps = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request slot is available and take it.
+
+        Returns:
+        - Number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.window_seconds:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.max_rpm:
+                    self._timestamps.append(now)
+                    return waited
+                delay = self.window_seconds - (now - self._timestamps[0])
+            time.sleep(delay)
+            waited += delay
+
+    @property
+    def in_flight(self):
+        """Number of slots taken in the current window."""
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for ts in self._timestamps if now - ts < self.window_seconds)
+
+
+class SharedRPMController(RPMController):
+    """
+    RPMController that enforces the agent's own `max_rpm` and additionally
+    draws every request from a process-wide RequestBudget.
+    """
+
+    budget: Optional[Any] = None
+
+    def check_or_wait(self) -> bool:
+        allowed = super().check_or_wait()
+        if self.budget is not None:
+            self.budget.acquire()
+        return allowed
+
+
+def attach_request_budget(agent, budget):
+    """
+    Route an agent's rate limiting through a shared RequestBudget.
+
+    The agent keeps its own per-agent `max_rpm` limit; the shared budget caps
+    the combined request rate of every agent attached to it.
+
+    Parameters:
+    - agent: A crewai Agent
+    - budget: RequestBudget instance, or None to leave the agent untouched
+
+    Returns:
+    - The same agent, for chaining
+    """
+    if budget is None:
+        return agent
+
+    existing = agent._rpm_controller
+    if existing is not None:
+        existing.stop_rpm_counter()
+
+    agent._rpm_controller = SharedRPMController(
+        max_rpm=agent.max_rpm,
+        logger=agent._logger,
+        budget=budget,
+    )
+    return agent
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared across threads and, optionally, processes.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. When a
+    `state_path` is given the bucket state lives in that file and is updated
+    under an exclusive file lock, so every process pointing at the same file
+    shares one budget (e.g. all workers of a batch started from cron).
+    """
+
+    def __init__(self, rate, capacity=None, state_path=None):
+        """
+        Parameters:
+        - rate: Tokens added per second
+        - capacity: Maximum burst size (default: max(1, rate))
+        - state_path: Optional file used to share the bucket across processes
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.state_path = state_path
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        if state_path:
+            directory = os.path.dirname(state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Take `tokens` from the bucket, waiting for them to refill if needed.
+
+        Parameters:
+        - tokens: Number of tokens to take
+        - timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+        - True if the tokens were taken, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._take(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _take(self, tokens):
+        # Returns 0 when the tokens were taken, otherwise the seconds to wait
+        if self.state_path:
+            return self._take_shared(tokens)
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0
+        return (tokens - self._tokens) / self.rate
+
+    def _take_shared(self, tokens):
+        import fcntl
+
+        with open(self.state_path, "a+") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                try:
+                    state = json.loads(file.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                available = state.get("tokens", self.capacity)
+                updated = state.get("updated", now)
+                available = min(self.capacity, available + max(0.0, now - updated) * self.rate)
+                wait = 0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps({"tokens": available, "updated": now}))
+                file.flush()
+                return wait
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
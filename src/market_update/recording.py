@@ -0,0 +1,261 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from crewai.llms.base_llm import BaseLLM
+
+
+DEFAULT_FIXTURES_DIR = os.getenv("FIXTURES_DIR", "fixtures")
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class FixtureMissError(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def fixture_key(kind, payload):
+    """Stable short hash of a call's arguments."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return f"{kind}:{hashlib.sha256(encoded).hexdigest()[:24]}"
+
+
+def fixture_path(name, fixtures_dir=DEFAULT_FIXTURES_DIR):
+    if name.endswith(".json.gz") or os.sep in name:
+        return name
+    return os.path.join(fixtures_dir, f"{name}.json.gz")
+
+
+class FixtureStore:
+    """
+    Compact on-disk store of recorded calls.
+
+    Responses are stored per call key in the order they happened, so a prompt
+    that is sent twice replays both answers in sequence. The whole store is a
+    single gzip-compressed JSON file that also keeps run metadata such as the
+    kickoff inputs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.calls = {}
+        self.misses = 0
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                data = json.load(file)
+            self.meta = data.get("meta", {})
+            self.calls = data.get("calls", {})
+
+    def add(self, key, value):
+        with self._lock:
+            self.calls.setdefault(key, []).append(value)
+
+    def next(self, key):
+        """Return the next recorded response for a key."""
+        with self._lock:
+            responses = self.calls.get(key)
+            if not responses:
+                self.misses += 1
+                raise FixtureMissError(f"No recorded response for {key} in {self.path}")
+            cursor = self._cursors.get(key, 0)
+            # Past the end, keep answering with the last response
+            value = responses[min(cursor, len(responses) - 1)]
+            self._cursors[key] = cursor + 1
+            return value
+
+    def rewind(self):
+        with self._lock:
+            self._cursors.clear()
+            self.misses = 0
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {"meta": self.meta, "calls": self.calls}
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for key, responses in self.calls.items():
+                kind = key.split(":", 1)[0]
+                counts[kind] = counts.get(kind, 0) + len(responses)
+            return counts
+
+
+def _message_payload(messages):
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return [{"role": m.get("role"), "content": m.get("content")} for m in messages]
+
+
+class RecordingLLM(BaseLLM):
+    """Delegates to a real LLM and records every completion."""
+
+    def __init__(self, inner, session):
+        super().__init__(model=inner.model, temperature=getattr(inner, "temperature", None))
+        self.inner = inner
+        self.session = session
+
+    @property
+    def stop(self):
+        return self.inner.stop
+
+    @stop.setter
+    def stop(self, value):
+        # Crewai sets stop words on the agent's LLM; they belong to the real one
+        if "inner" in self.__dict__:
+            self.inner.stop = value
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        response = self.inner.call(
+            messages,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            from_task=from_task,
+            from_agent=from_agent,
+        )
+        key = fixture_key("llm", _message_payload(messages))
+        self.session.store.add(key, response if isinstance(response, str) else str(response))
+        return response
+
+    def supports_function_calling(self):
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self):
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
+
+    def __getattr__(self, name):
+        # Only called for attributes not found normally, e.g. provider-specific settings
+        if "inner" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+class ReplayLLM(BaseLLM):
+    """Answers every completion from a FixtureStore; never touches the network."""
+
+    def __init__(self, session, model="replay"):
+        self.session = session
+        super().__init__(model=model, temperature=0)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        return self.session.store.next(fixture_key("llm", _message_payload(messages)))
+
+    def supports_function_calling(self):
+        return False
+
+    def get_context_window_size(self):
+        return 128000
+
+
+class RecordReplaySession:
+    """
+    Record or replay every LLM completion and search tool call of a run.
+
+    While a session is active (see `activate`), the crew builds its agents on
+    the session's LLM and DuckDuckGoSearchTool routes calls through `search`.
+    Other inputs to the prompts that depend on local state (which news items
+    earlier runs covered, the clock news is ranked against) are recorded too.
+    """
+
+    def __init__(self, store, mode):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be '{RECORD}' or '{REPLAY}'")
+        self.store = store
+        self.mode = mode
+
+    @classmethod
+    def open(cls, name, mode, fixtures_dir=DEFAULT_FIXTURES_DIR):
+        path = fixture_path(name, fixtures_dir)
+        if mode == REPLAY and not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture not found: {path}")
+        store = FixtureStore(path)
+        if mode == RECORD:
+            # Start a fresh recording instead of appending to an old one
+            store.calls = {}
+            store.meta = {"recorded_at": str(datetime.now()), "clock": time.time()}
+        return cls(store, mode)
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def llm(self):
+        """LLM instance for agents built while this session is active."""
+        if self.replaying:
+            return ReplayLLM(self)
+        from crewai.utilities.llm_utils import create_llm
+        return RecordingLLM(create_llm(None), self)
+
+    def clock(self):
+        """
+        Unix time of the recording. News recency is measured from it when
+        recording and when replaying, so the ranked results in the prompts match.
+        """
+        if "clock" not in self.store.meta:
+            # Fixtures recorded before the clock was stored
+            self.store.meta["clock"] = datetime.fromisoformat(self.store.meta["recorded_at"]).timestamp()
+        return self.store.meta["clock"]
+
+    def call(self, kind, arguments, live_call):
+        """
+        Serve a call that reads live state from the fixture store, or run it and record it.
+
+        Parameters:
+        - kind: Kind of call, the prefix of its fixture key (e.g. 'search')
+        - arguments: Dictionary of the call arguments (the fixture key)
+        - live_call: Zero-argument callable performing the real call
+        """
+        key = fixture_key(kind, arguments)
+        if self.replaying:
+            return self.store.next(key)
+        result = live_call()
+        self.store.add(key, result)
+        return result
+
+    def search(self, arguments, live_call):
+        """Serve a search tool call from the fixture store, or run it and record it."""
+        return self.call("search", arguments, live_call)
+
+    def save(self):
+        if self.mode == RECORD:
+            self.store.save()
+
+
+_active_session = None
+
+
+def get_active_session():
+    return _active_session
+
+
+@contextmanager
+def activate(session):
+    """Make `session` the process-wide record/replay session for the duration of the block."""
+    global _active_session
+    previous = _active_session
+    _active_session = session
+    try:
+        yield session
+    finally:
+        _active_session = previous
+        session.save()
@@ -0,0 +1,382 @@
+"""
+Indexed history of the reports the crew has produced.
+
+Every published report is stored once in SQLite with its symbol, time, run ID,
+the URLs it cites and its sections, and the sections are indexed with FTS5.
+Questions like "what did we say about NVDA last week" become an indexed
+lookup instead of a scan of every markdown file under output/.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from .other_tools.report_packer import split_sections
+from .tools.news_dedup import canonicalize_url
+
+
+DEFAULT_REPORT_STORE_PATH = os.getenv("REPORT_STORE_PATH", ".cache/reports.sqlite")
+# 0 keeps reports forever
+DEFAULT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "0"))
+
+_URL_RE = re.compile(r"https?://[^\s<>()\[\]\"'`]+")
+_TITLE_RE = re.compile(r"^#{1,6}\s+(.*?)\s*#*\s*$")
+# Report files are written as <SYMBOL>_report_<YYYYmmdd_HHMMSS>.md
+_FILENAME_RE = re.compile(r"^(?P<symbol>.+?)_report_(?P<timestamp>\d{8}_\d{6})\.md$")
+
+
+@dataclass
+class ReportHit:
+    id: int
+    symbol: str
+    created_at: float
+    path: str
+    title: str
+    run_id: Optional[str] = None
+    # Matching text from the best section when the query had keywords
+    snippet: Optional[str] = None
+
+    @property
+    def created(self):
+        return datetime.fromtimestamp(self.created_at).strftime("%Y-%m-%d %H:%M")
+
+    def as_dict(self):
+        return dict(asdict(self), created=self.created)
+
+
+def extract_urls(markdown):
+    """Canonical URLs cited in a report, in order of first appearance."""
+    urls = []
+    for match in _URL_RE.finditer(markdown):
+        url = canonicalize_url(match.group(0).rstrip(".,;:!?*_")) or match.group(0)
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+def _heading(section):
+    first = section.lstrip().split("\n", 1)[0]
+    match = _TITLE_RE.match(first)
+    return match.group(1) if match else ""
+
+
+def fts_query(keywords):
+    """
+    Turn free text into an FTS5 query matching every word.
+
+    Each word is quoted, so punctuation and FTS operators typed by a user are
+    searched for literally instead of raising a syntax error.
+    """
+    terms = keywords.split() if isinstance(keywords, str) else list(keywords)
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms if term)
+
+
+def parse_report_filename(path):
+    """
+    Symbol and creation time encoded in a report file name.
+
+    Returns:
+    - (symbol, unix time), or (None, None) when the name does not follow the pattern
+    """
+    match = _FILENAME_RE.match(os.path.basename(path))
+    if not match:
+        return None, None
+    created = datetime.strptime(match.group("timestamp"), "%Y%m%d_%H%M%S")
+    return match.group("symbol").upper(), created.timestamp()
+
+
+class ReportStore:
+    """
+    SQLite store of published reports with a full-text index over their sections.
+
+    Reports are looked up by symbol and time range through an index and by
+    keyword through FTS5 (ranked with bm25); cited URLs have their own index
+    so "which reports used this article" does not scan report bodies.
+    """
+
+    def __init__(self, path=DEFAULT_REPORT_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                run_id TEXT,
+                path TEXT UNIQUE,
+                title TEXT,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_symbol_time ON reports (symbol, created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_time ON reports (created_at);
+            CREATE TABLE IF NOT EXISTS report_sections (
+                id INTEGER PRIMARY KEY,
+                report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                heading TEXT,
+                body TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_sections_report ON report_sections (report_id);
+            CREATE TABLE IF NOT EXISTS report_urls (
+                report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+                url TEXT NOT NULL,
+                PRIMARY KEY (report_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_urls_url ON report_urls (url);
+            CREATE VIRTUAL TABLE IF NOT EXISTS report_sections_fts USING fts5 (
+                heading, body, content='report_sections', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS report_sections_ai AFTER INSERT ON report_sections BEGIN
+                INSERT INTO report_sections_fts (rowid, heading, body) VALUES (new.id, new.heading, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS report_sections_ad AFTER DELETE ON report_sections BEGIN
+                INSERT INTO report_sections_fts (report_sections_fts, rowid, heading, body)
+                VALUES ('delete', old.id, old.heading, old.body);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def add_report(self, symbol, markdown, path=None, run_id=None, created_at=None):
+        """
+        Index a report. A report already stored under the same path is replaced.
+
+        Parameters:
+        - symbol: Ticker symbol the report is about
+        - markdown: Report content
+        - path: Report file path (optional; unique when given)
+        - run_id: Correlation ID of the crew run that produced it
+        - created_at: Unix time (default: now)
+
+        Returns:
+        - ID of the stored report
+        """
+        sections = split_sections(markdown)
+        title = next((_heading(s) for s in sections if _heading(s)), "")
+        with self._lock:
+            with self._conn:
+                if path is not None:
+                    self._conn.execute("DELETE FROM reports WHERE path = ?", (path,))
+                cursor = self._conn.execute(
+                    "INSERT INTO reports (symbol, created_at, run_id, path, title, content) VALUES (?, ?, ?, ?, ?, ?)",
+                    (symbol.upper(), created_at or time.time(), run_id, path, title, markdown),
+                )
+                report_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO report_sections (report_id, position, heading, body) VALUES (?, ?, ?, ?)",
+                    [(report_id, i, _heading(s), s) for i, s in enumerate(sections)],
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO report_urls (report_id, url) VALUES (?, ?)",
+                    [(report_id, url) for url in extract_urls(markdown)],
+                )
+        return report_id
+
+    def add_file(self, path, symbol=None, run_id=None):
+        """
+        Index a report file; symbol and time default to the ones in its file name.
+
+        Returns:
+        - ID of the stored report
+        """
+        name_symbol, created_at = parse_report_filename(path)
+        symbol = symbol or name_symbol
+        if not symbol:
+            raise ValueError(f"Cannot tell the symbol of {path}; pass it explicitly")
+        with open(path, "r", encoding="utf-8") as file:
+            markdown = file.read()
+        return self.add_report(symbol, markdown, path=path, run_id=run_id,
+                               created_at=created_at or os.path.getmtime(path))
+
+    def import_directory(self, directory="output"):
+        """
+        Backfill the index from report files written before the store existed.
+
+        Files already indexed are skipped.
+
+        Returns:
+        - Number of files indexed
+        """
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT path FROM reports WHERE path IS NOT NULL")}
+        added = 0
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if path in known or parse_report_filename(name)[0] is None:
+                continue
+            self.add_file(path)
+            added += 1
+        return added
+
+    def query(self, symbol=None, since=None, until=None, keywords=None, url=None, limit=20):
+        """
+        Find reports, newest first, or best match first when searching by keyword.
+
+        Parameters:
+        - symbol: Only reports about this symbol
+        - since, until: Unix times bounding the creation time (inclusive, exclusive)
+        - keywords: Words that must all appear in one section of the report
+        - url: Only reports citing this URL (canonicalized before lookup)
+        - limit: Maximum number of reports returned (None for all)
+
+        Returns:
+        - List of ReportHit
+        """
+        where, params = [], []
+        if symbol:
+            where.append("r.symbol = ?")
+            params.append(symbol.upper())
+        if since is not None:
+            where.append("r.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.created_at < ?")
+            params.append(until)
+        if url:
+            where.append("r.id IN (SELECT report_id FROM report_urls WHERE url = ?)")
+            params.append(canonicalize_url(url) or url)
+
+        match = fts_query(keywords) if keywords else None
+        if match:
+            # Best-ranked section per report (bm25 is lower for better matches); with min()
+            # SQLite takes the bare snippet column from the same row
+            sql = (
+                "WITH sections AS MATERIALIZED ("
+                "  SELECT s.report_id, bm25(report_sections_fts) AS rank,"
+                "         snippet(report_sections_fts, 1, '[', ']', ' ... ', 16) AS snippet"
+                "  FROM report_sections_fts JOIN report_sections s ON s.id = report_sections_fts.rowid"
+                "  WHERE report_sections_fts MATCH ?"
+                "), m AS (SELECT report_id, min(rank) AS rank, snippet FROM sections GROUP BY report_id) "
+                "SELECT r.id, r.symbol, r.created_at, r.path, r.title, r.run_id, m.snippet"
+                " FROM m JOIN reports r ON r.id = m.report_id"
+            )
+            params.insert(0, match)
+            order = "m.rank, r.created_at DESC"
+        else:
+            sql = "SELECT r.id, r.symbol, r.created_at, r.path, r.title, r.run_id, NULL FROM reports r"
+            order = "r.created_at DESC"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [ReportHit(id=row[0], symbol=row[1], created_at=row[2], path=row[3], title=row[4],
+                          run_id=row[5], snippet=row[6]) for row in rows]
+
+    def get(self, report_id):
+        """
+        Full record of one report.
+
+        Returns:
+        - Dictionary with the report's fields, content, sections and cited URLs, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, symbol, created_at, run_id, path, title, content FROM reports WHERE id = ?",
+                (report_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            sections = self._conn.execute(
+                "SELECT heading, body FROM report_sections WHERE report_id = ? ORDER BY position", (report_id,)
+            ).fetchall()
+            urls = [r[0] for r in self._conn.execute(
+                "SELECT url FROM report_urls WHERE report_id = ? ORDER BY rowid", (report_id,)
+            )]
+        record = dict(zip(("id", "symbol", "created_at", "run_id", "path", "title", "content"), row))
+        record["sections"] = [{"heading": heading, "body": body} for heading, body in sections]
+        record["urls"] = urls
+        return record
+
+    def export(self, file, **filters):
+        """
+        Write matching reports to an open text file as JSON lines, oldest first.
+
+        Parameters:
+        - file: Writable text file object
+        - filters: Keyword arguments of `query` (symbol, since, until, keywords, url)
+
+        Returns:
+        - Number of reports written
+        """
+        filters["limit"] = None
+        hits = sorted(self.query(**filters), key=lambda hit: hit.created_at)
+        for hit in hits:
+            record = self.get(hit.id)
+            if record is not None:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return len(hits)
+
+    def prune(self, older_than_days=DEFAULT_RETENTION_DAYS, keep_per_symbol=None):
+        """
+        Delete reports past retention.
+
+        Parameters:
+        - older_than_days: Delete reports created more than this many days ago (0 or None keeps them)
+        - keep_per_symbol: Also delete all but the newest N reports of each symbol
+
+        Returns:
+        - Number of reports deleted
+        """
+        deleted = 0
+        with self._lock:
+            with self._conn:
+                if older_than_days:
+                    cursor = self._conn.execute(
+                        "DELETE FROM reports WHERE created_at < ?", (time.time() - older_than_days * 86400,)
+                    )
+                    deleted += cursor.rowcount
+                if keep_per_symbol:
+                    cursor = self._conn.execute(
+                        "DELETE FROM reports WHERE id IN ("
+                        "  SELECT id FROM (SELECT id, row_number() OVER"
+                        "    (PARTITION BY symbol ORDER BY created_at DESC) AS n FROM reports)"
+                        "  WHERE n > ?)",
+                        (keep_per_symbol,),
+                    )
+                    deleted += cursor.rowcount
+        return deleted
+
+    def compact(self):
+        """Merge the full-text index segments and give freed pages back to the file system."""
+        with self._lock:
+            self._conn.execute("INSERT INTO report_sections_fts (report_sections_fts) VALUES ('optimize')")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            reports, symbols = self._conn.execute("SELECT count(*), count(DISTINCT symbol) FROM reports").fetchone()
+        return {"reports": reports, "symbols": symbols, "bytes": os.path.getsize(self.path)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_report_store():
+    """Return the process-wide ReportStore, opening it on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ReportStore()
+        return _default_store
@@ -0,0 +1,263 @@
+"""
+Progressive output of the analyst report while the LLM is still writing it.
+
+With streaming enabled the reporting agent's LLM streams its completion.
+crewai emits every chunk on its event bus; `ReportStream` follows the chunks
+of one task, writes the report to its output file as they arrive and hands
+each finished markdown section to a callback (normally a SectionDelivery
+that posts it to Slack), so readers see the first section long before the
+last one is generated.
+"""
+import logging
+import os
+import threading
+
+from .instrumentation import increment
+from .other_tools.report_packer import is_heading, split_sections
+
+logger = logging.getLogger(__name__)
+
+REPORT_STREAMING = os.getenv("REPORT_STREAMING", "false").lower() in ("1", "true", "yes")
+
+# The agent's final answer follows this marker in crewai's ReAct output
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class ReportStream:
+    """
+    Follow one task's streamed LLM output.
+
+    Only text after the final answer marker belongs to the report. A section
+    is handed on once the next heading line is complete; the last one when the
+    task completes, from crewai's final output. If the agent retries the LLM
+    call, sections that were already handed on are not repeated.
+    """
+
+    def __init__(self, task, on_section=None, write_file=True, on_abort=None):
+        """
+        Parameters:
+        - task: crewai Task whose output is streamed; its output_file is written progressively
+        - on_section: Callable(index, section_markdown) called for every finished section
+        - write_file: Write the report to the task's output file as it arrives
+        - on_abort: Callable() called once when the task fails
+        """
+        self.task = task
+        self.on_section = on_section
+        self.on_abort = on_abort
+        self.write_file = write_file
+        self.sections_emitted = 0
+        self.chunks = 0
+        self.finished = False
+        self._lock = threading.Lock()
+        self._file = None
+        self._reset_call()
+
+    def _reset_call(self):
+        self._text = ""
+        # Report text after the final answer marker; None until the marker arrives
+        self._report = None
+        self._scan_pos = 0
+        self._section_start = 0
+        self._section_has_body = False
+        self._in_code = False
+        self._call_sections = 0
+
+    @property
+    def path(self):
+        # crewai interpolates the output file name at kickoff, before the first chunk
+        return getattr(self.task, "output_file", None)
+
+    def start_call(self):
+        """A new LLM call for the task started; its output replaces the previous call's."""
+        with self._lock:
+            if self.finished:
+                return
+            self._reset_call()
+            if self._file is not None:
+                self._file.seek(0)
+                self._file.truncate()
+
+    def feed(self, chunk):
+        """Consume one streamed chunk of the task's LLM output."""
+        with self._lock:
+            if self.finished or not chunk:
+                return
+            self.chunks += 1
+            if self._report is None:
+                self._text += chunk
+                marker = self._text.find(FINAL_ANSWER_MARKER)
+                if marker < 0:
+                    return
+                self._report = ""
+                chunk = self._text[marker + len(FINAL_ANSWER_MARKER):]
+            if not self._report:
+                # Skip the whitespace between the marker and the report
+                chunk = chunk.lstrip()
+                if not chunk:
+                    return
+            self._report += chunk
+            self._write(chunk)
+            if "\n" in chunk:
+                self._scan()
+
+    def finish(self, final_text):
+        """
+        The task completed: hand on every section not handed on yet.
+
+        Parameters:
+        - final_text: The task's final raw output (authoritative over the streamed text)
+        """
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            self._close_file()
+            # Without a stream the report is published whole, as usual
+            if self.chunks:
+                sections = split_sections(final_text or "")
+                for index in range(self.sections_emitted, len(sections)):
+                    self._emit(index, sections[index])
+        increment("report_stream_runs_total", streamed=bool(self.chunks))
+        logger.debug("Report stream finished: %d chunks, %d sections", self.chunks, self.sections_emitted)
+
+    def abort(self):
+        """The task failed; stop writing and hand nothing else on."""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            self._close_file()
+        if self.on_abort is not None:
+            self.on_abort()
+
+    def _write(self, chunk):
+        if not self.write_file or not self.path:
+            return
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(chunk)
+        # Flush every chunk so `tail -f` on the report shows it as it is written
+        self._file.flush()
+
+    def _close_file(self):
+        # crewai writes the final output to the same file right after the stream ends
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _scan(self):
+        # Look at the lines completed since the last scan for a heading that closes a section
+        report = self._report
+        end = report.rfind("\n") + 1
+        for line in report[self._scan_pos:end].splitlines(keepends=True):
+            stripped = line.strip()
+            if stripped.startswith("```"):
+                self._in_code = not self._in_code
+                self._section_has_body = True
+            elif not self._in_code and is_heading(line):
+                if self._section_has_body:
+                    self._emit_streamed(report[self._section_start:self._scan_pos])
+                    self._section_start = self._scan_pos
+                    self._section_has_body = False
+            elif stripped:
+                self._section_has_body = True
+            self._scan_pos += len(line)
+
+    def _emit_streamed(self, section):
+        index = self._call_sections
+        self._call_sections += 1
+        # A retried call repeats sections the previous call already handed on
+        if index >= self.sections_emitted:
+            self._emit(index, section)
+
+    def _emit(self, index, section):
+        self.sections_emitted = index + 1
+        increment("report_stream_sections_total")
+        if self.on_section is not None:
+            try:
+                self.on_section(index, section)
+            except Exception as e:
+                logger.error("Error handing on report section %d: %s", index + 1, e)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+_listeners_installed = False
+
+
+def watch_task(task, stream):
+    """Route the streamed LLM output of `task` to `stream` until the task finishes."""
+    _install_listeners()
+    with _streams_lock:
+        _streams[str(task.id)] = stream
+
+
+def unwatch_task(task):
+    if task is None:
+        return None
+    with _streams_lock:
+        return _streams.pop(str(task.id), None)
+
+
+def _stream_for(task_id):
+    # LLM events carry the task's id; crewai drops the task object itself
+    if task_id is None:
+        return None
+    with _streams_lock:
+        return _streams.get(str(task_id))
+
+
+def _install_listeners():
+    # crewai calls handlers in the thread that runs the task; streams are looked
+    # up by task, so crews running in parallel threads do not mix their output
+    global _listeners_installed
+    with _streams_lock:
+        if _listeners_installed:
+            return
+        from crewai.events import crewai_event_bus
+        from crewai.events.types.llm_events import LLMCallStartedEvent, LLMStreamChunkEvent
+        from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_call_started(source, event):
+            stream = _stream_for(event.task_id)
+            if stream is not None:
+                stream.start_call()
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_chunk(source, event):
+            stream = _stream_for(event.task_id)
+            # Chunks of streamed tool calls carry arguments, not report text
+            if stream is not None and event.tool_call is None:
+                stream.feed(event.chunk)
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def on_task_completed(source, event):
+            stream = unwatch_task(event.task or source)
+            if stream is not None:
+                stream.finish(getattr(event.output, "raw", ""))
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def on_task_failed(source, event):
+            stream = unwatch_task(event.task or source)
+            if stream is not None:
+                stream.abort()
+
+        _listeners_installed = True
+
+
+def enable_streaming(llm):
+    """
+    Switch an LLM (or the real LLM behind a recording wrapper) to streamed completions.
+
+    Returns:
+    - True if the LLM supports streaming
+    """
+    target = getattr(llm, "inner", llm)
+    if hasattr(target, "stream"):
+        target.stream = True
+        return True
+    return False
@@ -0,0 +1,305 @@
+"""
+Long-running scheduler that produces recurring ticker reports from one warm process.
+
+crewai, the parsed agent/task configuration, the search client and its HTTP
+sessions, the search cache, the news store and the Slack session are loaded
+once and reused by every run, instead of being rebuilt by a fresh
+`market_update` process on every cron tick.
+"""
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from .batch import run_ticker
+from .instrumentation import increment
+from .rate_limit import RequestBudget
+
+
+DEFAULT_INTERVAL_MINUTES = float(os.getenv("SCHEDULER_INTERVAL_MINUTES", "60"))
+DEFAULT_JITTER_SECONDS = float(os.getenv("SCHEDULER_JITTER_SECONDS", "60"))
+DEFAULT_MAX_WORKERS = int(os.getenv("SCHEDULER_MAX_WORKERS", "2"))
+DEFAULT_MAX_BACKLOG = int(os.getenv("SCHEDULER_MAX_BACKLOG", "4"))
+DEFAULT_GLOBAL_RPM = int(os.getenv("SCHEDULER_GLOBAL_RPM", "60"))
+
+MARKET_TIMEZONE = os.getenv("MARKET_TIMEZONE", "America/New_York")
+MARKET_OPEN = os.getenv("MARKET_OPEN", "09:30")
+MARKET_CLOSE = os.getenv("MARKET_CLOSE", "16:00")
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_clock(value):
+    hours, minutes = value.split(":")
+    return int(hours), int(minutes)
+
+
+@dataclass
+class MarketHours:
+    """Regular trading session: weekdays between `open` and `close` in `timezone`."""
+    timezone: str = MARKET_TIMEZONE
+    open: str = MARKET_OPEN
+    close: str = MARKET_CLOSE
+    weekdays: tuple = (0, 1, 2, 3, 4)
+
+    def _bounds(self, day):
+        tz = ZoneInfo(self.timezone)
+        open_h, open_m = _parse_clock(self.open)
+        close_h, close_m = _parse_clock(self.close)
+        start = datetime(day.year, day.month, day.day, open_h, open_m, tzinfo=tz)
+        end = datetime(day.year, day.month, day.day, close_h, close_m, tzinfo=tz)
+        return start, end
+
+    def is_open(self, timestamp=None):
+        now = datetime.fromtimestamp(timestamp or time.time(), ZoneInfo(self.timezone))
+        if now.weekday() not in self.weekdays:
+            return False
+        start, end = self._bounds(now)
+        return start <= now < end
+
+    def next_open(self, timestamp=None):
+        """Unix time of the next session open at or after `timestamp`."""
+        now = datetime.fromtimestamp(timestamp or time.time(), ZoneInfo(self.timezone))
+        for days in range(8):
+            day = now + timedelta(days=days)
+            if day.weekday() not in self.weekdays:
+                continue
+            start, end = self._bounds(day)
+            if now < end:
+                return max(start, now).timestamp()
+        raise ValueError("MarketHours has no trading weekdays")
+
+
+@dataclass
+class TickerSchedule:
+    """When one symbol runs next, and how it has gone so far."""
+    stock_symbol: str
+    interval_seconds: float
+    offset_seconds: float = 0.0
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_result: Optional[object] = None
+
+
+@dataclass
+class SchedulerStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    # Runs that came due but were not started, by reason
+    skipped_in_flight: int = 0
+    skipped_backlog_full: int = 0
+    skipped_market_closed: int = 0
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+class ReportScheduler:
+    """
+    Run every symbol's crew on its own recurring schedule.
+
+    Symbols are staggered across their first interval and every run gets
+    random jitter, so runs do not hit the search and LLM backends in bursts.
+    At most `max_workers` crews run at once. At most `max_backlog` runs are
+    running or waiting for a worker; a run that comes due while the backlog is
+    full, or while the previous run of the same symbol is still going, is
+    skipped rather than queued, so slow LLM runs cannot pile up.
+    """
+
+    def __init__(self, schedules, max_workers=DEFAULT_MAX_WORKERS, max_backlog=DEFAULT_MAX_BACKLOG,
+                 jitter_seconds=DEFAULT_JITTER_SECONDS, market_hours=None, global_rpm=DEFAULT_GLOBAL_RPM,
+                 incremental=False, run_fn=None):
+        """
+        Parameters:
+        - schedules: List of TickerSchedule
+        - max_workers: Maximum number of crews running at once
+        - max_backlog: Maximum number of runs running or queued (at least max_workers)
+        - jitter_seconds: Each run is moved by a random amount within +/- this many seconds
+        - market_hours: MarketHours to restrict runs to, or None to run around the clock
+        - global_rpm: Combined LLM requests per minute across all runs (0 disables)
+        - incremental: Only analyse news that earlier runs have not covered
+        - run_fn: Callable(symbol, request_budget, incremental) -> TickerResult (default: batch.run_ticker)
+        """
+        self.schedules = list(schedules)
+        self.max_workers = max_workers
+        self.max_backlog = max(max_backlog, max_workers)
+        self.jitter_seconds = jitter_seconds
+        self.market_hours = market_hours
+        self.incremental = incremental
+        self.request_budget = RequestBudget(global_rpm) if global_rpm else None
+        self.run_fn = run_fn or (lambda symbol, budget, incremental: run_ticker(
+            symbol, budget, incremental, verbose=False))
+        self.stats = SchedulerStats()
+
+        self._heap = []
+        self._sequence = 0
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._executor = None
+        self._thread = None
+
+    def _jitter(self):
+        return random.uniform(-self.jitter_seconds, self.jitter_seconds) if self.jitter_seconds else 0.0
+
+    def _push(self, schedule, when):
+        schedule.next_run = when
+        self._sequence += 1
+        heapq.heappush(self._heap, (when, self._sequence, schedule))
+
+    def _plan(self, schedule, due):
+        # Keep a fixed rate anchored on the planned time; if we fell far behind, start over from now
+        now = time.time()
+        next_run = due + schedule.interval_seconds
+        if next_run < now:
+            next_run = now + schedule.interval_seconds
+        next_run = max(now, next_run + self._jitter())
+        if self.market_hours and not self.market_hours.is_open(next_run):
+            # First run after the open keeps the symbol's stagger offset
+            next_run = self.market_hours.next_open(next_run) + schedule.offset_seconds + abs(self._jitter())
+        self._push(schedule, next_run)
+
+    def start(self):
+        """Start the scheduling thread and the worker pool; returns immediately."""
+        now = time.time()
+        count = len(self.schedules)
+        with self._condition:
+            for i, schedule in enumerate(self.schedules):
+                # Spread the first runs evenly over the first interval
+                schedule.offset_seconds = schedule.interval_seconds * i / count if count else 0.0
+                first = now + schedule.offset_seconds + abs(self._jitter())
+                if self.market_hours and not self.market_hours.is_open(first):
+                    first = self.market_hours.next_open(first) + schedule.offset_seconds
+                self._push(schedule, first)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduled")
+        self._thread = threading.Thread(target=self._loop, name="report-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Scheduler started for %d symbols: %d workers, backlog %d, %s",
+                    count, self.max_workers, self.max_backlog,
+                    "market hours only" if self.market_hours else "around the clock")
+        return self
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._stopping and (not self._heap or self._heap[0][0] > time.time()):
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                due, _, schedule = heapq.heappop(self._heap)
+                self._dispatch(schedule, due)
+
+    def _dispatch(self, schedule, due):
+        # Called with the condition held
+        symbol = schedule.stock_symbol
+        if self.market_hours and not self.market_hours.is_open():
+            reason = "market_closed"
+        elif symbol in self._in_flight:
+            reason = "in_flight"
+        elif len(self._in_flight) >= self.max_backlog:
+            reason = "backlog_full"
+        else:
+            reason = None
+            self._in_flight.add(symbol)
+            self.stats.submitted += 1
+            self._executor.submit(self._run, schedule)
+
+        if reason:
+            schedule.skipped += 1
+            setattr(self.stats, f"skipped_{reason}", getattr(self.stats, f"skipped_{reason}") + 1)
+            increment("scheduler_skipped_total", reason=reason)
+            logger.warning("Skipping %s run: %s", symbol, reason.replace("_", " "))
+        self._plan(schedule, due)
+
+    def _run(self, schedule):
+        symbol = schedule.stock_symbol
+        try:
+            result = self.run_fn(symbol, self.request_budget, self.incremental)
+        except Exception as e:
+            # run_ticker never raises, but a custom run_fn might
+            logger.error("Scheduled run for %s raised: %s", symbol, e)
+            result = None
+        with self._condition:
+            self._in_flight.discard(symbol)
+            schedule.runs += 1
+            schedule.last_result = result
+            if result is not None and result.success:
+                self.stats.completed += 1
+            else:
+                self.stats.failed += 1
+                schedule.failures += 1
+            self._condition.notify_all()
+        status = "ok" if result is not None and result.success else "failed"
+        increment("scheduler_runs_total", status=status)
+        if result is not None:
+            logger.info("Scheduled run for %s %s in %.1fs; next run at %s", symbol, status,
+                        result.duration_seconds, datetime.fromtimestamp(schedule.next_run).strftime("%H:%M:%S"))
+
+    def request_stop(self):
+        """Stop scheduling new runs without waiting; safe to call from a signal handler."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        """Stop scheduling new runs and wait for running ones to finish."""
+        self.request_stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        logger.info("Scheduler stopped: %s", self.stats.as_dict())
+
+    def wait(self, timeout=None):
+        """Block until `stop()` is called (e.g. from a signal handler) or the timeout expires."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def upcoming(self):
+        """List of (symbol, next run unix time), soonest first."""
+        with self._condition:
+            return [(s.stock_symbol, when) for when, _, s in sorted(self._heap, key=lambda e: e[0])]
+
+
+def build_schedules(symbols, interval_minutes=DEFAULT_INTERVAL_MINUTES):
+    """One TickerSchedule per symbol with a common interval."""
+    return [TickerSchedule(stock_symbol=s, interval_seconds=interval_minutes * 60) for s in symbols]
+
+
+def warm_up():
+    """
+    Load everything a run needs once, before the first schedule fires: crewai,
+    the parsed agent/task configuration, the tools, the search client, the
+    search cache, the news store and the Slack HTTP session.
+    """
+    start = time.perf_counter()
+    from .crew import LatestMarketNewsTrendCrew
+    from .news_store import get_news_store
+    from .other_tools.slack_messenger import get_http_session
+    from .tools.search_cache import get_search_cache
+    from .tools.search_client import get_search_client, pooled_wrapper_class
+
+    # Building the crew parses the configs and imports crewai's agent stack; it never runs,
+    # so its agents' rpm timers (non-daemon threads) are stopped right away
+    LatestMarketNewsTrendCrew(publish=False).release_agents()
+    pooled_wrapper_class()
+    get_search_client()
+    get_search_cache()
+    get_news_store()
+    get_http_session()
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
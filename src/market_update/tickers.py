@@ -0,0 +1,82 @@
+"""
+Company aliases and sectors for ticker symbols (config/tickers.yaml).
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import yaml
+
+
+DEFAULT_TICKERS_PATH = os.getenv(
+    "TICKERS_CONFIG_PATH", os.path.join(os.path.dirname(__file__), "config", "tickers.yaml")
+)
+
+
+@dataclass
+class TickerProfile:
+    symbol: str
+    aliases: List[str] = field(default_factory=list)
+    sector: Optional[str] = None
+
+    @property
+    def names(self):
+        """The ticker followed by its company aliases."""
+        return [self.symbol] + [a for a in self.aliases if a.upper() != self.symbol]
+
+
+class TickerConfig:
+    """Parsed tickers.yaml: per-symbol profiles, sector queries and market-wide queries."""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.market_queries = list(data.get("market_queries") or [])
+        self.sector_queries = {
+            name: list((sector or {}).get("queries") or [])
+            for name, sector in (data.get("sectors") or {}).items()
+        }
+        self.profiles = {}
+        for symbol, entry in (data.get("tickers") or {}).items():
+            entry = entry or {}
+            symbol = str(symbol).upper()
+            self.profiles[symbol] = TickerProfile(symbol, list(entry.get("aliases") or []), entry.get("sector"))
+
+    @classmethod
+    def load(cls, path=DEFAULT_TICKERS_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(yaml.safe_load(file))
+
+    def profile(self, symbol):
+        """Profile of a symbol; unknown symbols get one without aliases or sector."""
+        symbol = symbol.upper()
+        return self.profiles.get(symbol) or TickerProfile(symbol)
+
+    def peers(self, symbol, limit=5):
+        """Other companies' symbols in the same sector, in file order (share classes like GOOG/GOOGL are skipped)."""
+        profile = self.profile(symbol)
+        if not profile.sector:
+            return []
+        peers = [p.symbol for p in self.profiles.values()
+                 if p.sector == profile.sector and p.symbol != profile.symbol
+                 and not (p.aliases and p.aliases == profile.aliases)]
+        return peers[:limit]
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_ticker_config():
+    """Return the process-wide TickerConfig, loading it on first use."""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = TickerConfig.load()
+        return _config
+
+
+def get_ticker_profile(symbol):
+    return get_ticker_config().profile(symbol)
@@ -0,0 +1,386 @@
+"""
+Local OHLC and option-chain snapshots and the volatility figures computed from them.
+
+Files live under MARKET_DATA_DIR, one per symbol and kind:
+
+- prices/<SYMBOL>.npy|.parquet|.csv: columns date, open, high, low, close (volume optional)
+- options/<SYMBOL>.npy|.parquet|.csv: one row per contract and snapshot with columns
+  snapshot, expiry, strike, iv (decimal, 0.35 = 35%) and optionally underlying
+
+NPY files are structured arrays and are memory-mapped, so only the pages of
+the rows actually used are read. Parquet files are read through pyarrow's
+memory map (pyarrow is optional). CSV files are parsed once into a
+structured NPY next to them (under .cache/) and memory-mapped from then on.
+Dates may be ISO strings, datetime64 values or Unix seconds.
+
+All statistics are computed with vectorized NumPy over the whole history:
+close-to-close and Parkinson realized volatility, 30-day constant-maturity
+ATM implied volatility for every snapshot (for IV rank and percentile), and
+the ATM term structure with the expected move to each expiry.
+"""
+import math
+import os
+
+import numpy as np
+
+
+MARKET_DATA_DIR = os.getenv("MARKET_DATA_DIR", "market_data")
+
+DATA_EXTENSIONS = (".npy", ".parquet", ".csv")
+DATE_COLUMNS = ("date", "snapshot", "expiry")
+TRADING_DAYS = 252
+# Constant maturity of the implied volatility used for IV rank and percentile
+IV_TARGET_DAYS = 30
+# Fewer snapshots than this and IV rank/percentile are not meaningful
+MIN_IV_HISTORY = 20
+# Warn when the option chain is older than the price data by more than this
+STALE_CHAIN_DAYS = 5
+
+
+class MarketDataError(Exception):
+    """Raised when a market data file is missing columns or cannot be read."""
+
+
+def find_data_file(kind, symbol, directory=None):
+    """Path of the `kind` ('prices' or 'options') file of a symbol, or None."""
+    directory = directory or MARKET_DATA_DIR
+    for extension in DATA_EXTENSIONS:
+        path = os.path.join(directory, kind, f"{symbol.upper()}{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _to_days(values):
+    # Dates of any supported encoding as int64 days since the epoch
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]").astype(np.int64)
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(np.int64) // 86400
+    return np.array(values, dtype="datetime64").astype("datetime64[D]").astype(np.int64)
+
+
+def _csv_cache_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, ".cache", os.path.splitext(name)[0] + ".npy")
+
+
+def _load_csv(path):
+    cache = _csv_cache_path(path)
+    if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+        # A single data row comes back as a 0-d array
+        table = np.atleast_1d(np.genfromtxt(path, delimiter=",", names=True, dtype=None, encoding="utf-8"))
+        if table.dtype.names is None:
+            raise MarketDataError(f"{path} has no header row.")
+        fields = []
+        for name in table.dtype.names:
+            column = table[name]
+            if name.lower() in DATE_COLUMNS:
+                column = _to_days(column).astype("datetime64[D]")
+            fields.append((name.lower(), column))
+        converted = np.empty(len(table), dtype=[(name, column.dtype) for name, column in fields])
+        for name, column in fields:
+            converted[name] = column
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        # Written next to the cache and renamed, so concurrent readers never map a partial file
+        partial = f"{cache}.{os.getpid()}.tmp"
+        with open(partial, "wb") as file:
+            np.save(file, converted)
+        os.replace(partial, cache)
+    return np.load(cache, mmap_mode="r")
+
+
+def load_table(path, columns=None):
+    """
+    Read a market data file into a dictionary of column arrays.
+
+    Parameters:
+    - path: .npy (structured array), .parquet or .csv file
+    - columns: Column names to return (default: all)
+
+    Returns:
+    - Dictionary of lower-case column name -> array; NPY and CSV columns are
+      views of a memory map, so rows are only read when they are used
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise MarketDataError(f"Reading {path} requires pyarrow (pip install pyarrow).")
+            table = pq.read_table(path, columns=columns, memory_map=True)
+            data = {name.lower(): table.column(name).to_numpy() for name in table.column_names}
+        else:
+            array = _load_csv(path) if extension == ".csv" else np.load(path, mmap_mode="r")
+            if array.dtype.names is None:
+                raise MarketDataError(f"{path} is not a structured array with named columns.")
+            data = {name.lower(): array[name] for name in array.dtype.names}
+    except (OSError, ValueError) as e:
+        raise MarketDataError(f"Could not read {path}: {e}")
+    if not data or not len(next(iter(data.values()))):
+        raise MarketDataError(f"{path} has no rows.")
+    if columns:
+        missing = [c for c in columns if c not in data]
+        if missing:
+            raise MarketDataError(f"{path} is missing the columns {', '.join(missing)}.")
+        data = {c: data[c] for c in columns}
+    return data
+
+
+def rolling_volatility(returns, window):
+    """
+    Annualized volatility of every `window`-day window of daily log returns.
+
+    Returns:
+    - Array of len(returns) - window + 1 volatilities (empty when there are too few returns)
+    """
+    returns = np.asarray(returns, dtype=float)
+    if window < 2 or len(returns) < window:
+        return np.zeros(0)
+    sums = np.concatenate(([0.0], np.cumsum(returns)))
+    squares = np.concatenate(([0.0], np.cumsum(returns * returns)))
+    total = sums[window:] - sums[:-window]
+    total_sq = squares[window:] - squares[:-window]
+    variance = np.maximum(total_sq - total * total / window, 0.0) / (window - 1)
+    return np.sqrt(variance * TRADING_DAYS)
+
+
+def realized_volatility(close, high=None, low=None, windows=(10, 20, 60), history_days=TRADING_DAYS):
+    """
+    Close-to-close realized volatility over several windows, the 20-day
+    Parkinson (high/low) estimate and where today's 20-day value sits in its
+    one-year history.
+
+    Returns:
+    - Dictionary of annualized volatilities (decimals); windows longer than the history are left out
+    """
+    close = np.asarray(close, dtype=float)
+    returns = np.diff(np.log(close))
+    result = {}
+    for window in windows:
+        if len(returns) >= window:
+            result[f"{window}d"] = float(rolling_volatility(returns[-window:], window)[-1])
+    history = rolling_volatility(returns[-(history_days + 19):], 20)
+    if len(history) > 1:
+        result["20d_percentile_1y"] = float(np.mean(history[:-1] < history[-1]))
+    if high is not None and low is not None and len(close) >= 20:
+        ranges = np.log(np.asarray(high[-20:], dtype=float) / np.asarray(low[-20:], dtype=float))
+        result["parkinson_20d"] = float(math.sqrt(np.mean(ranges * ranges) / (4 * math.log(2)) * TRADING_DAYS))
+    return result
+
+
+def atm_iv_by_expiry(snapshot, expiry, strike, iv, spot):
+    """
+    At-the-money implied volatility of every (snapshot, expiry) pair: the mean
+    IV of the contracts (call and put) at the strike closest to the spot.
+
+    Parameters:
+    - snapshot, expiry: Days since the epoch of each contract row
+    - strike, iv, spot: Strike, implied volatility and underlying price of each row
+
+    Returns:
+    - Tuple of arrays (snapshot, days_to_expiry, atm_iv), sorted by snapshot then expiry
+    """
+    snapshot, expiry = np.asarray(snapshot, dtype=np.int64), np.asarray(expiry, dtype=np.int64)
+    strike, iv, spot = (np.asarray(a, dtype=float) for a in (strike, iv, spot))
+    valid = np.isfinite(iv) & (iv > 0) & (expiry > snapshot) & (spot > 0) & (strike > 0)
+    snapshot, strike, iv, spot = snapshot[valid], strike[valid], iv[valid], spot[valid]
+    dte = expiry[valid] - snapshot
+    if not len(iv):
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty
+
+    distance = np.abs(np.log(strike / spot))
+    order = np.lexsort((distance, dte, snapshot))
+    snapshot, dte, distance, iv = snapshot[order], dte[order], distance[order], iv[order]
+    new_group = np.r_[True, (snapshot[1:] != snapshot[:-1]) | (dte[1:] != dte[:-1])]
+    starts = np.flatnonzero(new_group)
+    group = np.cumsum(new_group) - 1
+    # Rows are sorted by distance within a group, so its first row is the closest strike
+    at_the_money = distance <= distance[starts][group] + 1e-9
+    atm_iv = np.add.reduceat(iv * at_the_money, starts) / np.add.reduceat(at_the_money.astype(float), starts)
+    return snapshot[starts], dte[starts], atm_iv
+
+
+def constant_maturity_iv(snapshot, dte, atm_iv, target_days=IV_TARGET_DAYS):
+    """
+    ATM implied volatility at a constant maturity for every snapshot,
+    interpolated linearly in total variance between the bracketing expiries
+    (flat beyond the first or last expiry).
+
+    Parameters:
+    - snapshot, dte, atm_iv: Output of `atm_iv_by_expiry`
+
+    Returns:
+    - Tuple of arrays (snapshots, iv)
+    """
+    if not len(atm_iv):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    snapshots, first = np.unique(snapshot, return_index=True)
+    last = np.r_[first[1:], len(snapshot)] - 1
+    stride = int(dte.max()) + target_days + 1
+    keys = snapshot * stride + dte
+    upper = np.clip(np.searchsorted(keys, snapshots * stride + target_days), first, last)
+    lower = np.clip(upper - 1, first, last)
+    d_low, d_high = dte[lower], dte[upper]
+    w_low, w_high = atm_iv[lower] ** 2 * d_low, atm_iv[upper] ** 2 * d_high
+    inside = (d_low <= target_days) & (target_days <= d_high) & (d_high > d_low)
+    fraction = np.where(inside, (target_days - d_low) / np.where(inside, d_high - d_low, 1), 0.0)
+    interpolated = np.sqrt(np.maximum(w_low + fraction * (w_high - w_low), 0.0) / target_days)
+    return snapshots, np.where(inside, interpolated, atm_iv[upper])
+
+
+def iv_rank(history):
+    """
+    IV rank and percentile of the last value of an implied volatility history.
+
+    Returns:
+    - Tuple (rank, percentile): rank is the position between the minimum (0)
+      and maximum (1), percentile the share of earlier values below it
+    """
+    history = np.asarray(history, dtype=float)
+    current, low, high = history[-1], history.min(), history.max()
+    rank = float((current - low) / (high - low)) if high > low else 0.5
+    return rank, float(np.mean(history[:-1] < current))
+
+
+def expected_move(spot, iv, dte):
+    """One-standard-deviation move of the underlying to expiry implied by the IV."""
+    return spot * np.asarray(iv, dtype=float) * np.sqrt(np.asarray(dte, dtype=float) / 365.0)
+
+
+def volatility_summary(symbol, directory=None, max_expiries=6, history_days=365):
+    """
+    Realized volatility, IV rank/percentile, term structure and expected moves for a symbol.
+
+    Parameters:
+    - symbol: Ticker symbol
+    - directory: Market data directory (default: MARKET_DATA_DIR)
+    - max_expiries: Expiries listed in the term structure
+    - history_days: Calendar days of option snapshots used for IV rank and percentile
+
+    Returns:
+    - Dictionary with the figures (volatilities as decimals), or None when there is no data for the symbol
+    """
+    symbol = symbol.upper()
+    prices_path = find_data_file("prices", symbol, directory)
+    options_path = find_data_file("options", symbol, directory)
+    if prices_path is None and options_path is None:
+        return None
+
+    summary = {"symbol": symbol}
+    notes = []
+    price_days = close = None
+    if prices_path is not None:
+        prices = load_table(prices_path)
+        if "date" not in prices or "close" not in prices:
+            raise MarketDataError(f"{prices_path} needs date and close columns.")
+        # A little over a year of rows is all the statistics use; the rest of the map is never read
+        tail = slice(-(TRADING_DAYS + 80), None)
+        price_days = _to_days(prices["date"][tail])
+        close = np.asarray(prices["close"][tail], dtype=float)
+        summary["as_of"] = str(np.datetime64(int(price_days[-1]), "D"))
+        summary["last_close"] = round(float(close[-1]), 2)
+        high, low = prices.get("high"), prices.get("low")
+        realized = realized_volatility(close, high[tail] if high is not None else None,
+                                       low[tail] if low is not None else None)
+        summary["realized_vol"] = {k: round(v, 4) for k, v in realized.items()}
+
+    if options_path is not None:
+        options = load_table(options_path)
+        missing = [c for c in ("snapshot", "expiry", "strike", "iv") if c not in options]
+        if missing:
+            raise MarketDataError(f"{options_path} is missing the columns {', '.join(missing)}.")
+        snapshot = _to_days(options["snapshot"])
+        recent = snapshot >= snapshot.max() - history_days
+        snapshot = snapshot[recent]
+        if "underlying" in options:
+            spot = np.asarray(options["underlying"], dtype=float)[recent]
+        elif price_days is not None:
+            # Close of the last trading day on or before each snapshot
+            index = np.clip(np.searchsorted(price_days, snapshot, side="right") - 1, 0, len(close) - 1)
+            spot = close[index]
+        else:
+            raise MarketDataError(f"{options_path} has no underlying column and there are no prices for {symbol}.")
+        g_snapshot, g_dte, g_iv = atm_iv_by_expiry(
+            snapshot, _to_days(options["expiry"])[recent], options["strike"][recent], options["iv"][recent], spot
+        )
+        if len(g_iv):
+            summary.update(_implied_volatility(g_snapshot, g_dte, g_iv, spot, snapshot, summary, notes, max_expiries))
+        else:
+            notes.append("The option chain has no contracts with a usable implied volatility.")
+
+    if notes:
+        summary["notes"] = notes
+    return summary
+
+
+def _implied_volatility(g_snapshot, g_dte, g_iv, spot, snapshot, summary, notes, max_expiries):
+    latest = int(g_snapshot[-1])
+    snapshots, iv30 = constant_maturity_iv(g_snapshot, g_dte, g_iv)
+    implied = {"iv30": round(float(iv30[-1]), 4), "history_snapshots": int(len(iv30))}
+    if len(iv30) >= MIN_IV_HISTORY:
+        rank, percentile = iv_rank(iv30)
+        implied.update(iv_rank_1y=round(rank, 3), iv_percentile_1y=round(percentile, 3))
+    else:
+        notes.append(f"Only {len(iv30)} option snapshots; IV rank and percentile need at least {MIN_IV_HISTORY}.")
+    realized_20d = summary.get("realized_vol", {}).get("20d")
+    if realized_20d is not None:
+        implied["iv30_minus_rv20"] = round(float(iv30[-1]) - realized_20d, 4)
+
+    spot_now = summary.get("last_close") or float(spot[snapshot == latest][0])
+    front = g_snapshot == latest
+    dte, atm = g_dte[front][:max_expiries], g_iv[front][:max_expiries]
+    moves = expected_move(spot_now, atm, dte)
+    term_structure = [
+        {"expiry": str(np.datetime64(latest + int(d), "D")), "dte": int(d), "atm_iv": round(float(v), 4),
+         "expected_move": round(float(m), 2), "expected_move_pct": round(float(m / spot_now), 4)}
+        for d, v, m in zip(dte, atm, moves)
+    ]
+    if len(atm) > 1:
+        slope = float(atm[-1] - atm[0])
+        implied["term_structure_shape"] = "contango" if slope > 0.005 else "backwardation" if slope < -0.005 else "flat"
+
+    snapshot_date = str(np.datetime64(latest, "D"))
+    if "as_of" in summary and np.datetime64(summary["as_of"]) - np.datetime64(snapshot_date) > STALE_CHAIN_DAYS:
+        notes.append(f"The latest option chain is from {snapshot_date}, older than the prices.")
+    return {"option_chain_as_of": snapshot_date, "implied_vol": implied, "term_structure": term_structure}
+
+
+def format_volatility_summary(summary):
+    """Compact plain-text rendering of `volatility_summary` for an agent's prompt."""
+    def pct(value):
+        return f"{value * 100:.1f}%"
+
+    lines = []
+    if "last_close" in summary:
+        lines.append(f"As of {summary['as_of']}: close {summary['last_close']:.2f}.")
+    realized = summary.get("realized_vol") or {}
+    windows = [f"{k} {pct(v)}" for k, v in realized.items() if k.endswith("d") and not k.startswith("parkinson")]
+    if windows:
+        line = "Realized volatility: " + ", ".join(windows)
+        if "parkinson_20d" in realized:
+            line += f"; Parkinson 20d {pct(realized['parkinson_20d'])}"
+        if "20d_percentile_1y" in realized:
+            line += f"; 20d above {realized['20d_percentile_1y'] * 100:.0f}% of its values over the past year"
+        lines.append(line + ".")
+    implied = summary.get("implied_vol")
+    if implied:
+        line = f"Implied volatility (option chain of {summary['option_chain_as_of']}): 30-day ATM IV {pct(implied['iv30'])}"
+        if "iv_rank_1y" in implied:
+            line += (f", IV rank {implied['iv_rank_1y'] * 100:.0f}, IV percentile {implied['iv_percentile_1y'] * 100:.0f}"
+                     f" ({implied['history_snapshots']} snapshots)")
+        if "iv30_minus_rv20" in implied:
+            line += f", IV30 minus RV20 {implied['iv30_minus_rv20'] * 100:+.1f} points"
+        if "term_structure_shape" in implied:
+            line += f", term structure in {implied['term_structure_shape']}"
+        lines.append(line + ".")
+    if summary.get("term_structure"):
+        lines.append("ATM IV and expected move (1 sd) by expiry: " + "; ".join(
+            f"{e['expiry']} ({e['dte']}d) IV {pct(e['atm_iv'])}, ±{e['expected_move']:.2f} (±{pct(e['expected_move_pct'])})"
+            for e in summary["term_structure"]
+        ) + ".")
+    lines.extend(summary.get("notes", []))
+    return "\n".join(lines)
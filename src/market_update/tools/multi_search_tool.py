@@ -0,0 +1,186 @@
+from crewai.tools import BaseTool
+from typing import Type, List, Dict, Optional, Any, Callable
+from pydantic import BaseModel, Field
+from concurrent.futures import ThreadPoolExecutor, wait
+import contextvars
+import os
+import threading
+
+from .search_tool import DuckDuckGoSearchTool
+from .news_dedup import dedupe_news_items
+from .news_ranking import DEFAULT_CANDIDATE_LIMIT, rank_news
+from ..news_store import get_news_store
+from ..recording import get_active_session
+from ..tickers import get_ticker_profile
+
+
+# Query variations the research task asks the agent to try for a symbol
+STANDARD_QUERY_TEMPLATES = [
+    "{stock_symbol} stock news",
+    "{stock_symbol} latest news",
+    "{stock_symbol} company updates",
+    "{stock_symbol} earnings guidance",
+    "{stock_symbol} analyst rating price target",
+    "{stock_symbol} options implied volatility",
+]
+
+DEFAULT_MAX_PARALLEL_QUERIES = int(os.getenv("SEARCH_MAX_PARALLEL_QUERIES", "6"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # A shared pool keeps slow queries that time out from blocking the caller
+    # on shutdown; they finish in the background and still populate the cache.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_PARALLEL_QUERIES,
+                thread_name_prefix="ddg-search"
+            )
+        return _executor
+
+
+def build_standard_queries(stock_symbol):
+    """Expand the standard research query variations for a ticker."""
+    return [template.format(stock_symbol=stock_symbol) for template in STANDARD_QUERY_TEMPLATES]
+
+
+class MultiQuerySearchInput(BaseModel):
+    """Input schema for MultiQuerySearchTool."""
+    queries: Optional[List[str]] = Field(
+        default=None,
+        description="List of search queries to run at the same time (e.g. ['MSFT stock news', 'MSFT earnings'])"
+    )
+    stock_symbol: Optional[str] = Field(
+        default=None,
+        description="Ticker symbol; when no queries are given the standard news query variations are built from it"
+    )
+    max_results: int = Field(
+        default=20,
+        description="Number of results to return per query"
+    )
+    time_period: str = Field(
+        default="d",
+        description="'d' for day, 'w' for week, 'm' for month"
+    )
+    timeout: float = Field(
+        default=20.0,
+        description="Seconds to wait for the searches; queries still running after that are reported as timed out"
+    )
+
+
+class MultiQuerySearchTool(BaseTool):
+    name: str = "Multi-Query News Search"
+    description: str = (
+        "Run several DuckDuckGo news searches at once and get one merged result set. "
+        "Pass a list of queries, or just a stock_symbol to run the standard variations "
+        "('<SYMBOL> stock news', '<SYMBOL> latest news', '<SYMBOL> company updates', ...). "
+        "Example inputs: {'stock_symbol': 'MSFT'} or {'queries': ['MSFT stock news', 'MSFT earnings date']}"
+    )
+    args_schema: Type[BaseModel] = MultiQuerySearchInput
+    # Called with the merged results handed to the agent (the crew records them as seen once published)
+    on_results: Optional[Callable[[List[dict]], None]] = None
+
+    def _run(
+        self,
+        queries: Optional[List[str]] = None,
+        stock_symbol: Optional[str] = None,
+        max_results: int = 20,
+        time_period: str = "d",
+        timeout: float = 20.0
+    ) -> Dict[str, Any]:
+        """Run all queries concurrently and merge their results."""
+        if isinstance(queries, str):
+            queries = [queries]
+        if not queries:
+            if not stock_symbol:
+                return {"error": "Provide either 'queries' or 'stock_symbol'."}
+            queries = build_standard_queries(stock_symbol)
+
+        # Preserve order while dropping repeated queries
+        queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+
+        # Results are deduplicated once, across all queries, in merge_results
+        search = DuckDuckGoSearchTool(dedupe=False)
+        executor = _get_executor()
+        futures = {
+            # Run each query in a copy of this context so its spans keep the run ID
+            executor.submit(
+                contextvars.copy_context().run,
+                search._run,
+                query,
+                max_results=max_results,
+                time_period=time_period
+            ): query
+            for query in queries
+        }
+        done, not_done = wait(futures, timeout=timeout)
+
+        results_by_query = {}
+        errors = {}
+        for future in done:
+            query = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[query] = str(e)
+                continue
+            if isinstance(result, str):
+                # The single-query tool reports failures as strings
+                if result.startswith("Error performing search"):
+                    errors[query] = result
+                else:
+                    results_by_query[query] = [{"snippet": result}]
+            else:
+                results_by_query[query] = list(result or [])
+
+        merged = merge_results(queries, results_by_query, errors, [futures[f] for f in not_done])
+        if stock_symbol:
+            # Most relevant and recent first; a noisy news day cannot flood the agent's prompt
+            ranked = rank_news(merged["results"], stock_symbol, get_ticker_profile(stock_symbol).aliases,
+                               token_budget=0, max_items=DEFAULT_CANDIDATE_LIMIT)
+            merged["ranked_out"] = len(merged["results"]) - len(ranked)
+            merged["total_results"] = len(ranked)
+            # Flag items that an earlier report on this symbol already covered
+            merged["results"] = _annotate_seen(stock_symbol, ranked)
+            merged["new_results"] = sum(1 for item in merged["results"] if not item["seen"])
+        if self.on_results is not None:
+            self.on_results(merged["results"])
+        return merged
+
+
+def _annotate_seen(stock_symbol, items):
+    annotate = lambda: get_news_store().annotate(stock_symbol, items)
+    session = get_active_session()
+    if session is None:
+        return annotate()
+    # The seen flags come from the local news store; a replay must see the recorded ones
+    arguments = {"stock_symbol": stock_symbol, "links": [item.get("link") or item.get("title") for item in items]}
+    return session.call("news_seen", arguments, annotate)
+
+
+def merge_results(queries, results_by_query, errors=None, timed_out=None):
+    """
+    Merge per-query result lists in query order, tagging each item with the
+    query that found it and collapsing exact and near-duplicate stories.
+    """
+    merged = []
+    for query in queries:
+        for item in results_by_query.get(query, []):
+            if not isinstance(item, dict):
+                item = {"snippet": str(item)}
+            merged.append({**item, "query": item.get("query", query)})
+
+    merged, stats = dedupe_news_items(merged)
+
+    return {
+        "queries": queries,
+        "total_results": len(merged),
+        "results": merged,
+        "deduplication": stats.as_dict(),
+        "timed_out": timed_out or [],
+        "errors": errors or {},
+    }
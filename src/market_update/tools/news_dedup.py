@@ -0,0 +1,244 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+
+# Query parameters that only track the click and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "yclid",
+    "ref", "ref_src", "referrer", "cmpid", "cmp", "ncid", "soc_src", "soc_trk",
+    "guccounter", "guce_referrer", "guce_referrer_sig", "yptr", "taid", "sr_share",
+    "smid", "feedtype", "outputtype", "amp", "__twitter_impression", "s_cid", "mbid",
+}
+TRACKING_PREFIXES = ("utm_", "mkt_", "pk_", "at_", "share_")
+
+# Host prefixes used for mobile and AMP copies of the same page
+MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.", "amp-")
+
+DEFAULT_SIMHASH_DISTANCE = 6
+# Titles are short, so they need a tighter threshold than title + snippet
+TITLE_SIMHASH_DISTANCE = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# "Headline - Reuters" / "Headline | Yahoo Finance" publisher suffixes
+_TITLE_SUFFIX_RE = re.compile(r"\s+[-|\u2013\u2014]\s+[^-|\u2013\u2014]{1,40}$")
+# Number of set bits in every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def canonicalize_url(url):
+    """
+    Reduce a news URL to a canonical form so syndicated, AMP and mobile copies
+    of the same page compare equal.
+
+    Lower-cases scheme and host, unwraps Google AMP cache links, strips
+    mobile/AMP host prefixes and AMP path segments, drops tracking query
+    parameters and fragments, sorts the remaining parameters and removes a
+    trailing slash. A URL without a scheme is read as starting with its host;
+    one without any host is returned unchanged.
+    """
+    if not url:
+        return url
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme and not parts.netloc:
+        # "example.com/story": urlsplit reads the host as part of the path
+        parts = urlsplit("//" + url)
+    if not parts.netloc:
+        return url
+    host = parts.netloc.lower()
+    path = parts.path
+
+    # https://www.google.com/amp/s/example.com/story -> https://example.com/story
+    if (host == "google.com" or host.endswith(".google.com")) and path.startswith("/amp/"):
+        inner = path[len("/amp/"):]
+        if inner.startswith("s/"):
+            inner = inner[2:]
+        return canonicalize_url("https://" + unquote(inner))
+
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    changed = True
+    while changed:
+        changed = False
+        for prefix in MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                changed = True
+
+    segments = [s for s in path.split("/") if s and s.lower() not in ("amp", "amp.html")]
+    path = "/" + "/".join(segments)
+    if path.endswith(".amp"):
+        path = path[:-len(".amp")]
+    if path.endswith(".amp.html"):
+        path = path[:-len(".amp.html")] + ".html"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit(("https", host, path.rstrip("/") or "/", urlencode(query), ""))
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _feature_hashes(text):
+    tokens = _tokens(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features]
+
+
+def simhash_many(texts):
+    """
+    64-bit SimHash over word unigrams and bigrams of every text.
+
+    Returns:
+    - uint64 numpy array of fingerprints, 0 for texts without words
+    """
+    hashes, starts, rows = [], [], []
+    for row, text in enumerate(texts):
+        feature_hashes = _feature_hashes(text)
+        if feature_hashes:
+            rows.append(row)
+            starts.append(len(hashes))
+            hashes.extend(feature_hashes)
+
+    fingerprints = np.zeros(len(texts), dtype=np.uint64)
+    if not hashes:
+        return fingerprints
+    # One row per feature with bit i of its hash in column i
+    bits = np.unpackbits(np.array(hashes, dtype="<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    weights = np.add.reduceat(bits.astype(np.int32) * 2 - 1, starts, axis=0)
+    fingerprints[rows] = np.packbits(weights > 0, axis=1, bitorder="little").view("<u8").ravel()
+    return fingerprints
+
+
+def simhash(text):
+    """64-bit SimHash over word unigrams and bigrams."""
+    return int(simhash_many([text])[0])
+
+
+def strip_publisher_suffix(title):
+    """Remove a trailing ' - Publisher' or ' | Publisher' from a headline."""
+    return _TITLE_SUFFIX_RE.sub("", title or "")
+
+
+def hamming_distances(a, b):
+    """Hamming distances between every pair of two uint64 fingerprint arrays, shape (len(a), len(b))."""
+    xor = np.bitwise_xor.outer(a, b)
+    return _POPCOUNT[xor.view(np.uint8)].reshape(xor.shape + (8,)).sum(axis=-1)
+
+
+@dataclass
+class DedupStats:
+    """Counts of what a deduplication pass removed."""
+    input_items: int = 0
+    output_items: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+
+    @property
+    def collapsed(self):
+        return self.exact_duplicates + self.near_duplicates
+
+    def as_dict(self):
+        return {
+            "input_items": self.input_items,
+            "output_items": self.output_items,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "collapsed": self.collapsed,
+        }
+
+
+def dedupe_news_items(items, max_distance=DEFAULT_SIMHASH_DISTANCE):
+    """
+    Drop exact and near-duplicate news items, keeping the first occurrence.
+
+    Items are search result dictionaries ('title', 'snippet', 'link', 'source'
+    ...). Two items are exact duplicates when their canonical URLs match, and
+    near duplicates when the SimHash of their headlines (publisher suffix
+    removed) differs in at most TITLE_SIMHASH_DISTANCE bits or the SimHash of
+    title and snippet differs in at most `max_distance` bits. Kept items keep
+    their link and carry its canonical form under 'canonical_url'; items that
+    absorbed duplicates carry a 'duplicates' count and an 'also_reported_by'
+    list of the other sources.
+
+    Parameters:
+    - items: List of result dictionaries
+    - max_distance: Maximum SimHash Hamming distance treated as a duplicate
+
+    Returns:
+    - (kept_items, DedupStats)
+    """
+    stats = DedupStats(input_items=len(items))
+    if not items:
+        return [], stats
+
+    titles = [strip_publisher_suffix(item.get("title", "")) if isinstance(item, dict) else "" for item in items]
+    title_fingerprints = simhash_many(titles)
+    fingerprints = simhash_many([
+        f"{title} {item.get('snippet', '')}" if isinstance(item, dict) else ""
+        for title, item in zip(titles, items)
+    ])
+    # near[i, j]: item i reads like item j
+    near = ((title_fingerprints != 0)[:, None]
+            & (hamming_distances(title_fingerprints, title_fingerprints) <= TITLE_SIMHASH_DISTANCE)) \
+        | ((fingerprints != 0)[:, None] & (hamming_distances(fingerprints, fingerprints) <= max_distance))
+    # Items later ones are compared with: kept and with a fingerprint, mapped to their index in `kept`
+    candidates = np.zeros(len(items), dtype=bool)
+    kept_index = {}
+
+    kept = []
+    by_url = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            kept.append(item)
+            continue
+
+        item = dict(item)
+        link = item.get("link")
+        canonical = canonicalize_url(link) if link else None
+        if canonical:
+            item["canonical_url"] = canonical
+
+        if canonical and canonical in by_url:
+            _absorb(kept[by_url[canonical]], item)
+            stats.exact_duplicates += 1
+            continue
+
+        matches = np.flatnonzero(near[position] & candidates)
+        if matches.size:
+            match = kept_index[int(matches[0])]
+            _absorb(kept[match], item)
+            stats.near_duplicates += 1
+            if canonical:
+                by_url[canonical] = match
+            continue
+
+        index = len(kept)
+        kept.append(item)
+        if canonical:
+            by_url[canonical] = index
+        if fingerprints[position]:
+            candidates[position] = True
+            kept_index[position] = index
+
+    stats.output_items = len(kept)
+    return kept, stats
+
+
+def _absorb(keeper, duplicate):
+    keeper["duplicates"] = keeper.get("duplicates", 0) + 1
+    source = duplicate.get("source")
+    if source and source != keeper.get("source"):
+        also = keeper.setdefault("also_reported_by", [])
+        if source not in also:
+            also.append(source)
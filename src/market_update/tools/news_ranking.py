@@ -0,0 +1,245 @@
+"""
+Relevance and recency ranking of news items, with a token budget.
+
+Every candidate item is scored in one NumPy pass on four features:
+
+- recency: exponential decay with a configurable half-life
+- source: weight of the publisher
+- match: the ticker or a company alias in the title (strongest) or the summary
+- catalyst: keywords that move options (earnings, guidance, FDA, ...)
+
+The best items are then kept until a token budget or an item limit is reached,
+so the prompt of the agent reading them stays bounded however noisy the news
+day is.
+"""
+import json
+import math
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, Field, ValidationError
+
+from ..recording import get_active_session
+
+
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("NEWS_RECENCY_HALF_LIFE_HOURS", "24"))
+# Budget for the researcher's findings handed to the analyst
+DEFAULT_TOKEN_BUDGET = int(os.getenv("NEWS_TOKEN_BUDGET", "3000"))
+DEFAULT_MAX_ITEMS = int(os.getenv("NEWS_MAX_ITEMS", "15"))
+# Search results handed to the researcher by the multi-query tool
+DEFAULT_CANDIDATE_LIMIT = int(os.getenv("NEWS_CANDIDATE_LIMIT", "40"))
+
+# Weights of (recency, source, match, catalyst)
+DEFAULT_WEIGHTS = np.array([0.35, 0.15, 0.30, 0.20])
+
+SOURCE_WEIGHTS = {
+    "reuters": 1.0, "bloomberg": 1.0, "wall street journal": 1.0, "wsj": 1.0, "financial times": 1.0,
+    "ft.com": 1.0, "cnbc": 0.85, "barron's": 0.85, "barrons": 0.85, "marketwatch": 0.8,
+    "associated press": 0.8, "apnews": 0.8, "investor's business daily": 0.75, "yahoo": 0.7,
+    "benzinga": 0.6, "seeking alpha": 0.6, "seekingalpha": 0.6, "zacks": 0.5, "motley fool": 0.4, "fool.com": 0.4,
+}
+DEFAULT_SOURCE_WEIGHT = 0.5
+
+CATALYST_KEYWORDS = {
+    "earnings": 1.0, "guidance": 1.0, "fda": 1.0, "approval": 0.8, "revenue": 0.6, "forecast": 0.6,
+    "downgrade": 0.8, "upgrade": 0.8, "price target": 0.7, "merger": 0.9, "acquisition": 0.9, "acquire": 0.8,
+    "buyback": 0.6, "dividend": 0.5, "stock split": 0.7, "lawsuit": 0.6, "investigation": 0.6, "sec ": 0.4,
+    "recall": 0.7, "tariff": 0.6, "export": 0.5, "sanction": 0.6, "layoff": 0.5, "ceo": 0.4, "launch": 0.4,
+    "implied volatility": 0.6, "options": 0.3, "trial": 0.6, "phase 3": 0.8,
+}
+
+_RELATIVE_AGE_RE = re.compile(r"(\d+)\s*(minute|min|hour|hr|day|week)s?\s+ago", re.IGNORECASE)
+_AGE_UNIT_HOURS = {"minute": 1 / 60, "min": 1 / 60, "hour": 1, "hr": 1, "day": 24, "week": 168}
+_URL_RE = re.compile(r"https?://\S+")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*)$")
+
+
+class NewsItem(BaseModel):
+    """One news item found by the researcher."""
+    title: str = Field(description="Headline")
+    summary: str = Field(default="", description="One or two sentence summary of what happened and why it matters")
+    source: str = Field(default="", description="Publisher")
+    published: str = Field(default="", description="Publication time, ISO 8601 if known")
+    url: str = Field(default="", description="Complete article URL")
+
+
+class ResearchFindings(BaseModel):
+    """Structured output of the research task."""
+    items: List[NewsItem] = Field(default_factory=list)
+
+
+def news_item_from_result(result):
+    """Map a search result dictionary (title/snippet/source/date/link) to NewsItem fields."""
+    return {
+        "title": result.get("title") or (result.get("snippet") or "")[:120],
+        "summary": result.get("summary") or result.get("snippet") or "",
+        "source": result.get("source") or "",
+        "published": result.get("published") or result.get("date") or "",
+        "url": result.get("url") or result.get("link") or "",
+    }
+
+
+def estimate_tokens(item):
+    """Rough token cost of an item as the agent sees it (about four characters per token)."""
+    return math.ceil(len(json.dumps(item, ensure_ascii=False)) / 4)
+
+
+def _age_hours(published, now):
+    if not published:
+        return np.nan
+    match = _RELATIVE_AGE_RE.search(published)
+    if match:
+        return int(match.group(1)) * _AGE_UNIT_HOURS[match.group(2).lower()]
+    try:
+        parsed = datetime.fromisoformat(published.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return np.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return max(0.0, (now - parsed.timestamp()) / 3600)
+
+
+def _source_weight(source, url):
+    text = f"{source} {url}".lower()
+    return next((weight for name, weight in SOURCE_WEIGHTS.items() if name in text), DEFAULT_SOURCE_WEIGHT)
+
+
+def _contains(texts, term):
+    return np.char.find(texts, term) >= 0
+
+
+def score_news(items, symbol="", aliases=(), now=None, half_life_hours=RECENCY_HALF_LIFE_HOURS,
+               weights=DEFAULT_WEIGHTS):
+    """
+    Score items on recency, source, ticker/alias match and catalyst keywords.
+
+    Parameters:
+    - items: List of dictionaries with NewsItem fields (or raw search results)
+    - symbol: Ticker symbol the items are ranked for
+    - aliases: Company names that count as a mention of the ticker
+    - now: Unix time the recency is measured from (default: now)
+    - half_life_hours: Age at which the recency feature halves
+    - weights: Array of (recency, source, match, catalyst) weights
+
+    Returns:
+    - Array of scores, one per item (higher is better)
+    """
+    if not items:
+        return np.zeros(0)
+    if now is None:
+        session = get_active_session()
+        # Recorded and replayed runs rank against the recording's clock so their prompts match
+        now = session.clock() if session is not None else time.time()
+    items = [news_item_from_result(item) for item in items]
+    titles = np.array([item["title"] for item in items], dtype=str)
+    bodies = np.array([f"{item['title']} {item['summary']}" for item in items], dtype=str)
+    titles_lower = np.char.lower(titles)
+    bodies_lower = np.char.lower(bodies)
+
+    ages = np.array([_age_hours(item["published"], now) for item in items], dtype=float)
+    recency = np.exp2(-ages / half_life_hours)
+    # Items without a date rank like ones two half-lives old
+    recency = np.where(np.isnan(recency), 0.25, recency)
+
+    source = np.array([_source_weight(item["source"], item["url"]) for item in items])
+
+    title_hit = np.zeros(len(items), dtype=bool)
+    body_hit = np.zeros(len(items), dtype=bool)
+    if symbol:
+        # Tickers are matched case-sensitively so "NOW" or "ALL" do not match every headline
+        title_hit |= _contains(np.char.add(np.char.add(" ", titles), " "), f" {symbol.upper()} ")
+        body_hit |= _contains(bodies, symbol.upper())
+    for alias in aliases:
+        alias = alias.lower()
+        title_hit |= _contains(titles_lower, alias)
+        body_hit |= _contains(bodies_lower, alias)
+    match = 0.6 * title_hit + 0.4 * body_hit
+
+    terms = list(CATALYST_KEYWORDS)
+    hits = np.stack([_contains(bodies_lower, term) for term in terms], axis=1)
+    catalyst = np.minimum(1.0, hits @ np.array([CATALYST_KEYWORDS[t] for t in terms]))
+
+    features = np.stack([recency, source, match, catalyst], axis=1)
+    return features @ weights
+
+
+def select_top_k(items, scores, token_budget=DEFAULT_TOKEN_BUDGET, max_items=DEFAULT_MAX_ITEMS):
+    """
+    Keep the best-scoring items while they fit in the token budget.
+
+    The best item is always kept, even when it alone exceeds the budget.
+
+    Returns:
+    - List of the kept items, best first
+    """
+    if not items:
+        return []
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    costs = np.array([estimate_tokens(items[i]) for i in order])
+    fits = np.cumsum(costs) <= token_budget if token_budget else np.ones(len(order), dtype=bool)
+    # The prefix that fits: stop at the first item over budget so the order stays by score
+    keep = int(np.argmin(fits)) if not fits.all() else len(order)
+    keep = max(1, min(keep, max_items or len(order)))
+    return [items[i] for i in order[:keep]]
+
+
+def rank_news(items, symbol="", aliases=(), token_budget=DEFAULT_TOKEN_BUDGET, max_items=DEFAULT_MAX_ITEMS,
+              now=None):
+    """
+    Score items and keep the top ones within the budget.
+
+    Returns:
+    - List of the kept items, best first, each with its 'score'
+    """
+    scores = score_news(items, symbol, aliases, now=now)
+    scored = [dict(item, score=round(float(score), 3)) for item, score in zip(items, scores)]
+    return select_top_k(scored, scores, token_budget, max_items)
+
+
+def parse_research_items(raw):
+    """
+    Read NewsItems from the researcher's answer: ResearchFindings JSON, a JSON
+    list of items, or as a fallback a bullet list with one item per bullet.
+
+    Returns:
+    - List of NewsItem field dictionaries (empty if nothing could be read)
+    """
+    text = (raw or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data.get("items")
+    if isinstance(data, list):
+        items = []
+        for entry in data:
+            try:
+                items.append(NewsItem.model_validate(entry).model_dump())
+            except ValidationError:
+                continue
+        return items
+
+    items = []
+    for line in text.split("\n"):
+        match = _BULLET_RE.match(line)
+        if not match:
+            continue
+        body = match.group(1).strip()
+        url = _URL_RE.search(body)
+        title = _URL_RE.sub("", body).strip(" -|()[]")
+        items.append(NewsItem(title=title, url=url.group(0).rstrip(").,]") if url else "").model_dump())
+    return items
+
+
+def render_research_items(items):
+    """ResearchFindings JSON for the analyst (scores are for ranking only and are left out)."""
+    findings = ResearchFindings(items=[NewsItem.model_validate(item) for item in items])
+    return findings.model_dump_json(indent=1)
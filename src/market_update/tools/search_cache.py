@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", ".cache/search_cache.sqlite")
+DEFAULT_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("SEARCH_CACHE_MEMORY_ENTRIES", "256"))
+DEFAULT_DISK_MAX_BYTES = int(float(os.getenv("SEARCH_CACHE_DISK_MB", "50")) * 1024 * 1024)
+
+
+def normalize_query(query):
+    """Lower-case a query and collapse whitespace so trivial variations share a cache entry."""
+    return " ".join(str(query).lower().split())
+
+
+def make_cache_key(query, search_type, region, time_period, backend, max_results, output_format):
+    """Build a stable cache key from the search parameters that affect the result."""
+    parts = {
+        "query": normalize_query(query),
+        "search_type": search_type,
+        "region": region,
+        "time_period": time_period,
+        "backend": backend,
+        "max_results": max_results,
+        "output_format": output_format,
+    }
+    encoded = json.dumps(parts, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SearchCache:
+    """
+    Two-tier TTL cache for search results.
+
+    The first tier is an in-memory LRU dictionary; the second is a SQLite file
+    that survives process restarts. Entries expire after `ttl_seconds` and the
+    disk tier evicts least recently used entries once it grows past
+    `max_disk_bytes`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_memory_entries=DEFAULT_MEMORY_ENTRIES, max_disk_bytes=DEFAULT_DISK_MAX_BYTES):
+        """
+        Parameters:
+        - path: SQLite file for the disk tier, or None for a memory-only cache
+        - ttl_seconds: How long an entry stays valid (default: 1 hour)
+        - max_memory_entries: Maximum number of entries kept in the LRU tier
+        - max_disk_bytes: Size budget for cached values in the disk tier
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Returns:
+        - The cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    raw, created_at = row
+                    if now - created_at < self.ttl_seconds:
+                        self._conn.execute(
+                            "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        value = json.loads(raw)
+                        self._remember(key, created_at, value)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value in both tiers."""
+        now = time.time()
+        raw = json.dumps(value)
+        with self._lock:
+            self._remember(key, now, value)
+            self.stats["writes"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, raw, len(raw), now, now),
+                )
+                self._evict_disk(now)
+                self._conn.commit()
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_cache")
+                self._conn.commit()
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        # Expired rows go first, then least recently used rows until under budget
+        cursor = self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )
+        self.stats["evictions"] += max(cursor.rowcount, 0)
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM search_cache ORDER BY accessed_at ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """
+    Return the process-wide SearchCache, creating it on first use.
+
+    Set SEARCH_CACHE_DISABLED=1 to turn caching off; SEARCH_CACHE_PATH="" keeps
+    the cache in memory only.
+    """
+    global _default_cache
+    if os.getenv("SEARCH_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SearchCache(path=DEFAULT_CACHE_PATH or None)
+        return _default_cache
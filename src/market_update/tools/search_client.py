@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+
+from pydantic import PrivateAttr
+
+from ..rate_limit import TokenBucket
+from ..resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+DEFAULT_RATE_PER_SECOND = float(os.getenv("SEARCH_RATE_PER_SECOND", "1"))
+DEFAULT_BURST = float(os.getenv("SEARCH_RATE_BURST", "3"))
+DEFAULT_RATE_STATE_FILE = os.getenv("SEARCH_RATE_STATE_FILE") or None
+DEFAULT_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "4"))
+
+# Exception class names raised by duckduckgo-search / ddgs when DDG throttles us
+THROTTLE_ERRORS = ("RatelimitException", "TimeoutException", "ConnectError", "ReadTimeout", "ConnectTimeout")
+
+
+class SearchUnavailableError(Exception):
+    """Raised when a search cannot be served after retries or while the circuit is open."""
+
+
+def _ddgs_class():
+    try:
+        from ddgs import DDGS
+    except ImportError:
+        from duckduckgo_search import DDGS
+    return DDGS
+
+
+def is_throttling_error(error):
+    """True for errors that mean 'slow down and retry' rather than a bad request."""
+    if type(error).__name__ in THROTTLE_ERRORS:
+        return True
+    message = str(error).lower()
+    return "ratelimit" in message or "rate limit" in message or "timed out" in message
+
+
+def _build_pooled_wrapper_class():
+    from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+    class PooledDuckDuckGoSearchAPIWrapper(DuckDuckGoSearchAPIWrapper):
+        """
+        DuckDuckGoSearchAPIWrapper that keeps one DDGS session per thread instead
+        of opening a new HTTP client for every query.
+        """
+
+        _local: threading.local = PrivateAttr(default_factory=threading.local)
+
+        def _session(self):
+            session = getattr(self._local, "ddgs", None)
+            if session is None:
+                session = _ddgs_class()()
+                self._local.ddgs = session
+            return session
+
+        def _ddgs_text(self, query, max_results=None):
+            results = self._session().text(
+                query,
+                region=self.region,
+                safesearch=self.safesearch,
+                timelimit=self.time,
+                max_results=max_results or self.max_results,
+                backend=self.backend,
+            )
+            return list(results or [])
+
+        def _ddgs_news(self, query, max_results=None):
+            results = self._session().news(
+                query,
+                region=self.region,
+                safesearch=self.safesearch,
+                timelimit=self.time,
+                max_results=max_results or self.max_results,
+            )
+            return list(results or [])
+
+    return PooledDuckDuckGoSearchAPIWrapper
+
+
+_pooled_wrapper_class = None
+
+
+def pooled_wrapper_class():
+    """PooledDuckDuckGoSearchAPIWrapper, defined on first use so langchain_community loads only for live searches."""
+    global _pooled_wrapper_class
+    if _pooled_wrapper_class is None:
+        _pooled_wrapper_class = _build_pooled_wrapper_class()
+    return _pooled_wrapper_class
+
+
+def __getattr__(name):
+    if name == "PooledDuckDuckGoSearchAPIWrapper":
+        return pooled_wrapper_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class SearchClient:
+    """
+    Long-lived DuckDuckGo client shared by every search tool in the process.
+
+    Keeps wrapper and tool instances (and their HTTP sessions) alive between
+    calls, paces requests through a TokenBucket, retries throttled requests
+    with jittered exponential backoff and stops calling DDG altogether while
+    its circuit breaker is open.
+    """
+
+    def __init__(self, rate_limiter=None, breaker=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=1.0, max_delay=30.0):
+        """
+        Parameters:
+        - rate_limiter: TokenBucket (or anything with acquire()) pacing live requests
+        - breaker: CircuitBreaker guarding the search backend
+        - max_retries: Retries after the first attempt for throttling errors
+        - base_delay: Backoff ceiling for the first retry in seconds
+        - max_delay: Upper bound for any single backoff delay
+        """
+        self.rate_limiter = rate_limiter or TokenBucket(
+            DEFAULT_RATE_PER_SECOND, DEFAULT_BURST, state_path=DEFAULT_RATE_STATE_FILE
+        )
+        self.breaker = breaker or CircuitBreaker("duckduckgo", failure_threshold=5, reset_timeout=60.0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._tools = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def search(self, query, search_type="detailed", max_results=20, output_format="list",
+               region="all", time_period="d", backend="news"):
+        """
+        Run a live search.
+
+        Raises:
+        - SearchUnavailableError if the circuit is open or all retries failed
+        """
+        tool = self._get_tool(search_type, max_results, output_format, region, time_period, backend)
+
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                self._count("rejected")
+                raise SearchUnavailableError(str(e)) from e
+
+            self.rate_limiter.acquire()
+            self._count("requests")
+            try:
+                result = tool.invoke(str(query))
+            except Exception as e:
+                if not is_throttling_error(e):
+                    # A rejected query or an unexpected response is not a sign the backend is down
+                    self.breaker.record_ignored()
+                    self._count("failures")
+                    raise SearchUnavailableError(f"{type(e).__name__}: {e}") from e
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise SearchUnavailableError(f"{type(e).__name__}: {e}") from e
+                self._count("retries")
+                time.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _get_tool(self, search_type, max_results, output_format, region, time_period, backend):
+        key = (search_type, max_results, output_format, region, time_period, backend)
+        with self._lock:
+            tool = self._tools.get(key)
+            if tool is None:
+                from langchain_community.tools import DuckDuckGoSearchRun, DuckDuckGoSearchResults
+                PooledDuckDuckGoSearchAPIWrapper = pooled_wrapper_class()
+                if search_type == "basic":
+                    tool = DuckDuckGoSearchRun(api_wrapper=PooledDuckDuckGoSearchAPIWrapper())
+                else:
+                    wrapper = PooledDuckDuckGoSearchAPIWrapper(
+                        region=region,
+                        time=time_period
+                    )
+                    tool = DuckDuckGoSearchResults(
+                        api_wrapper=wrapper,
+                        backend=backend,
+                        output_format=output_format,
+                        num_results=max_results
+                    )
+                self._tools[key] = tool
+            return tool
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_search_client():
+    """Return the process-wide SearchClient, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = SearchClient()
+        return _default_client
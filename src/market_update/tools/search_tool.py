@@ -1,9 +1,17 @@
 from crewai.tools import BaseTool
-from typing import Type, List, Dict, Union, Any
+from typing import Type, List, Dict, Union, Any, Callable, Optional
 from pydantic import BaseModel, Field, validator
-from langchain_community.tools import DuckDuckGoSearchRun, DuckDuckGoSearchResults
-from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
 import json
+import logging
+
+from .search_cache import get_search_cache, make_cache_key
+from .news_dedup import dedupe_news_items
+from .search_client import SearchUnavailableError, get_search_client
+from ..recording import FixtureMissError, get_active_session
+from ..instrumentation import span
+
+logger = logging.getLogger(__name__)
+
 
 class DuckDuckGoSearchInput(BaseModel):
     """Input schema for DuckDuckGoSearchTool."""
@@ -54,6 +62,10 @@ class DuckDuckGoSearchTool(BaseTool):
         "'search_type': 'detailed', 'time_period': 'd'}"
     )
     args_schema: Type[BaseModel] = DuckDuckGoSearchInput
+    # Called with the result list handed to the agent (the crew records them as seen once published)
+    on_results: Optional[Callable[[List[dict]], None]] = None
+    # Collapse duplicate stories in the results; off when a caller dedupes merged results itself
+    dedupe: bool = True
 
     def _run(
         self,
@@ -75,27 +87,69 @@ class DuckDuckGoSearchTool(BaseTool):
                     query = query['query']
                 else:
                     query = str(query)
-            
-            if search_type == "basic":
-                search = DuckDuckGoSearchRun()
-                return search.invoke(str(query))
-            else:
-                wrapper = DuckDuckGoSearchAPIWrapper(
-                    region=region,
-                    time=time_period
-                )
-                
-                search = DuckDuckGoSearchResults(
-                    api_wrapper=wrapper,
-                    backend=backend,
-                    output_format=output_format
+
+            session = get_active_session()
+            if session is not None:
+                arguments = {
+                    "query": query,
+                    "search_type": search_type,
+                    "max_results": max_results,
+                    "output_format": output_format,
+                    "region": region,
+                    "time_period": time_period,
+                    "backend": backend
+                }
+                results = session.search(
+                    arguments,
+                    lambda: self._search(query, search_type, max_results, output_format, region, time_period, backend)
                 )
-                
-                return search.invoke(str(query))
-                
+            else:
+                results = self._search(query, search_type, max_results, output_format, region, time_period, backend)
+            if self.dedupe and isinstance(results, list):
+                results, stats = dedupe_news_items(results)
+                if stats.collapsed:
+                    logger.info("Search '%s': collapsed %d duplicate items (%d -> %d)",
+                                query, stats.collapsed, stats.input_items, stats.output_items)
+            if self.on_results is not None and isinstance(results, list):
+                self.on_results(results)
+            return results
+
+        except FixtureMissError:
+            # A replay that diverged from its recording must fail loudly
+            raise
+        except SearchUnavailableError as e:
+            # Tell the agent not to retry; the client has already retried with backoff
+            return (
+                f"Error performing search: search is temporarily unavailable ({e}). "
+                "Do not retry this query; continue with the information gathered so far."
+            )
         except Exception as e:
             return f"Error performing search: {str(e)}"
 
+    def _search(self, query, search_type, max_results, output_format, region, time_period, backend):
+        """Serve a search from the cache or run it live through the shared client."""
+        with span("search.query", query=query, search_type=search_type) as query_span:
+            cache = get_search_cache()
+            cache_key = make_cache_key(query, search_type, region, time_period, backend, max_results, output_format)
+            if cache is not None:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    query_span.set("cache", "hit")
+                    return cached
+
+            results = get_search_client().search(
+                query,
+                search_type=search_type,
+                max_results=max_results,
+                output_format=output_format,
+                region=region,
+                time_period=time_period,
+                backend=backend
+            )
+            if cache is not None:
+                cache.set(cache_key, results)
+            return results
+
     def _parse_input(self, tool_input: Union[str, dict]) -> dict:
         """Parse various input formats into a standardized dictionary."""
         try:
@@ -0,0 +1,38 @@
+from crewai.tools import BaseTool
+from typing import Type, Dict, Any, Optional
+from pydantic import BaseModel, Field
+
+from .market_data import MarketDataError, volatility_summary
+from ..instrumentation import span
+
+
+class VolatilitySnapshotInput(BaseModel):
+    """Input schema for VolatilitySnapshotTool."""
+    stock_symbol: str = Field(..., description="Ticker symbol (e.g. 'MSFT')")
+    max_expiries: int = Field(
+        default=6,
+        description="Number of expiries to list in the term structure"
+    )
+
+
+class VolatilitySnapshotTool(BaseTool):
+    name: str = "Volatility Snapshot"
+    description: str = (
+        "Get precomputed volatility figures for a ticker from local price and option-chain data: "
+        "realized volatility (10/20/60 day, Parkinson), 30-day ATM implied volatility with its IV rank and "
+        "percentile over the past year, the ATM term structure and the expected move to each expiry. "
+        "Use it instead of searching for or estimating these numbers. Example input: {'stock_symbol': 'MSFT'}"
+    )
+    args_schema: Type[BaseModel] = VolatilitySnapshotInput
+    data_dir: Optional[str] = None
+
+    def _run(self, stock_symbol: str, max_expiries: int = 6) -> Dict[str, Any]:
+        """Compute the volatility summary of a symbol from the local market data."""
+        with span("volatility.summary", stock_symbol=stock_symbol):
+            try:
+                summary = volatility_summary(stock_symbol, self.data_dir, max_expiries=max_expiries)
+            except MarketDataError as e:
+                return {"error": str(e)}
+        if summary is None:
+            return {"error": f"No local market data for {stock_symbol.upper()}."}
+        return summary